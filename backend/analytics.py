@@ -0,0 +1,146 @@
+import datetime
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text as sql_text
+from sqlalchemy.future import select
+
+from database import redis_client, engine
+from models import AnalyticsHourly, AnalyticsDaily
+
+logger = logging.getLogger("api")
+
+# Rollup pipeline: events bump a per-minute Redis hash; the arq worker folds
+# every finished minute into analytics_hourly / analytics_daily and deletes it.
+# Reads only ever touch the pre-aggregated tables (and one PFCOUNT), so their
+# cost depends on the requested range, never on traffic volume.
+METRICS = ("pageviews", "signups", "subscribers")
+MINUTE_PREFIX = "analytics:m:"
+VISITORS_PREFIX = "analytics:visitors:"
+ROLLED_UNTIL_KEY = "analytics:rolled_until"
+# Minute buckets outlive a stalled worker for this long before they are lost
+MINUTE_TTL = 2 * 86400
+# Daily unique-visitor HyperLogLogs, kept for range-level uniques on the dashboard
+VISITORS_TTL = 400 * 86400
+# One rollup run handles at most this many minutes (catch-up after downtime)
+MAX_MINUTES_PER_RUN = 24 * 60
+
+_MINUTE_FMT = "%Y%m%d%H%M"
+_DAY_FMT = "%Y%m%d"
+
+
+def _utcnow() -> datetime.datetime:
+    return datetime.datetime.utcnow()
+
+
+def _minute_key(ts: datetime.datetime) -> str:
+    return f"{MINUTE_PREFIX}{ts.strftime(_MINUTE_FMT)}"
+
+
+def _visitors_key(day: datetime.date) -> str:
+    return f"{VISITORS_PREFIX}{day.strftime(_DAY_FMT)}"
+
+
+async def record(metric: str, count: int = 1, visitor: Optional[str] = None):
+    """Count an event in the current minute. Never raises: analytics must not break requests."""
+    now = _utcnow()
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hincrby(_minute_key(now), metric, count)
+            pipe.expire(_minute_key(now), MINUTE_TTL)
+            if visitor:
+                pipe.pfadd(_visitors_key(now.date()), visitor)
+                pipe.expire(_visitors_key(now.date()), VISITORS_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to record analytics event {metric}: {e}")
+
+
+async def _upsert(conn, table: str, rows: Dict[Tuple[datetime.datetime, str], int], absolute: bool = False):
+    # UPDATE-then-INSERT keeps this portable (MySQL and SQLite); only the
+    # worker's unique cron job writes these tables, so there is no race.
+    op = ":n" if absolute else "value + :n"
+    for (bucket, metric), n in rows.items():
+        params = {"bucket": bucket, "metric": metric, "n": n}
+        result = await conn.execute(sql_text(f"UPDATE {table} SET value = {op} WHERE bucket = :bucket AND metric = :metric"), params)
+        if result.rowcount == 0:
+            await conn.execute(sql_text(f"INSERT INTO {table} (bucket, metric, value) VALUES (:bucket, :metric, :n)"), params)
+
+
+async def rollup() -> int:
+    """Fold finished minute buckets into the hourly and daily tables.
+
+    Returns the number of minutes processed. The cursor (ROLLED_UNTIL_KEY) is
+    only advanced after the DB commit, so a failed run is retried in full.
+    """
+    now = _utcnow().replace(second=0, microsecond=0)
+    raw = await redis_client.get(ROLLED_UNTIL_KEY)
+    start = datetime.datetime.strptime(raw, _MINUTE_FMT) if raw else now - datetime.timedelta(minutes=60)
+    start = max(start, now - datetime.timedelta(seconds=MINUTE_TTL))
+    minutes = []
+    ts = start
+    while ts < now and len(minutes) < MAX_MINUTES_PER_RUN:
+        minutes.append(ts)
+        ts += datetime.timedelta(minutes=1)
+    if not minutes:
+        return 0
+
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for minute in minutes:
+            pipe.hgetall(_minute_key(minute))
+        buckets = await pipe.execute()
+
+    hourly: Dict[Tuple[datetime.datetime, str], int] = defaultdict(int)
+    daily: Dict[Tuple[datetime.datetime, str], int] = defaultdict(int)
+    for minute, counts in zip(minutes, buckets):
+        hour = minute.replace(minute=0)
+        day = minute.replace(hour=0, minute=0)
+        for metric, n in counts.items():
+            hourly[(hour, metric)] += int(n)
+            daily[(day, metric)] += int(n)
+
+    # Unique visitors are not additive: store each touched day's current estimate
+    days = sorted({m.replace(hour=0, minute=0) for m in minutes})
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for day in days:
+            pipe.pfcount(_visitors_key(day.date()))
+        visitors = {(day, "visitors"): n for day, n in zip(days, await pipe.execute())}
+
+    async with engine.begin() as conn:
+        await _upsert(conn, AnalyticsHourly.__tablename__, hourly)
+        await _upsert(conn, AnalyticsDaily.__tablename__, daily)
+        await _upsert(conn, AnalyticsDaily.__tablename__, visitors, absolute=True)
+
+    end = minutes[-1] + datetime.timedelta(minutes=1)
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(ROLLED_UNTIL_KEY, end.strftime(_MINUTE_FMT))
+        pipe.delete(*[_minute_key(m) for m in minutes])
+        await pipe.execute()
+    if hourly:
+        logger.info(f"Analytics rollup: {len(minutes)} minutes, {sum(hourly.values())} events")
+    return len(minutes)
+
+
+async def query(granularity: str, start: datetime.datetime, end: datetime.datetime,
+                metrics: Iterable[str]) -> List[dict]:
+    """Pre-aggregated series for [start, end): one range read on the (bucket, metric) key."""
+    model = AnalyticsHourly if granularity == "hour" else AnalyticsDaily
+    metrics = list(metrics)
+    async with engine.connect() as conn:
+        rows = (await conn.execute(
+            select(model.bucket, model.metric, model.value)
+            .filter(model.bucket >= start, model.bucket < end, model.metric.in_(metrics))
+            .order_by(model.bucket)
+        )).all()
+    series: Dict[datetime.datetime, dict] = {}
+    for bucket, metric, value in rows:
+        series.setdefault(bucket, {"bucket": bucket, **{m: 0 for m in metrics}})[metric] = value
+    return list(series.values())
+
+
+async def unique_visitors(days: List[datetime.date]) -> int:
+    """Distinct visitors across the given days (HyperLogLog union, one round trip)."""
+    if not days:
+        return 0
+    return await redis_client.pfcount(*[_visitors_key(day) for day in days])
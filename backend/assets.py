@@ -0,0 +1,168 @@
+import datetime
+import hashlib
+import json
+import logging
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from config import settings
+from database import AsyncSessionLocal, redis_client
+from models import Asset, AssetReference, Blog, Project
+from utils import storage
+
+logger = logging.getLogger("api")
+
+# Content-addressed asset storage. An asset's digest is
+# sha256(profile + sha256(source)), where the profile names everything that
+# shapes the stored output (pipeline version, widths, quality, voice...). The
+# same source under the same profile always maps to the same object keys, so
+# a repeat upload or narration is a DB lookup instead of new objects. Owners
+# (blogs, projects, site settings) reference assets through asset_references;
+# the worker's GC sweep rebuilds those from the owning rows and deletes assets
+# nobody has referenced or re-used for ASSET_GC_GRACE_HOURS.
+
+TTS_PROFILE = "tts-v1"
+ASSET_PREFIX = "assets/"
+_DIGEST_RE = re.compile(r"assets/[0-9a-f]{2}/([0-9a-f]{64})")
+
+# Columns that may contain asset URLs, per owner type
+REFERENCE_SOURCES = {
+    "blog": (Blog, ("image", "avatar", "audio_url", "content")),
+    "project": (Project, ("image", "avatar", "longDescription")),
+}
+# Site settings kept in Redis (owner "site", id 0)
+SITE_KEYS = ("about_data", "skills_data")
+
+
+def image_profile() -> str:
+    widths = ".".join(str(w) for w in sorted(settings.IMAGE_VARIANT_WIDTHS))
+    return f"img-v1-w{widths}-q{settings.IMAGE_QUALITY}"
+
+
+def asset_digest(source_sha256: str, profile: str) -> str:
+    return hashlib.sha256(f"{profile}:{source_sha256}".encode()).hexdigest()
+
+
+def asset_key(digest: str, suffix: str) -> str:
+    return f"{ASSET_PREFIX}{digest[:2]}/{digest}{suffix}"
+
+
+def digests_in(texts: Iterable[Optional[str]]) -> Set[str]:
+    found: Set[str] = set()
+    for text in texts:
+        if text:
+            found.update(_DIGEST_RE.findall(text))
+    return found
+
+
+async def claim_asset(db: AsyncSession, digest: str) -> Optional[dict]:
+    """The stored manifest for a digest, or None if it has not been stored yet.
+
+    A hit refreshes last_used_at so the GC grace period restarts: the caller
+    is about to hand these URLs out again.
+    """
+    result = await db.execute(select(Asset).filter(Asset.digest == digest))
+    asset = result.scalar_one_or_none()
+    if asset is None:
+        return None
+    asset.last_used_at = datetime.datetime.utcnow()
+    await db.commit()
+    return json.loads(asset.manifest)
+
+
+async def register_asset(db: AsyncSession, digest: str, profile: str, content_type: str, size: int,
+                         keys: List[str], manifest: dict):
+    """Record objects that were just uploaded. A concurrent upload of the same
+    content wrote identical objects, so losing the insert race is fine."""
+    db.add(Asset(digest=digest, profile=profile, content_type=content_type, size=size,
+                 keys=json.dumps(keys), manifest=json.dumps(manifest)))
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+
+
+async def sync_references(db: AsyncSession, owner_type: str, owner_id: int, texts: Iterable[Optional[str]]):
+    """Make owner's references match the asset URLs in texts. Caller commits."""
+    digests = digests_in(texts)
+    wanted: Set[int] = set()
+    if digests:
+        result = await db.execute(select(Asset.id).filter(Asset.digest.in_(digests)))
+        wanted = set(result.scalars().all())
+    result = await db.execute(select(AssetReference.asset_id).filter(
+        AssetReference.owner_type == owner_type, AssetReference.owner_id == owner_id))
+    current = set(result.scalars().all())
+    if current - wanted:
+        await db.execute(delete(AssetReference).filter(
+            AssetReference.owner_type == owner_type, AssetReference.owner_id == owner_id,
+            AssetReference.asset_id.in_(current - wanted)))
+    for asset_id in wanted - current:
+        db.add(AssetReference(asset_id=asset_id, owner_type=owner_type, owner_id=owner_id))
+
+
+async def sync_owner_references(db: AsyncSession, owner_type: str, owner):
+    """sync_references over the REFERENCE_SOURCES columns of an ORM row."""
+    columns = REFERENCE_SOURCES[owner_type][1]
+    await sync_references(db, owner_type, owner.id, [getattr(owner, c) for c in columns])
+
+
+async def drop_references(db: AsyncSession, owner_type: str, owner_id: int):
+    await db.execute(delete(AssetReference).filter(
+        AssetReference.owner_type == owner_type, AssetReference.owner_id == owner_id))
+
+
+async def _reconcile_references(db: AsyncSession):
+    """Rebuild every reference from the owning rows, catching writes that
+    bypassed sync_references (direct DB edits, seed data, old rows)."""
+    owners: Dict[Tuple[str, int], Set[str]] = {}
+    for owner_type, (model, columns) in REFERENCE_SOURCES.items():
+        query = select(model.id, *[getattr(model, c) for c in columns]).execution_options(yield_per=500)
+        async for row in await db.stream(query):
+            digests = digests_in(row[1:])
+            if digests:
+                owners[(owner_type, row[0])] = digests
+    site = digests_in([await redis_client.get(key) for key in SITE_KEYS])
+    if site:
+        owners[("site", 0)] = site
+
+    all_digests = set().union(*owners.values()) if owners else set()
+    ids: Dict[str, int] = {}
+    if all_digests:
+        result = await db.execute(select(Asset.digest, Asset.id).filter(Asset.digest.in_(all_digests)))
+        ids = dict(result.all())
+    wanted = {(ids[d], t, i) for (t, i), ds in owners.items() for d in ds if d in ids}
+    result = await db.execute(select(AssetReference.asset_id, AssetReference.owner_type, AssetReference.owner_id))
+    current = set(result.all())
+    for asset_id, owner_type, owner_id in current - wanted:
+        await db.execute(delete(AssetReference).filter(
+            AssetReference.asset_id == asset_id, AssetReference.owner_type == owner_type,
+            AssetReference.owner_id == owner_id))
+    for asset_id, owner_type, owner_id in wanted - current:
+        db.add(AssetReference(asset_id=asset_id, owner_type=owner_type, owner_id=owner_id))
+    await db.commit()
+
+
+async def collect_garbage() -> int:
+    """Delete assets unreferenced and older than the grace period. Returns the count."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(hours=settings.ASSET_GC_GRACE_HOURS)
+    async with AsyncSessionLocal() as db:
+        await _reconcile_references(db)
+        referenced = select(AssetReference.asset_id)
+        result = await db.execute(select(Asset.id, Asset.keys).filter(
+            Asset.last_used_at < cutoff, Asset.id.not_in(referenced)))
+        orphans = result.all()
+        if not orphans:
+            return 0
+        keys = [key for _, raw in orphans for key in json.loads(raw)]
+        # Objects first, then rows: if this dies midway the next sweep retries
+        # the same rows, and deleting already-missing keys is a no-op
+        await storage.delete_many(keys)
+        await db.execute(delete(Asset).filter(Asset.id.in_([asset_id for asset_id, _ in orphans])))
+        await db.commit()
+    logger.info(f"Asset GC removed {len(orphans)} assets ({len(keys)} objects)")
+    return len(orphans)
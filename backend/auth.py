@@ -7,7 +7,7 @@ from jose import jwt, JWTError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from config import settings
-from security import get_password_hash, verify_password
+from security import get_password_hash, verify_password, verify_password_async
 from models import User
 from sqlalchemy.orm import Session
 
@@ -42,7 +42,7 @@ async def authenticate_user(db: AsyncSession, username: str, password: str):
     user = result.scalar_one_or_none()
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    if not await verify_password_async(password, user.password_hash):
         return False
     return user
 
@@ -68,17 +68,17 @@ def decode_token(token: str):
 
 from database import redis_client
 
-def revoke_token(token: str, expire_seconds: int = 900):
+async def revoke_token(token: str, expire_seconds: int = 900):
     """Add token to blocklist for immediate revocation."""
     if token:
-        redis_client.set(f"blacklist:{token}", "1", ex=expire_seconds)
+        await redis_client.set(f"blacklist:{token}", "1", ex=expire_seconds)
 
-def is_token_revoked(token: str) -> bool:
+async def is_token_revoked(token: str) -> bool:
     """Check if a token has been explicitly revoked."""
     if not token:
         return False
     try:
-        return bool(redis_client.get(f"blacklist:{token}"))
+        return bool(await redis_client.get(f"blacklist:{token}"))
     except Exception as e:
         logger.error(f"Redis error checking token revocation: {e}")
         return False
@@ -0,0 +1,266 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from config import settings
+from database import redis_client, redis_bytes_client
+
+logger = logging.getLogger("api")
+
+# Response cache with tag-based invalidation. Every entry is registered in one
+# Redis set per tag (cache:tag:<tag>), so a write only has to drop the sets it
+# touches instead of scanning the keyspace with KEYS.
+CACHE_PREFIX = "cache:"
+TAG_PREFIX = "cache:tag:"
+REFRESH_LOCK_PREFIX = "cache:lock:"
+# Per-tag generation counters, bumped by every invalidation. A loader that
+# started before an invalidation must not write its (pre-write) result back.
+GENERATION_PREFIX = "cache:gen:"
+# Far longer than any loader runs; keeps per-id counters from piling up
+GENERATION_TTL = 86400
+
+# Deletes every key registered under the given tag sets, then the sets themselves,
+# atomically so a concurrent set_cache can't re-register into a half-cleared tag.
+# KEYS: tag sets followed by their generation counters, in the same order.
+_INVALIDATE_TAGS_LUA = """
+local n = #KEYS / 2
+local deleted = 0
+for i = 1, n do
+    local members = redis.call('SMEMBERS', KEYS[i])
+    for _, key in ipairs(members) do
+        deleted = deleted + redis.call('DEL', key)
+    end
+    redis.call('DEL', KEYS[i])
+    redis.call('INCR', KEYS[n + i])
+    redis.call('EXPIRE', KEYS[n + i], ARGV[1])
+end
+return deleted
+"""
+_invalidate_tags_script = redis_client.register_script(_INVALIDATE_TAGS_LUA)
+
+# Stores a computed entry only if no tag was invalidated since the loader started.
+# KEYS: cache key, tag sets, generation counters. ARGV: body, expire, generations
+# read before loading ("" for an absent counter).
+_STORE_IF_CURRENT_LUA = """
+local n = (#KEYS - 1) / 2
+for i = 1, n do
+    if (redis.call('GET', KEYS[1 + n + i]) or '') ~= ARGV[2 + i] then
+        return 0
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+for i = 1, n do
+    redis.call('SADD', KEYS[1 + i], KEYS[1])
+    local ttl = redis.call('TTL', KEYS[1 + i])
+    if ttl < tonumber(ARGV[2]) then
+        redis.call('EXPIRE', KEYS[1 + i], ARGV[2])
+    end
+end
+return 1
+"""
+_store_if_current_script = redis_bytes_client.register_script(_STORE_IF_CURRENT_LUA)
+
+
+def _tag_key(tag: str) -> str:
+    return f"{TAG_PREFIX}{tag}"
+
+
+def _generation_key(tag: str) -> str:
+    return f"{GENERATION_PREFIX}{tag}"
+
+
+def _register_tags(pipe, cache_key: str, tags: Optional[Iterable[str]], expire: int):
+    for tag in tags or ():
+        pipe.sadd(_tag_key(tag), cache_key)
+        # Tag sets live at least as long as their longest-lived member
+        pipe.expire(_tag_key(tag), expire, nx=True)
+        pipe.expire(_tag_key(tag), expire, gt=True)
+
+
+async def get_cache(key: str):
+    data = await redis_client.get(f"{CACHE_PREFIX}{key}")
+    return json.loads(data) if data else None
+
+
+async def set_cache(key: str, data: Any, expire: int = 300, tags: Optional[Iterable[str]] = None):
+    cache_key = f"{CACHE_PREFIX}{key}"
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.set(cache_key, json.dumps(jsonable_encoder(data)), ex=expire)
+        _register_tags(pipe, cache_key, tags, expire)
+        await pipe.execute()
+
+
+async def invalidate_tags(*tags: str) -> int:
+    """Drop every cached entry registered under any of the given tags."""
+    if not tags:
+        return 0
+    try:
+        return await _invalidate_tags_script(keys=[_tag_key(t) for t in tags] + [_generation_key(t) for t in tags],
+                                             args=[GENERATION_TTL])
+    except Exception as e:
+        logger.error(f"Failed to invalidate cache tags {tags}: {e}")
+        return 0
+
+
+# ─── Pre-serialized Responses ────────────────────────────────────────────────
+# get_or_compute caches the final response body (gzipped when large) so a hit is
+# one Redis GET and no Python-level serialization. Stored layout: a one-line JSON
+# header ({"fresh_until", "etag", "encoding"}), a newline, then the body bytes.
+
+@dataclass
+class CachedBody:
+    body: bytes
+    etag: str
+    encoding: Optional[str]
+    fresh_until: float
+
+    def dumps(self) -> bytes:
+        header = json.dumps({"fresh_until": self.fresh_until, "etag": self.etag, "encoding": self.encoding})
+        return header.encode() + b"\n" + self.body
+
+    @classmethod
+    def loads(cls, raw: bytes) -> "CachedBody":
+        header, _, body = raw.partition(b"\n")
+        meta = json.loads(header)
+        return cls(body=body, etag=meta["etag"], encoding=meta.get("encoding"), fresh_until=meta["fresh_until"])
+
+
+def serialize_json(data: Any, soft_ttl: int) -> CachedBody:
+    # Same encoding FastAPI's JSONResponse uses
+    body = json.dumps(jsonable_encoder(data), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+    return serialize_body(body, soft_ttl)
+
+
+def serialize_body(body: bytes, soft_ttl: int) -> CachedBody:
+    etag = f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+    encoding = None
+    if len(body) >= settings.CACHE_COMPRESS_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=6)
+        encoding = "gzip"
+    return CachedBody(body=body, etag=etag, encoding=encoding, fresh_until=time.time() + soft_ttl)
+
+
+def cached_json_response(request: Request, entry: CachedBody, media_type: str = "application/json") -> Response:
+    headers = {"ETag": entry.etag, "Vary": "Accept-Encoding"}
+    if entry.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    body = entry.body
+    if entry.encoding == "gzip":
+        if "gzip" in request.headers.get("accept-encoding", ""):
+            headers["Content-Encoding"] = "gzip"
+        else:
+            body = gzip.decompress(body)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+# ─── Stale-While-Revalidate ──────────────────────────────────────────────────
+# Entries carry a soft expiry (fresh_until) and a Redis TTL of soft + stale
+# seconds. Past fresh_until the stale body is still served while one background
+# task refreshes it; on a miss, concurrent callers for the same key in this
+# worker await a single loader call instead of all hitting MySQL.
+
+_inflight: Dict[str, asyncio.Task] = {}
+_background_refreshes: set = set()
+_stats = {"hits": 0, "misses": 0, "stale": 0, "coalesced": 0, "refreshes": 0, "errors": 0}
+
+
+def get_cache_stats() -> dict:
+    return dict(_stats)
+
+
+async def _compute_and_store(key: str, loader: Callable[[], Awaitable[Any]], soft_ttl: int, stale_ttl: int, tags) -> CachedBody:
+    generations = None
+    try:
+        if tags:
+            generations = [g or b"" for g in await redis_bytes_client.mget([_generation_key(t) for t in tags])]
+    except Exception as e:
+        logger.error(f"Failed to read cache generations for {key}: {e}")
+    data = await loader()
+    entry = serialize_body(data, soft_ttl) if isinstance(data, bytes) else serialize_json(data, soft_ttl)
+    cache_key = f"{CACHE_PREFIX}{key}"
+    expire = soft_ttl + stale_ttl
+    try:
+        if not tags:
+            await redis_bytes_client.set(cache_key, entry.dumps(), ex=expire)
+        elif generations is not None:
+            # Skipped (and the result only returned to its callers) if a write
+            # invalidated a tag while the loader ran
+            await _store_if_current_script(
+                keys=[cache_key] + [_tag_key(t) for t in tags] + [_generation_key(t) for t in tags],
+                args=[entry.dumps(), expire, *generations],
+            )
+    except Exception as e:
+        logger.error(f"Failed to store cache entry {key}: {e}")
+    return entry
+
+
+def _single_flight(key: str, loader, soft_ttl: int, stale_ttl: int, tags) -> asyncio.Task:
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.create_task(_compute_and_store(key, loader, soft_ttl, stale_ttl, tags))
+        _inflight[key] = task
+        task.add_done_callback(lambda _t: _inflight.pop(key, None))
+    return task
+
+
+async def _refresh_in_background(key: str, loader, soft_ttl: int, stale_ttl: int, tags):
+    # Only one worker refreshes a given stale key at a time
+    if not await redis_client.set(f"{REFRESH_LOCK_PREFIX}{key}", "1", nx=True, ex=max(soft_ttl, 5)):
+        return
+    _stats["refreshes"] += 1
+    try:
+        await _single_flight(key, loader, soft_ttl, stale_ttl, tags)
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.error(f"Background refresh of {key} failed: {e}")
+    finally:
+        await redis_client.delete(f"{REFRESH_LOCK_PREFIX}{key}")
+
+
+async def get_or_compute(key: str, loader: Callable[[], Awaitable[Any]], tags: Optional[Iterable[str]] = None,
+                         soft_ttl: int = None, stale_ttl: int = None) -> CachedBody:
+    """Return the cached body for key, computing it with loader on a miss.
+
+    loader returns JSON-serializable data, or bytes for an already rendered
+    body (e.g. XML).
+
+    loader must not depend on request-scoped state (e.g. the request's DB
+    session), since it may run in a background refresh after the response.
+    """
+    soft_ttl = settings.CACHE_SOFT_TTL_SECONDS if soft_ttl is None else soft_ttl
+    stale_ttl = settings.CACHE_STALE_TTL_SECONDS if stale_ttl is None else stale_ttl
+    tags = list(tags or ())
+
+    entry = None
+    try:
+        raw = await redis_bytes_client.get(f"{CACHE_PREFIX}{key}")
+        if raw:
+            entry = CachedBody.loads(raw)
+    except Exception as e:
+        logger.error(f"Cache read failed for {key}: {e}")
+
+    if entry is not None:
+        if entry.fresh_until >= time.time():
+            _stats["hits"] += 1
+        else:
+            _stats["stale"] += 1
+            if key not in _inflight:
+                task = asyncio.create_task(_refresh_in_background(key, loader, soft_ttl, stale_ttl, tags))
+                _background_refreshes.add(task)
+                task.add_done_callback(_background_refreshes.discard)
+        return entry
+
+    if key in _inflight:
+        _stats["coalesced"] += 1
+    else:
+        _stats["misses"] += 1
+    # shield: a cancelled caller must not cancel the computation others are awaiting
+    return await asyncio.shield(_single_flight(key, loader, soft_ttl, stale_ttl, tags))
@@ -5,6 +5,7 @@ import os
 class Settings(BaseSettings):
     # App Settings
     PROJECT_NAME: str = "Dev Portfolio"
+    SITE_URL: str = "https://omervision.io"
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
@@ -14,21 +15,65 @@ class Settings(BaseSettings):
     
     # Redis Settings
     REDIS_URL: str = "redis://redis:6379/0"
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: float = 5.0
+    REDIS_SOCKET_TIMEOUT: float = 5.0
+    MAINTENANCE_RESYNC_SECONDS: int = 30
+    CACHE_SOFT_TTL_SECONDS: int = 60
+    CACHE_STALE_TTL_SECONDS: int = 240
+    CACHE_COMPRESS_MIN_BYTES: int = 1024
+    SEARCH_BACKEND: str = "auto"  # auto (mysql on MySQL, else memory), mysql (FULLTEXT) or memory (Turkish-aware in-process index)
     
     # MinIO Settings
     MINIO_ENDPOINT: str = "minio:9000"
     MINIO_PUBLIC_ENDPOINT: str = "localhost:9000"
     MINIO_ACCESS_KEY: str
     MINIO_SECRET_KEY: str
+    MINIO_MAX_CONNECTIONS: int = 20
+    MINIO_CONNECT_TIMEOUT: float = 5.0
+    MINIO_READ_TIMEOUT: float = 60.0
     
     # Security Settings
     ALLOWED_ORIGINS: List[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
     ALLOWED_ADMIN_IPS: List[str] = ["127.0.0.1", "::1"]
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    PRINCIPAL_LOCAL_TTL_SECONDS: float = 5.0
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 300
     TOTP_ISSUER: str = "OmerVision"
     ADMIN_USERNAME: str = "admin"
     ADMIN_PASSWORD: str
     
+    # Password Hashing (Argon2)
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536  # KiB
+    ARGON2_PARALLELISM: int = 4
+    PASSWORD_HASH_WORKERS: int = 2
+
+    # Uploads
+    UPLOAD_MAX_BYTES: int = 20 * 1024 * 1024
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024  # S3 multipart part size (min 5 MiB)
+    ASSET_GC_GRACE_HOURS: int = 24  # unreferenced uploads survive this long
+
+    # Image Rendering
+    IMAGE_WORKERS: int = 2
+    IMAGE_VARIANT_WIDTHS: List[int] = [320, 640, 1280]
+    IMAGE_QUALITY: int = 80
+    OG_CACHE_DIR: str = "/tmp/og-cache"
+    OG_CACHE_MAX_FILES: int = 5000
+    OG_RENDERS_PER_MINUTE: int = 30  # uncached OG renders per client IP
+    OG_FONT_PATH: str = ""
+
+    # PaaS Deployments
+    DEPLOY_MAX_CONCURRENT: int = 2  # across all deploy workers
+    DEPLOY_MAX_PER_USER: int = 1
+    DEPLOY_TIMEOUT: int = 1800  # seconds per deploy job
+    DEPLOY_RETRY_DELAY: int = 10  # seconds before a job waiting for a slot is retried
+    PAAS_LOG_MAX_LINES: int = 5000  # per project, oldest lines are trimmed
+    PAAS_LOG_TTL_DAYS: int = 14
+    PAAS_LOG_STARTUP_SECONDS: float = 5.0  # container output captured after start
+    GIT_CACHE_MAX_BYTES: int = 5 * 1024 * 1024 * 1024  # bare mirrors kept for redeploys
+    GIT_CACHE_MAX_REPOS: int = 100
+    
     model_config = SettingsConfigDict(
         env_file=".env", 
         env_file_encoding="utf-8",
@@ -28,11 +28,51 @@ AsyncSessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=e
 SessionLocal = AsyncSessionLocal
 Base = declarative_base()
 
-import redis
+import redis.asyncio as aioredis
 from config import settings
 
-# Redis Client for Blacklist and Lockout (Keep direct for sync checks if needed, but usually async is better)
-redis_client = redis.from_url(settings.REDIS_URL, decode_responses=True)
+# Shared async Redis pool. The blocking pool makes bursts wait for a free connection
+# (up to REDIS_POOL_TIMEOUT) instead of failing with "Too many connections".
+redis_pool = aioredis.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    health_check_interval=30,
+    decode_responses=True,
+)
+redis_client = aioredis.Redis(connection_pool=redis_pool)
+
+# Same server without response decoding, for pre-serialized (possibly gzipped) cache bodies
+redis_bytes_pool = aioredis.BlockingConnectionPool.from_url(
+    settings.REDIS_URL,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+    health_check_interval=30,
+)
+redis_bytes_client = aioredis.Redis(connection_pool=redis_bytes_pool)
+
+def _pool_stats(pool) -> dict:
+    waiters = getattr(pool._condition, "_waiters", None) or ()
+    return {
+        "max_connections": pool.max_connections,
+        "in_use": len(pool._in_use_connections),
+        "idle": len(pool._available_connections),
+        "waiting": len(waiters),
+    }
+
+def get_redis_pool_stats() -> dict:
+    """Snapshot of the shared Redis pools usage."""
+    return {**_pool_stats(redis_pool), "bytes": _pool_stats(redis_bytes_pool)}
+
+async def close_redis():
+    await redis_client.aclose()
+    await redis_pool.disconnect()
+    await redis_bytes_client.aclose()
+    await redis_bytes_pool.disconnect()
 
 async def get_db() -> Generator:
     async with AsyncSessionLocal() as session:
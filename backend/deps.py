@@ -1,35 +1,18 @@
-import json
 import logging
 from typing import List
 from fastapi import Request, Depends, HTTPException, Header
-from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 
-from database import get_db, redis_client
+from database import get_db
 from models import User, UserRole, AuditLog
 from auth import decode_token
+from principals import Principal, get_principal
 from config import settings
 
 logger = logging.getLogger("api")
 
-# Redis Cache Help
-async def get_cache(key: str):
-    data = redis_client.get(f"cache:{key}")
-    return json.loads(data) if data else None
-
-async def set_cache(key: str, data: any, expire: int = 300):
-    redis_client.set(f"cache:{key}", json.dumps(jsonable_encoder(data)), ex=expire)
-
-def invalidate_blog_cache():
-    try:
-        keys = redis_client.keys("cache:blogs_*")
-        if keys:
-            redis_client.delete(*keys)
-    except Exception as e:
-        logger.error(f"Failed to invalidate blog cache: {e}")
-
 # Audit Log Helper
 async def log_audit(db: AsyncSession, user_id: int, action: str, target: str, request: Request = None):
     ip = request.client.host if request else "system"
@@ -44,7 +27,7 @@ def check_ip_whitelist(request: Request):
         logger.warning(f"Unauthorized IP access attempt: {client_ip}")
         raise HTTPException(status_code=403, detail="Access denied from this IP")
 
-async def get_current_user(request: Request, authorization: str = Header(None), db: AsyncSession = Depends(get_db)):
+async def get_current_principal(request: Request, authorization: str = Header(None), db: AsyncSession = Depends(get_db)) -> Principal:
     token = None
     if authorization and authorization.startswith("Bearer "):
         token = authorization.split(" ")[1]
@@ -58,7 +41,7 @@ async def get_current_user(request: Request, authorization: str = Header(None),
     # Zombie Token Check (Blacklist)
     try:
         from auth import is_token_revoked
-        if is_token_revoked(token):
+        if await is_token_revoked(token):
             logger.warning(f"get_current_user: Token blacklisted: {token[:10]}...")
             raise HTTPException(status_code=401, detail="Token revoked (logged out)")
     except HTTPException:
@@ -79,30 +62,33 @@ async def get_current_user(request: Request, authorization: str = Header(None),
          logger.error(f"get_current_user: Invalid user_id in token: {user_id}")
          raise HTTPException(status_code=401, detail="Invalid token data")
 
-    # Async query pattern
-    result = await db.execute(
-        select(User).options(selectinload(User.roles).selectinload(UserRole.role)).filter(User.id == user_id)
-    )
-    user = result.scalar_one_or_none()
+    # Cached (local + Redis) instead of a users/roles query per request
+    principal = await get_principal(db, user_id)
     
-    if not user:
+    if not principal:
         logger.warning(f"get_current_user: User not found for id {user_id}")
         raise HTTPException(status_code=401, detail="User not found")
         
-    if not user.is_active:
-        logger.warning(f"get_current_user: User inactive {user.username}")
+    if not principal.is_active:
+        logger.warning(f"get_current_user: User inactive {principal.username}")
         raise HTTPException(status_code=401, detail="User inactive")
         
+    return principal
+
+async def get_current_user(principal: Principal = Depends(get_current_principal), db: AsyncSession = Depends(get_db)):
+    """Full ORM user, for handlers that read or modify account fields."""
+    result = await db.execute(
+        select(User).options(selectinload(User.roles).selectinload(UserRole.role)).filter(User.id == principal.id)
+    )
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
     return user
 
 # RBAC Dependent Logic
 def requires_role(required_role: str):
-    async def role_checker(user: User = Depends(get_current_user)):
-        try:
-            roles = [ur.role.slug for ur in user.roles] if user.roles else []
-        except Exception as e:
-            logger.error(f"requires_role: Error extracting roles: {e}")
-            roles = []
+    async def role_checker(user: Principal = Depends(get_current_principal)):
+        roles = user.roles
         logger.info(f"requires_role: user={user.username}, roles={roles}, required={required_role}")
         if required_role not in roles:
             raise HTTPException(status_code=403, detail=f"Insufficient permissions. You have: {roles}, need: {required_role}")
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from database import redis_client
+
+logger = logging.getLogger("api")
+
+# Cross-worker notifications over Redis pub/sub. Handlers are registered at import
+# time and receive the decoded JSON payload published on their channel.
+EventHandler = Callable[[dict], Awaitable[None]]
+
+_handlers: Dict[str, List[EventHandler]] = {}
+_listener: Optional[asyncio.Task] = None
+_running = False
+
+
+def subscribe(channel: str, handler: EventHandler):
+    _handlers.setdefault(channel, []).append(handler)
+
+
+async def publish(channel: str, payload: dict):
+    await redis_client.publish(channel, json.dumps(payload))
+
+
+async def _dispatch(channel: str, data: str):
+    try:
+        payload = json.loads(data)
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring malformed event on {channel}: {data!r}")
+        return
+    for handler in _handlers.get(channel, []):
+        try:
+            await handler(payload)
+        except Exception as e:
+            logger.error(f"Event handler for {channel} failed: {e}", exc_info=True)
+
+
+async def _listen():
+    # Cancellation can be swallowed inside the client's read timeout, so the loop
+    # also checks _running rather than relying on CancelledError alone.
+    while _running:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(*_handlers.keys())
+            while _running:
+                # Explicit read timeout so an idle channel doesn't trip the pool's socket_timeout
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    await _dispatch(message["channel"], message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not _running:
+                break
+            logger.warning(f"Event listener disconnected, retrying: {e}")
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+async def start():
+    global _listener, _running
+    if _handlers and _listener is None:
+        _running = True
+        _listener = asyncio.create_task(_listen())
+
+
+async def stop():
+    global _listener, _running
+    _running = False
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except asyncio.CancelledError:
+            pass
+        _listener = None
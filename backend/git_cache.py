@@ -0,0 +1,149 @@
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger("api")
+
+# Repository cache for PaaS deploys. Each repo URL gets one bare mirror
+# (git clone --mirror) that is fetched incrementally on later deploys; the
+# build directory is then a --depth 1 checkout of a single commit taken from
+# the mirror, so a redeploy transfers only new objects from the remote and
+# never copies history into the workspace. Mirrors are evicted least
+# recently used first once there are too many or they use too much disk.
+
+LogCallback = Callable[[str], Awaitable[None]]
+
+
+class GitError(Exception):
+    pass
+
+
+async def _git(*args: str, cwd: Optional[str] = None, log: Optional[LogCallback] = None) -> str:
+    """Run git and return stdout. stderr (progress, warnings) goes to log line by line."""
+    process = await asyncio.create_subprocess_exec(
+        "git", *args, cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        # Never block on a credential prompt for a private or mistyped repo
+        env={**os.environ, "GIT_TERMINAL_PROMPT": "0"},
+    )
+    errors: List[str] = []
+
+    async def drain_stderr():
+        async for raw in process.stderr:
+            line = raw.decode("utf-8", "replace").rstrip("\r\n").rsplit("\r", 1)[-1]
+            errors.append(line)
+            if log:
+                await log(line)
+
+    try:
+        stdout, _ = await asyncio.gather(process.stdout.read(), drain_stderr())
+        await process.wait()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    if process.returncode != 0:
+        raise GitError(f"git {args[0]} failed: {' '.join(errors[-5:]).strip()}")
+    return stdout.decode().strip()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class MirrorCache:
+    def __init__(self, root: str, max_bytes: int, max_repos: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_repos = max_repos
+        # Per-mirror locks: one fetch/checkout at a time, and GC skips busy mirrors
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def mirror_path(self, repo_url: str) -> str:
+        return os.path.join(self.root, hashlib.sha256(repo_url.encode()).hexdigest()[:24] + ".git")
+
+    def _lock(self, path: str) -> asyncio.Lock:
+        return self._locks.setdefault(path, asyncio.Lock())
+
+    async def checkout(self, repo_url: str, ref: Optional[str], dest: str,
+                       log: Optional[LogCallback] = None) -> str:
+        """Update the mirror for repo_url and check ref out into dest at depth 1.
+
+        ref may be a branch, tag or commit SHA; None means the remote's default
+        branch. dest is replaced. Returns the full commit SHA.
+        """
+        path = self.mirror_path(repo_url)
+        async with self._lock(path):
+            await self._update_mirror(repo_url, path, log)
+            target = ref or "HEAD"
+            try:
+                sha = await _git("rev-parse", "--verify", "--end-of-options", f"{target}^{{commit}}", cwd=path)
+            except GitError:
+                raise GitError(f"Unknown ref '{target}' in {repo_url}")
+
+            if os.path.exists(dest):
+                await asyncio.to_thread(shutil.rmtree, dest)
+            os.makedirs(dest)
+            # Local paths ignore --depth; file:// goes through the pack protocol
+            await _git("init", "--quiet", cwd=dest)
+            await _git("fetch", "--quiet", "--depth", "1", f"file://{os.path.abspath(path)}", sha, cwd=dest, log=log)
+            await _git("checkout", "--quiet", "--detach", sha, cwd=dest)
+            os.utime(path)  # LRU clock
+        await self.collect_garbage()
+        return sha
+
+    async def _update_mirror(self, repo_url: str, path: str, log: Optional[LogCallback]):
+        if os.path.isdir(path):
+            try:
+                await _git("fetch", "--prune", "--force", "origin", cwd=path, log=log)
+                return
+            except GitError as e:
+                # A corrupt or half-written mirror is rebuilt rather than failing every deploy
+                logger.warning(f"Mirror fetch failed for {repo_url}, re-cloning: {e}")
+                await asyncio.to_thread(shutil.rmtree, path, True)
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        if os.path.exists(tmp):
+            await asyncio.to_thread(shutil.rmtree, tmp, True)
+        await _git("clone", "--mirror", "--", repo_url, tmp, log=log)
+        # Shallow fetches of a single SHA need this on the serving side
+        await _git("config", "uploadpack.allowAnySHA1InWant", "true", cwd=tmp)
+        os.replace(tmp, path)  # a mirror is either complete or absent
+
+    async def collect_garbage(self) -> int:
+        """Evict least recently used mirrors beyond max_repos or max_bytes. Returns the count."""
+        if not os.path.isdir(self.root):
+            return 0
+        mirrors: List[Tuple[float, str]] = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.name.endswith(".git"):
+                mirrors.append((entry.stat().st_mtime, entry.path))
+        mirrors.sort(reverse=True)  # most recently used first
+        sizes = await asyncio.to_thread(lambda: {path: _dir_size(path) for _, path in mirrors})
+
+        kept, total, evicted = 0, 0, 0
+        for _, path in mirrors:
+            lock = self._lock(path)
+            fits = kept < self.max_repos and total + sizes[path] <= self.max_bytes
+            if fits or lock.locked():
+                kept += 1
+                total += sizes[path]
+                continue
+            async with lock:
+                await asyncio.to_thread(shutil.rmtree, path, True)
+            self._locks.pop(path, None)
+            evicted += 1
+        if evicted:
+            logger.info(f"Git mirror GC evicted {evicted} mirrors, {total} bytes kept")
+        return evicted
@@ -0,0 +1,272 @@
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont, ImageOps
+
+from config import settings
+
+logger = logging.getLogger("api")
+
+# ─── Worker Pool ─────────────────────────────────────────────────────────────
+# Pillow work is CPU-bound and holds the GIL for most of a render, so it runs
+# in a small process pool instead of on the event loop or in threads.
+
+_pool: Optional[ProcessPoolExecutor] = None
+_stats = {"submitted": 0, "completed": 0, "failed": 0}
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # Not fork: this process runs an event loop and several thread pools
+        # (hashing, aioboto3), and forking with their locks held can deadlock
+        # the child. The forkserver starts workers from a clean process.
+        _pool = ProcessPoolExecutor(max_workers=settings.IMAGE_WORKERS,
+                                    mp_context=multiprocessing.get_context("forkserver"))
+    return _pool
+
+
+async def run_in_pool(fn, *args):
+    """Run a picklable, module-level function in the image process pool."""
+    _stats["submitted"] += 1
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+    except Exception:
+        _stats["failed"] += 1
+        raise
+    _stats["completed"] += 1
+    return result
+
+
+def get_image_pool_stats() -> dict:
+    return {"workers": settings.IMAGE_WORKERS, "started": _pool is not None, **_stats}
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# ─── Uploaded Images ─────────────────────────────────────────────────────────
+
+def process_image(path: str, widths: Tuple[int, ...], quality: int) -> dict:
+    """Decode once, apply EXIF orientation, and encode one WebP per width.
+
+    Runs in the process pool. The largest variant is the source width capped
+    at max(widths); images are never upscaled. Metadata (EXIF incl.
+    GPS, XMP) is dropped; the ICC profile is kept so colors stay correct.
+    """
+    with Image.open(path) as src:
+        img = ImageOps.exif_transpose(src)
+        img.load()
+    icc_profile = img.info.get("icc_profile")
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+
+    largest = min(img.width, max(widths))
+    variants = []
+    for width in sorted(set(w for w in widths if w < largest)) + [largest]:
+        resized = img if width == img.width else img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        output = io.BytesIO()
+        params = {"format": "WEBP", "quality": quality, "method": 4, "exif": b""}
+        if icc_profile:
+            params["icc_profile"] = icc_profile
+        resized.save(output, **params)
+        variants.append({"width": resized.width, "height": resized.height, "content": output.getvalue()})
+    return {"width": img.width, "height": img.height, "variants": variants}
+
+
+# ─── Open Graph Images ───────────────────────────────────────────────────────
+# Bump when the layout changes so cached renders are not reused.
+OG_TEMPLATE_VERSION = 2
+OG_SIZE = (1200, 630)
+OG_MARGIN = 80
+OG_MAX_LINES = 4
+OG_MAX_TITLE_LENGTH = 200
+OG_FONT_SIZES = (72, 64, 56, 48, 42)
+OG_BACKGROUND = (10, 10, 15)
+OG_ACCENT = (0, 200, 255)
+OG_TEXT = (255, 255, 255)
+
+_FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf",
+    "DejaVuSans-Bold.ttf",
+)
+
+
+@lru_cache(maxsize=None)
+def _load_font(size: int) -> ImageFont.ImageFont:
+    """Loaded once per size per worker process."""
+    paths = ((settings.OG_FONT_PATH,) if settings.OG_FONT_PATH else ()) + _FONT_CANDIDATES
+    for path in paths:
+        try:
+            return ImageFont.truetype(path, size)
+        except OSError:
+            continue
+    logger.warning("No TrueType font found for OG images, using Pillow's default font")
+    return ImageFont.load_default(size=size)
+
+
+def _wrap(draw: ImageDraw.ImageDraw, text: str, font, width: int) -> List[str]:
+    """Greedy word wrap by rendered width; words wider than a line are split."""
+    lines: List[str] = []
+    current = ""
+    for word in text.split():
+        candidate = f"{current} {word}" if current else word
+        if draw.textlength(candidate, font=font) <= width:
+            current = candidate
+            continue
+        if current:
+            lines.append(current)
+        current = word
+        while draw.textlength(current, font=font) > width:
+            cut = len(current) - 1
+            while cut > 1 and draw.textlength(current[:cut], font=font) > width:
+                cut -= 1
+            lines.append(current[:cut])
+            current = current[cut:]
+    if current:
+        lines.append(current)
+    return lines
+
+
+def _fit_title(draw: ImageDraw.ImageDraw, title: str, width: int) -> Tuple[object, List[str]]:
+    """Largest font size at which the title fits in OG_MAX_LINES; ellipsize otherwise."""
+    for size in OG_FONT_SIZES:
+        font = _load_font(size)
+        lines = _wrap(draw, title, font, width)
+        if len(lines) <= OG_MAX_LINES:
+            return font, lines
+    lines = lines[:OG_MAX_LINES]
+    last = lines[-1]
+    while last and draw.textlength(last + "…", font=font) > width:
+        last = last[:-1].rstrip()
+    lines[-1] = last + "…"
+    return font, lines
+
+
+def render_og_image(title: str) -> bytes:
+    """Render the 1200x630 share image for a title (runs in the process pool)."""
+    img = Image.new("RGB", OG_SIZE, color=OG_BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    width = OG_SIZE[0] - 2 * OG_MARGIN
+
+    draw.text((OG_MARGIN, OG_MARGIN - 20), "OmerVision", font=_load_font(36), fill=OG_ACCENT)
+    draw.rectangle((OG_MARGIN, OG_SIZE[1] - OG_MARGIN, OG_MARGIN + 120, OG_SIZE[1] - OG_MARGIN + 6), fill=OG_ACCENT)
+
+    font, lines = _fit_title(draw, title, width)
+    ascent, descent = font.getmetrics()
+    line_height = int((ascent + descent) * 1.15)
+    y = (OG_SIZE[1] - line_height * len(lines)) // 2
+    for line in lines:
+        draw.text((OG_MARGIN, y), line, font=font, fill=OG_TEXT)
+        y += line_height
+
+    output = io.BytesIO()
+    img.save(output, format="WEBP", quality=85, method=4)
+    return output.getvalue()
+
+
+# Rendered images are cached on local disk, keyed by (template version, title).
+_og_inflight: Dict[str, asyncio.Future] = {}
+# The cache directory is scanned for eviction once per this many stores,
+# so it may exceed OG_CACHE_MAX_FILES by up to this many files
+OG_PRUNE_EVERY = 100
+_stores_since_prune = 0
+_prune_lock = threading.Lock()
+
+
+def _clean_title(title: str) -> str:
+    return " ".join(title.split())[:OG_MAX_TITLE_LENGTH]
+
+
+def og_cache_key(title: str) -> str:
+    return hashlib.sha256(f"{OG_TEMPLATE_VERSION}:{_clean_title(title)}".encode()).hexdigest()[:32]
+
+
+def _og_path(key: str) -> str:
+    return os.path.join(settings.OG_CACHE_DIR, f"{key}.webp")
+
+
+def _store(path: str, content: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)  # readers never see a partial file
+    global _stores_since_prune
+    _stores_since_prune += 1
+    if _stores_since_prune >= OG_PRUNE_EVERY:
+        _prune_cache()
+
+
+def _prune_cache():
+    global _stores_since_prune
+    if not _prune_lock.acquire(blocking=False):
+        return  # another store thread is already pruning
+    try:
+        _stores_since_prune = 0
+        entries = []
+        for entry in os.scandir(settings.OG_CACHE_DIR):
+            if entry.name.endswith(".webp"):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except FileNotFoundError:
+                    pass
+        excess = len(entries) - settings.OG_CACHE_MAX_FILES
+        for _, path in sorted(entries)[:max(excess, 0)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    finally:
+        _prune_lock.release()
+
+
+async def _render_and_store(title: str, path: str) -> bytes:
+    content = await run_in_pool(render_og_image, title)
+    try:
+        await asyncio.to_thread(_store, path, content)
+    except OSError as e:
+        logger.error(f"Failed to cache OG image at {path}: {e}")
+    return content
+
+
+async def get_og_image(title: str, before_render: Optional[Callable[[], Awaitable[None]]] = None) -> Tuple[bytes, str]:
+    """Return (webp bytes, cache key), rendering at most once per title per worker.
+
+    before_render is awaited before starting a new render (not for cache hits
+    or renders already in flight) and may raise to refuse it.
+    """
+    key = og_cache_key(title)
+    path = _og_path(key)
+    try:
+        return await asyncio.to_thread(_read, path), key
+    except FileNotFoundError:
+        pass
+
+    task = _og_inflight.get(key)
+    if task is None and before_render is not None:
+        await before_render()
+        task = _og_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_render_and_store(_clean_title(title), path))
+        _og_inflight[key] = task
+        task.add_done_callback(lambda _t: _og_inflight.pop(key, None))
+    return await asyncio.shield(task), key
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
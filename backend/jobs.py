@@ -0,0 +1,42 @@
+import logging
+from typing import Optional
+
+from database import redis_client
+
+logger = logging.getLogger("api")
+
+# Progress for long-running arq jobs. arq only exposes queued / in_progress /
+# complete, so tasks publish their own progress to a small Redis hash keyed by
+# job id, and status endpoints merge it into their response.
+PROGRESS_PREFIX = "job:progress:"
+# Outlives the job result (arq keeps results for a day by default)
+PROGRESS_TTL = 86400
+
+
+async def set_progress(job_id: Optional[str], **fields):
+    """Publish progress fields for a job. Never raises: progress is best effort."""
+    if not job_id:
+        return
+    key = f"{PROGRESS_PREFIX}{job_id}"
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hset(key, mapping={k: str(v) for k, v in fields.items()})
+            pipe.expire(key, PROGRESS_TTL)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to record progress for job {job_id}: {e}")
+
+
+async def get_progress(job_id: str) -> dict:
+    """Last published progress for a job ({} if none), with numeric fields parsed."""
+    raw = await redis_client.hgetall(f"{PROGRESS_PREFIX}{job_id}")
+    progress = {}
+    for field, value in raw.items():
+        try:
+            progress[field] = int(value)
+        except ValueError:
+            try:
+                progress[field] = float(value)
+            except ValueError:
+                progress[field] = value
+    return progress
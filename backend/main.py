@@ -10,9 +10,14 @@ from arq import create_pool
 from arq.connections import RedisSettings
 
 from config import settings
-from database import init_db, redis_client, SessionLocal
+from database import init_db, redis_client, close_redis, SessionLocal
 from models import User, Role, UserRole, Project, Blog
-from security import get_password_hash
+from security import get_password_hash_async
+import events
+import maintenance
+import imaging
+from search import content_index
+from utils import storage
 
 # Import Routers
 from routers import auth, blogs, projects, admin, public, comments, upload, paas, tts
@@ -83,8 +88,8 @@ async def security_headers_middleware(request: Request, call_next):
 
 @app.middleware("http")
 async def maintenance_middleware(request: Request, call_next):
-    # Maintenance Mode Toggle (Redis)
-    is_maint = redis_client.get("maintenance_mode") == "true"
+    # Maintenance Mode Toggle (in-memory, kept current over Redis pub/sub)
+    is_maint = maintenance.is_enabled()
     allowed_paths = request.url.path.startswith("/api/admin") or request.url.path.startswith("/api/auth") or request.url.path == "/api/health"
     if is_maint and not allowed_paths:
         return JSONResponse(status_code=503, content={"detail": "System under maintenance. Please check back later."})
@@ -99,7 +104,7 @@ async def log_requests(request: Request, call_next):
 
 @app.get("/api/health")
 async def health_check():
-    is_maint = redis_client.get("maintenance_mode") == "true"
+    is_maint = maintenance.is_enabled()
     return {"status": "ok", "service": "backend", "maintenance": is_maint}
 
 # --- Routers ---
@@ -118,12 +123,27 @@ app.include_router(tts.router)
 async def shutdown_event():
     if hasattr(app.state, "arq_pool"):
         await app.state.arq_pool.close()
+    await events.stop()
+    await maintenance.stop()
+    imaging.shutdown_pool()
+    await storage.close()
+    await close_redis()
     logger.info("Application shutdown complete.")
 
 @app.on_event("startup")
 async def startup_event():
     await init_db()
     app.state.arq_pool = await create_pool(RedisSettings.from_dsn(settings.REDIS_URL))
+    await maintenance.start()
+    await events.start()
+    try:
+        await storage.start()
+    except Exception as e:
+        logger.error(f"Object storage unavailable at startup, will connect on first use: {e}")
+    try:
+        await content_index.ensure_loaded()
+    except Exception as e:
+        logger.error(f"Search index warm-up failed, will build on first query: {e}")
     logger.info("Application startup complete with Arq pool.")
     
     # Seed default data if necessary (admin user & roles)
@@ -142,7 +162,7 @@ async def startup_event():
                 admin_user = User(
                     username=settings.ADMIN_USERNAME, 
                     email='admin@example.com', 
-                    password_hash=get_password_hash(settings.ADMIN_PASSWORD), 
+                    password_hash=await get_password_hash_async(settings.ADMIN_PASSWORD), 
                     display_name='Admin User', 
                     is_active=True
                 )
@@ -179,7 +199,7 @@ async def startup_event():
                     ]
                 }
             ]
-            redis_client.set("skills_data", json.dumps(skills_data))
+            await redis_client.set("skills_data", json.dumps(skills_data))
         except Exception as e:
             logger.error(f"Error seeding database: {e}")
             await db.rollback()
@@ -0,0 +1,69 @@
+import asyncio
+import logging
+from typing import Optional
+
+import events
+from config import settings
+from database import redis_client
+
+logger = logging.getLogger("api")
+
+MAINTENANCE_KEY = "maintenance_mode"
+MAINTENANCE_CHANNEL = "events:maintenance"
+
+# Per-worker copy of the flag. Updated by pub/sub when an admin toggles it and
+# resynced from Redis periodically in case a message was missed.
+_enabled = False
+_resync_task: Optional[asyncio.Task] = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+async def set_enabled(enable: bool):
+    global _enabled
+    await redis_client.set(MAINTENANCE_KEY, "true" if enable else "false")
+    _enabled = enable
+    await events.publish(MAINTENANCE_CHANNEL, {"enabled": enable})
+
+
+async def resync():
+    global _enabled
+    try:
+        _enabled = await redis_client.get(MAINTENANCE_KEY) == "true"
+    except Exception as e:
+        logger.warning(f"Maintenance flag resync failed, keeping last value ({_enabled}): {e}")
+
+
+async def _on_maintenance_event(payload: dict):
+    global _enabled
+    _enabled = bool(payload.get("enabled"))
+    logger.info(f"Maintenance mode {'enabled' if _enabled else 'disabled'} via pub/sub")
+
+
+async def _resync_loop():
+    while True:
+        await asyncio.sleep(settings.MAINTENANCE_RESYNC_SECONDS)
+        await resync()
+
+
+events.subscribe(MAINTENANCE_CHANNEL, _on_maintenance_event)
+
+
+async def start():
+    global _resync_task
+    await resync()
+    if _resync_task is None:
+        _resync_task = asyncio.create_task(_resync_loop())
+
+
+async def stop():
+    global _resync_task
+    if _resync_task is not None:
+        _resync_task.cancel()
+        try:
+            await _resync_task
+        except asyncio.CancelledError:
+            pass
+        _resync_task = None
@@ -33,5 +33,44 @@ async def migrate_schemas():
         except Exception as e:
             print(f"Blogs readingTime tweak error: {e}")
 
+        try:
+            print("Adding blogs keyset pagination index...")
+            await conn.execute(text("CREATE INDEX ix_blog_published_date_id ON blogs (is_published, date, id);"))
+        except Exception as e:
+            print(f"Blogs pagination index tweak error: {e}")
+
+        try:
+            print("Adding projects keyset pagination index...")
+            await conn.execute(text("CREATE INDEX ix_project_date_id ON projects (date, id);"))
+        except Exception as e:
+            print(f"Projects pagination index tweak error: {e}")
+
+        for table in ("blogs", "projects"):
+            try:
+                print(f"Adding view_count column to {table}...")
+                await conn.execute(text(f"ALTER TABLE {table} ADD COLUMN view_count BIGINT NOT NULL DEFAULT 0;"))
+            except Exception as e:
+                print(f"{table.capitalize()} view_count tweak error: {e}")
+
+        try:
+            print("Adding deploy_job_id column to paas_projects...")
+            await conn.execute(text("ALTER TABLE paas_projects ADD COLUMN deploy_job_id VARCHAR(64);"))
+        except Exception as e:
+            print(f"PaaS deploy_job_id tweak error: {e}")
+
+        for column, ddl in (("git_ref", "VARCHAR(255)"), ("commit_sha", "VARCHAR(40)"),
+                            ("build_fingerprint", "VARCHAR(64)")):
+            try:
+                print(f"Adding {column} column to paas_projects...")
+                await conn.execute(text(f"ALTER TABLE paas_projects ADD COLUMN {column} {ddl};"))
+            except Exception as e:
+                print(f"PaaS {column} tweak error: {e}")
+
+        try:
+            print("Adding image_reused column to paas_deployments...")
+            await conn.execute(text("ALTER TABLE paas_deployments ADD COLUMN image_reused BOOLEAN DEFAULT FALSE;"))
+        except Exception as e:
+            print(f"PaaS image_reused tweak error: {e}")
+
 if __name__ == "__main__":
     asyncio.run(migrate_schemas())
@@ -1,6 +1,6 @@
 import datetime
 import base64
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Text, BigInteger
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Index, Text, BigInteger, Float
 from sqlalchemy.dialects.mysql import INTEGER as MYSQL_INTEGER
 from sqlalchemy.orm import relationship
 from sqlalchemy.types import TypeDecorator
@@ -119,9 +119,12 @@ class Project(Base):
     featured = Column(Boolean, default=False)
     category = Column(String(50))
     year = Column(String(10))
+    # Flushed in batches from Redis by the worker (see views.py)
+    view_count = Column(BigInteger, nullable=False, default=0, server_default='0')
 
     __table_args__ = (
         Index('ix_project_fulltext', 'title', 'excerpt', mysql_prefix='FULLTEXT'),
+        Index('ix_project_date_id', 'date', 'id'),
     )
 
 
@@ -142,9 +145,12 @@ class Blog(Base):
     featured = Column(Boolean, default=False)
     is_published = Column(Boolean, default=True)
     audio_url = Column(String(255), nullable=True)
+    view_count = Column(BigInteger, nullable=False, default=0, server_default='0')
 
     __table_args__ = (
         Index('ix_blog_fulltext', 'title', 'excerpt', mysql_prefix='FULLTEXT'),
+        # Keyset pagination of the published list: WHERE is_published ORDER BY date, id
+        Index('ix_blog_published_date_id', 'is_published', 'date', 'id'),
     )
 
 class Comment(Base):
@@ -177,25 +183,87 @@ class AuditLog(Base):
     ip_address = Column(String(45), nullable=True)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
 
+class Asset(Base):
+    """A content-addressed object set in MinIO (see assets.py)."""
+    __tablename__ = 'assets'
+    id = Column(MYSQL_INTEGER(unsigned=True), primary_key=True, index=True, autoincrement=True)
+    digest = Column(String(64), unique=True, nullable=False)  # sha256 of profile + source sha256
+    profile = Column(String(64), nullable=False)
+    content_type = Column(String(100))
+    size = Column(BigInteger)
+    keys = Column(Text, nullable=False)  # JSON list of object keys
+    manifest = Column(Text, nullable=False)  # JSON returned to clients
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Bumped on every deduplicated hit; GC grace is measured from here
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class AssetReference(Base):
+    __tablename__ = 'asset_references'
+    asset_id = Column(MYSQL_INTEGER(unsigned=True), ForeignKey('assets.id', ondelete='CASCADE'), primary_key=True)
+    owner_type = Column(String(32), primary_key=True)  # blog, project, site
+    owner_id = Column(MYSQL_INTEGER(unsigned=True), primary_key=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index('ix_asset_reference_owner', 'owner_type', 'owner_id'),
+    )
+
+class AnalyticsHourly(Base):
+    """Per-hour event totals rolled up from Redis minute buckets (see analytics.py)."""
+    __tablename__ = 'analytics_hourly'
+    bucket = Column(DateTime, primary_key=True)  # start of the hour, UTC
+    metric = Column(String(32), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
+class AnalyticsDaily(Base):
+    __tablename__ = 'analytics_daily'
+    bucket = Column(DateTime, primary_key=True)  # start of the day, UTC
+    metric = Column(String(32), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
+
 class PaaSProject(Base):
     __tablename__ = 'paas_projects'
     id = Column(MYSQL_INTEGER(unsigned=True), primary_key=True, index=True, autoincrement=True)
     user_id = Column(MYSQL_INTEGER(unsigned=True), ForeignKey('users.id'), nullable=True)
     repo_url = Column(String(255), nullable=False)
+    git_ref = Column(String(255), nullable=True)  # branch, tag or SHA; None = default branch
+    commit_sha = Column(String(40), nullable=True)  # commit of the last checkout
+    build_fingerprint = Column(String(64), nullable=True)  # build inputs of the current image, see paas_deploy
     name = Column(String(100), nullable=False)
     description = Column(String(500))
-    status = Column(String(20), default="pending")  # pending, deploying, running, failed, stopped
+    status = Column(String(20), default="pending")  # pending, queued, deploying, running, failed, stopped, cancelled
     project_type = Column(String(50))  # nextjs, fastapi, static
     port = Column(Integer, nullable=True)
     container_id = Column(String(100), nullable=True)
     host_url = Column(String(255), nullable=True)
     compose_code = Column(Text, nullable=True)
-    logs = Column(Text, nullable=True)
+    logs = Column(Text, nullable=True)  # legacy; deploy logs now live in Redis streams (paas_logs)
+    deploy_job_id = Column(String(64), nullable=True)  # arq job of the current/last deploy
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
     user = relationship('User')
 
+class PaaSDeployment(Base):
+    """One deploy attempt with its build timing and layer-cache stats."""
+    __tablename__ = 'paas_deployments'
+    id = Column(MYSQL_INTEGER(unsigned=True), primary_key=True, index=True, autoincrement=True)
+    project_id = Column(MYSQL_INTEGER(unsigned=True), ForeignKey('paas_projects.id', ondelete='CASCADE'), nullable=False)
+    job_id = Column(String(64))
+    commit_sha = Column(String(40))
+    project_type = Column(String(50))
+    status = Column(String(20), default="deploying")  # deploying, running, failed, cancelled
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    build_seconds = Column(Float, nullable=True)
+    build_steps = Column(Integer, nullable=True)  # Dockerfile steps BuildKit ran or reused
+    cached_steps = Column(Integer, nullable=True)  # of which served from cache
+    image_reused = Column(Boolean, default=False)  # build inputs unchanged, no build ran
+
+    __table_args__ = (
+        Index('ix_paas_deployment_project_started', 'project_id', 'started_at'),
+    )
+
 class ContactMessage(Base):
     __tablename__ = 'contact_messages'
     id = Column(MYSQL_INTEGER(unsigned=True), primary_key=True, index=True, autoincrement=True)
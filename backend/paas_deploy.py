@@ -0,0 +1,795 @@
+import asyncio
+import datetime
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from collections import deque
+from typing import Callable, Deque, List, Optional, Set
+
+import docker
+from arq.connections import ArqRedis
+from arq.jobs import Job, JobStatus, ResultNotFound
+from arq.worker import Retry
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from config import settings
+from database import AsyncSessionLocal, redis_client
+from models import PaaSDeployment, PaaSProject
+from paas_logs import append_log, clear_log
+from git_cache import MirrorCache
+
+logger = logging.getLogger("api")
+
+# PaaS deployments run as arq jobs on their own queue, consumed by the deploy
+# worker (worker.DeployWorkerSettings), so clones and image builds never run
+# in the API process and queued deploys survive restarts.
+#
+# Concurrency: before doing any work a job takes a slot in two Redis sorted
+# sets (global and per user, member = job id, score = expiry). If either is
+# full the job is deferred with Retry and picked up again later. Slots expire
+# after DEPLOY_TIMEOUT, so a worker that dies mid-deploy cannot leak one.
+#
+# Order: arq re-scores a retried job to now + defer, so its own queue is not
+# FIFO for waiting jobs. Deploys are therefore also kept in a wait list
+# scored by enqueue time, and a job may only take a free slot if no deploy
+# ahead of it in that list could take it (its user is under the per-user
+# limit). Claiming a slot removes the job from the list.
+DEPLOY_QUEUE = "arq:deploy"
+DEPLOY_FUNCTION = "deploy_project_job"
+CLEANUP_FUNCTION = "cleanup_project_job"
+# With DEPLOY_RETRY_DELAY between tries this bounds how long a deploy waits
+DEPLOY_MAX_TRIES = 1000
+ACTIVE_STATUSES = ("queued", "deploying")
+
+_GLOBAL_SLOTS_KEY = "paas:deploy:slots"
+_USER_SLOTS_PREFIX = "paas:deploy:slots:user:"
+_WAITING_KEY = "paas:deploy:waiting"
+_WAITING_USERS_KEY = "paas:deploy:waiting:users"
+_CANCEL_PREFIX = "paas:deploy:cancel:"
+
+# KEYS: global slots, wait list, wait list job -> user id
+# ARGV: now_ms, expires_ms, job_id, global limit, user limit, user id, user slots prefix
+_ACQUIRE_SLOT_LUA = """
+local now, job, user_limit, prefix = ARGV[1], ARGV[3], tonumber(ARGV[5]), ARGV[7]
+local user_key = prefix .. ARGV[6]
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+redis.call('ZREMRANGEBYSCORE', user_key, '-inf', now)
+local held = redis.call('ZSCORE', KEYS[1], job)
+if not held then
+    if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[4]) or redis.call('ZCARD', user_key) >= user_limit then
+        return 0
+    end
+    local rank = redis.call('ZRANK', KEYS[2], job)
+    if rank and rank > 0 then
+        for _, other in ipairs(redis.call('ZRANGE', KEYS[2], 0, rank - 1)) do
+            local other_key = prefix .. (redis.call('HGET', KEYS[3], other) or '0')
+            redis.call('ZREMRANGEBYSCORE', other_key, '-inf', now)
+            if redis.call('ZCARD', other_key) < user_limit then
+                return 0
+            end
+        end
+    end
+end
+redis.call('ZADD', KEYS[1], ARGV[2], job)
+redis.call('ZADD', user_key, ARGV[2], job)
+redis.call('PEXPIREAT', KEYS[1], ARGV[2])
+redis.call('PEXPIREAT', user_key, ARGV[2])
+redis.call('ZREM', KEYS[2], job)
+redis.call('HDEL', KEYS[3], job)
+return 1
+"""
+_acquire_slot_script = redis_client.register_script(_ACQUIRE_SLOT_LUA)
+
+# Try to initialize Docker client
+try:
+    docker_client = docker.from_env()
+except Exception as e:
+    docker_client = None
+    print(f"FAILED TO INIT DOCKER CLIENT: {e}")
+
+WORKSPACE_DIR = "/tmp/paas_projects"
+os.makedirs(WORKSPACE_DIR, exist_ok=True)
+
+mirror_cache = MirrorCache(os.path.join(WORKSPACE_DIR, "mirrors"),
+                           max_bytes=settings.GIT_CACHE_MAX_BYTES, max_repos=settings.GIT_CACHE_MAX_REPOS)
+
+
+class DeployCancelled(Exception):
+    pass
+
+
+def slugify(text):
+    text = text.lower()
+    text = re.sub(r'[^a-z0-9]', '_', text)
+    return re.sub(r'_+', '_', text).strip('_')
+
+def workspace_path(project_id: int) -> str:
+    return os.path.join(WORKSPACE_DIR, f"project_{project_id}")
+
+async def detect_project_type(project_dir: str) -> str:
+    """Analyze the repository files to guess what kind of app it is."""
+    files = os.listdir(project_dir)
+    if "package.json" in files:
+        # Check if NextJS
+        with open(os.path.join(project_dir, "package.json"), "r") as f:
+            content = f.read()
+            if "next" in content:
+                return "nextjs"
+        return "nodejs"
+    elif "requirements.txt" in files or "main.py" in files:
+        return "fastapi"
+    elif "index.html" in files:
+        return "static"
+    return "unknown"
+
+# ─── Dockerfile Templates ────────────────────────────────────────────────────
+# Multi-stage templates built with BuildKit. Dependency manifests are copied
+# and installed before the source, so a redeploy that only changes code
+# reuses the dependency layers; package manager caches live in cache mounts
+# that survive even when a layer is rebuilt. Bump when a template changes.
+DOCKERFILE_TEMPLATE_VERSION = 2
+
+_NODE_INSTALL = {
+    # Lockfile present: reproducible, faster npm ci
+    True: "RUN --mount=type=cache,target=/root/.npm npm ci{flags}",
+    False: "RUN --mount=type=cache,target=/root/.npm npm install{flags}",
+}
+
+_TEMPLATES = {
+    "nextjs": """# syntax=docker/dockerfile:1
+FROM node:18-alpine AS deps
+WORKDIR /app
+COPY {manifests} ./
+{install}
+
+FROM node:18-alpine AS build
+WORKDIR /app
+COPY --from=deps /app/node_modules ./node_modules
+COPY . .
+RUN npm run build
+
+FROM node:18-alpine
+WORKDIR /app
+ENV NODE_ENV=production
+COPY --from=build /app ./
+EXPOSE 3000
+CMD ["npm", "start"]
+""",
+    "nodejs": """# syntax=docker/dockerfile:1
+FROM node:18-alpine AS deps
+WORKDIR /app
+COPY {manifests} ./
+{install}
+
+FROM node:18-alpine
+WORKDIR /app
+ENV NODE_ENV=production
+COPY --from=deps /app/node_modules ./node_modules
+COPY . .
+EXPOSE 3000
+CMD ["npm", "start"]
+""",
+    "fastapi": """# syntax=docker/dockerfile:1
+FROM python:3.10-slim AS wheels
+WORKDIR /src
+COPY requirements.txt .
+RUN --mount=type=cache,target=/root/.cache/pip pip wheel --wheel-dir /wheels -r requirements.txt
+
+FROM python:3.10-slim
+WORKDIR /app
+RUN --mount=type=bind,from=wheels,source=/wheels,target=/wheels pip install --no-cache-dir --no-index --find-links /wheels /wheels/*
+COPY . .
+EXPOSE 8000
+CMD ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000"]
+""",
+    # No requirements.txt: nothing to cache, install the server only
+    "fastapi-bare": """# syntax=docker/dockerfile:1
+FROM python:3.10-slim
+WORKDIR /app
+RUN --mount=type=cache,target=/root/.cache/pip pip install uvicorn fastapi
+COPY . .
+EXPOSE 8000
+CMD ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000"]
+""",
+    "static": """FROM nginx:alpine
+COPY . /usr/share/nginx/html
+EXPOSE 80
+""",
+}
+
+# Keeps the build context small and stops unrelated files from busting COPY layers
+_DOCKERIGNORE = """.git
+node_modules
+.next
+__pycache__
+*.pyc
+.venv
+Dockerfile
+.dockerignore
+"""
+
+
+def render_dockerfile(project_type: str, project_dir: str) -> str:
+    """The generated Dockerfile for a project type, adapted to the files present."""
+    files = set(os.listdir(project_dir))
+    if project_type in ("nextjs", "nodejs"):
+        lockfile = "package-lock.json" in files
+        manifests = "package.json package-lock.json" if lockfile else "package.json"
+        # The runtime-only image skips devDependencies; Next.js needs them to build
+        flags = "" if project_type == "nextjs" else " --omit=dev"
+        install = _NODE_INSTALL[lockfile].format(flags=flags)
+        return _TEMPLATES[project_type].format(manifests=manifests, install=install)
+    if project_type == "fastapi":
+        return _TEMPLATES["fastapi" if "requirements.txt" in files else "fastapi-bare"]
+    # Fallback to simple static
+    return _TEMPLATES["static"]
+
+
+def generate_dockerfile(project_type: str, project_dir: str) -> str:
+    """Write the generated Dockerfile unless the repo has one. Returns the Dockerfile used."""
+    dockerfile_path = os.path.join(project_dir, "Dockerfile")
+    if os.path.exists(dockerfile_path):
+        # Use existing Dockerfile if any
+        with open(dockerfile_path, encoding="utf-8", errors="replace") as f:
+            return f.read()
+
+    dockerfile = render_dockerfile(project_type, project_dir)
+    with open(dockerfile_path, "w") as f:
+        f.write(dockerfile)
+    dockerignore_path = os.path.join(project_dir, ".dockerignore")
+    if not os.path.exists(dockerignore_path):
+        with open(dockerignore_path, "w") as f:
+            f.write(_DOCKERIGNORE)
+    return dockerfile
+
+
+# ─── Build Fingerprint ───────────────────────────────────────────────────────
+# Everything an image is built from: the commit, the Dockerfile actually used
+# (a generated one is not in the commit), compose_code and the template
+# version (which also covers the generated .dockerignore). Images carry it as
+# a label; a deploy whose fingerprint matches the existing image's label
+# starts a container from that image without building.
+FINGERPRINT_LABEL = "paas.build-fingerprint"
+
+
+def build_fingerprint(commit_sha: str, dockerfile: Optional[str], compose_code: Optional[str]) -> str:
+    digest = hashlib.sha256()
+    for part in (str(DOCKERFILE_TEMPLATE_VERSION), commit_sha, dockerfile or "", compose_code or ""):
+        digest.update(part.encode())
+        digest.update(b"\0")  # field separator, so inputs cannot run into each other
+    return digest.hexdigest()
+
+
+async def _image_fingerprint(image_name: str) -> Optional[str]:
+    """The fingerprint label of a local image, None if the image is gone."""
+    def labels():
+        try:
+            return docker_client.images.get(image_name).labels or {}
+        except docker.errors.ImageNotFound:
+            return {}
+    return (await asyncio.get_running_loop().run_in_executor(None, labels)).get(FINGERPRINT_LABEL)
+
+def find_available_port() -> int:
+    import socket
+    from contextlib import closing
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
+        s.bind(('', 0))
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        return s.getsockname()[1]
+
+
+# Longest single line of command output (npm and pip can print very long ones)
+_MAX_LINE_BYTES = 1024 * 1024
+
+
+class _DeployLog:
+    """Buffers output lines and appends them to the project's log stream in batches."""
+
+    BATCH_LINES = 100
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+        self._pending: List[str] = []
+        self._source = "deploy"
+        self._last_flush = time.monotonic()
+        # Last lines of command output, quoted in the error when a step fails
+        self.recent: Deque[str] = deque(maxlen=20)
+
+    async def step(self, message: str):
+        """A deploy step message, written immediately."""
+        await self.flush()
+        await append_log(self.project_id, [message])
+
+    async def output(self, line: str, source: str = "build"):
+        self.recent.append(line)
+        if source != self._source:
+            await self.flush()
+            self._source = source
+        self._pending.append(line)
+        if len(self._pending) >= self.BATCH_LINES or time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL:
+            await self.flush()
+
+    async def flush(self):
+        if self._pending:
+            lines, self._pending = self._pending, []
+            await append_log(self.project_id, lines, self._source)
+        self._last_flush = time.monotonic()
+
+
+async def _run_command(log: _DeployLog, *cmd: str, cwd: Optional[str] = None,
+                       env: Optional[dict] = None,
+                       observe: Optional[Callable[[str], None]] = None) -> int:
+    """Run a subprocess, streaming its combined output into the deploy log.
+
+    observe, if given, sees every output line. If the deploy is cancelled the
+    child is killed too.
+    """
+    log.recent.clear()
+    process = await asyncio.create_subprocess_exec(
+        *cmd, cwd=cwd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        env={**os.environ, **env} if env else None,
+        limit=_MAX_LINE_BYTES
+    )
+    try:
+        async for raw in process.stdout:
+            # Progress bars redraw with \r; keep only the final state of the line
+            line = raw.decode("utf-8", "replace").rstrip("\r\n").rsplit("\r", 1)[-1]
+            if observe:
+                observe(line)
+            await log.output(line)
+        await process.wait()
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+    finally:
+        await log.flush()
+    return process.returncode
+
+
+# BuildKit --progress=plain output: "#7 [deps 2/3] COPY package.json ./" opens
+# a Dockerfile step, "#7 CACHED" marks it as served from the layer cache.
+# Internal vertices ("#1 [internal] load build definition") carry no n/m.
+_BUILD_STEP_RE = re.compile(r"^#(\d+) \[[^\]]*\d+/\d+\]")
+_BUILD_CACHED_RE = re.compile(r"^#(\d+) CACHED\b")
+
+
+class BuildStats:
+    """Dockerfile steps seen in a BuildKit build and how many were cache hits."""
+
+    def __init__(self):
+        self.steps: Set[str] = set()
+        self.cached: Set[str] = set()
+        self.seconds = 0.0
+
+    def observe(self, line: str):
+        if match := _BUILD_STEP_RE.match(line):
+            self.steps.add(match.group(1))
+        elif match := _BUILD_CACHED_RE.match(line):
+            self.cached.add(match.group(1))
+
+    @property
+    def cached_steps(self) -> int:
+        return len(self.cached & self.steps)
+
+
+async def _build_image(log: _DeployLog, project_dir: str, image_name: str, fingerprint: str) -> BuildStats:
+    """docker build with BuildKit, reusing the project's previous image as cache.
+
+    The Docker SDK only speaks the legacy builder, which supports neither
+    cache mounts nor inline cache, so this goes through the CLI.
+    BUILDKIT_INLINE_CACHE embeds cache metadata in the image itself, so the
+    last successful deploy stays a cache source even after the builder cache
+    is pruned.
+    """
+    stats = BuildStats()
+    started = time.monotonic()
+    returncode = await _run_command(
+        log, "docker", "build", "--progress=plain",
+        "--cache-from", f"{image_name}:latest",
+        "--build-arg", "BUILDKIT_INLINE_CACHE=1",
+        "--label", f"{FINGERPRINT_LABEL}={fingerprint}",
+        "-t", image_name, ".",
+        cwd=project_dir, env={"DOCKER_BUILDKIT": "1"}, observe=stats.observe,
+    )
+    stats.seconds = time.monotonic() - started
+    if returncode != 0:
+        raise _failure("Docker build failed", log)
+    return stats
+
+
+def _failure(message: str, log: _DeployLog) -> Exception:
+    tail = "\n".join(log.recent)
+    return Exception(f"{message}:\n{tail}" if tail else message)
+
+
+# ─── Deployment ──────────────────────────────────────────────────────────────
+
+async def deploy_project(project_id: int, job_id: Optional[str] = None):
+    """Clone, build and start one project. Returns the started container, if any.
+
+    Status fields live on the row; every step message and every line of
+    git/docker output goes to the project's log stream (paas_logs). job_id is
+    checked between steps: a cancel request stops the deploy at the next step
+    boundary even while a build runs in a thread that cannot be interrupted.
+    """
+    container = None
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id))
+        project = result.scalar_one_or_none()
+
+        if not project:
+            return
+
+        log = _DeployLog(project_id)
+
+        async def checkpoint():
+            if job_id and await redis_client.exists(f"{_CANCEL_PREFIX}{job_id}"):
+                raise DeployCancelled()
+
+        resumed = project.status == "deploying"
+        project.status = "deploying"
+        deployment = await _deployment_record(db, project_id, job_id)
+
+        async def finish(status: str):
+            project.status = deployment.status = status
+            deployment.finished_at = datetime.datetime.utcnow()
+            await db.commit()
+
+        await db.commit()
+        await log.step("Resuming deployment after worker restart..." if resumed else "Starting deployment...")
+
+        try:
+            if not docker_client:
+                raise Exception("Docker client is not available on the server.")
+
+            project_dir = workspace_path(project_id)
+
+            # 1. Fetch Repo (cached mirror + shallow checkout)
+            await log.step(f"Fetching {project.repo_url} ({project.git_ref or 'default branch'})...")
+            await checkpoint()
+
+            try:
+                sha = await mirror_cache.checkout(project.repo_url, project.git_ref, project_dir,
+                                                  log=lambda line: log.output(line, source="git"))
+            finally:
+                await log.flush()
+            project.commit_sha = deployment.commit_sha = sha
+            await db.commit()
+
+            await log.step(f"Checked out {sha[:12]}.")
+            await checkpoint()
+
+            # Handle Docker Compose if provided
+            if project.compose_code:
+                await log.step("Docker Compose code provided. Using compose orchestration...")
+                compose_path = os.path.join(project_dir, "docker-compose.yml")
+                with open(compose_path, "w") as f:
+                    f.write(project.compose_code)
+
+                # We use subprocess to run docker compose
+                # Note: This requires 'docker-compose' or 'docker compose' available
+                # If 'docker compose' fails, we'll try 'docker-compose'
+                project_slug = slugify(project.name)
+                fingerprint = build_fingerprint(sha, None, project.compose_code)
+                # Unchanged inputs: let compose reuse its images (it still builds missing ones)
+                up = ["up", "-d"] if fingerprint == project.build_fingerprint else ["up", "-d", "--build"]
+                deployment.image_reused = fingerprint == project.build_fingerprint
+                try:
+                    returncode = await _run_command(log, "docker", "compose", "-p", project_slug, *up, cwd=project_dir)
+                    if returncode != 0:
+                         # Try legacy docker-compose
+                        returncode = await _run_command(log, "docker-compose", "-p", project_slug, *up, cwd=project_dir)
+
+                    if returncode != 0:
+                        raise _failure("Docker Compose failed", log)
+
+                    project.build_fingerprint = fingerprint
+                    await finish("running")
+                    await log.step(f"Docker Compose services started with project name: {project_slug}")
+                    return # Exit early as we're done with compose
+                except Exception as comp_e:
+                    raise Exception(f"Compose orchestration failed: {str(comp_e)}")
+
+            # 2. Detect & Generate Dockerfile (Single Container Flow)
+            await log.step("Detecting project type...")
+            ptype = await detect_project_type(project_dir)
+            project.project_type = deployment.project_type = ptype
+            await db.commit()
+            dockerfile = generate_dockerfile(ptype, project_dir)
+            fingerprint = build_fingerprint(sha, dockerfile, project.compose_code)
+            image_name = f"paas_app_{project_id}"
+
+            # 3. Build Docker Image, unless the current image was built from the same inputs
+            if await _image_fingerprint(image_name) == fingerprint:
+                deployment.image_reused = True
+                await log.step(f"Detected project type: {ptype}. Build inputs unchanged, "
+                               f"reusing image {image_name}. Starting container...")
+            else:
+                await log.step(f"Detected project type: {ptype}. Building Docker image...")
+                await checkpoint()
+
+                stats = await _build_image(log, project_dir, image_name, fingerprint)
+                deployment.build_seconds = round(stats.seconds, 2)
+                deployment.build_steps = len(stats.steps)
+                deployment.cached_steps = stats.cached_steps
+                await log.step(f"Docker image built in {stats.seconds:.1f}s "
+                               f"({stats.cached_steps}/{len(stats.steps)} steps cached). Starting container...")
+            project.build_fingerprint = fingerprint
+            await db.commit()
+            await checkpoint()
+
+            # 4. Run Docker Container
+            target_port = 3000 if ptype in ["nextjs", "nodejs"] else (8000 if ptype == "fastapi" else 80)
+            host_port = find_available_port()
+            container_name = slugify(project.name)
+
+            # Remove old container with same name if exists
+            try:
+                old = docker_client.containers.get(container_name)
+                old.stop()
+                old.remove()
+            except:
+                pass
+
+            def run_container():
+                return docker_client.containers.run(
+                    image_name,
+                    name=container_name,
+                    detach=True,
+                    ports={f"{target_port}/tcp": host_port},
+                    # Security boundaries
+                    mem_limit="256m",
+                    cpu_quota=50000,
+                    restart_policy={"Name": "on-failure", "MaximumRetryCount": 3}
+                )
+
+            loop = asyncio.get_running_loop()
+            container = await loop.run_in_executor(None, run_container)
+
+            project.container_id = container.id
+            project.port = host_port
+            project.status = "running"
+            project.host_url = f"http://localhost:{host_port}"
+            await finish("running")
+            await log.step(f"Container '{container_name}' started successfully! Running on port {host_port}.")
+
+        except DeployCancelled:
+            await finish("cancelled")
+            await log.step("Deployment cancelled.")
+        except asyncio.CancelledError:
+            # Aborted through the API, or the worker is shutting down (arq
+            # re-queues the job then, and the next run resumes it)
+            if job_id and await redis_client.exists(f"{_CANCEL_PREFIX}{job_id}"):
+                await finish("cancelled")
+                message = "Deployment cancelled."
+            else:
+                # The resumed run picks this deployment row up again
+                project.status = "queued"
+                await db.commit()
+                message = "Worker stopped; deployment will resume."
+            await log.step(message)
+            raise
+        except Exception as e:
+            await finish("failed")
+            await log.step(f"ERROR: {str(e)}")
+    return container
+
+
+async def log_startup_output(project_id: int, container):
+    """Append the container's first output as "runtime" lines, so a crash on
+    boot shows up next to the build log. Runs after the deploy slot and DB
+    session are released; never raises.
+    """
+    await asyncio.sleep(settings.PAAS_LOG_STARTUP_SECONDS)
+    try:
+        loop = asyncio.get_running_loop()
+        output = await loop.run_in_executor(None, lambda: container.logs(tail=200))
+    except Exception as e:
+        logger.warning(f"Could not read startup output for project {project_id}: {e}")
+        return
+    await append_log(project_id, output.decode("utf-8", "replace").splitlines(), source="runtime")
+
+
+async def _deployment_record(db: AsyncSession, project_id: int, job_id: Optional[str]) -> PaaSDeployment:
+    """The history row for this deploy; a job resumed after a worker restart keeps its row."""
+    if job_id:
+        result = await db.execute(
+            select(PaaSDeployment)
+            .filter(PaaSDeployment.project_id == project_id, PaaSDeployment.job_id == job_id)
+            .order_by(PaaSDeployment.id.desc())
+            .limit(1)
+        )
+        deployment = result.scalar_one_or_none()
+        if deployment:
+            deployment.status = "deploying"
+            return deployment
+    deployment = PaaSDeployment(project_id=project_id, job_id=job_id, status="deploying")
+    db.add(deployment)
+    return deployment
+
+
+# ─── Queue ───────────────────────────────────────────────────────────────────
+
+async def _acquire_slot(job_id: str, user_id: Optional[int]) -> bool:
+    now = int(time.time() * 1000)
+    acquired = await _acquire_slot_script(
+        keys=[_GLOBAL_SLOTS_KEY, _WAITING_KEY, _WAITING_USERS_KEY],
+        args=[now, now + settings.DEPLOY_TIMEOUT * 1000, job_id,
+              settings.DEPLOY_MAX_CONCURRENT, settings.DEPLOY_MAX_PER_USER,
+              user_id or 0, _USER_SLOTS_PREFIX],
+    )
+    return bool(acquired)
+
+
+async def _join_queue(job_id: str, user_id: Optional[int]):
+    """Add a deploy to the wait list; a job already in it keeps its place."""
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zadd(_WAITING_KEY, {job_id: int(time.time() * 1000)}, nx=True)
+        pipe.hset(_WAITING_USERS_KEY, job_id, user_id or 0)
+        await pipe.execute()
+
+
+async def _leave_queue(job_id: str):
+    async with redis_client.pipeline(transaction=True) as pipe:
+        pipe.zrem(_WAITING_KEY, job_id)
+        pipe.hdel(_WAITING_USERS_KEY, job_id)
+        await pipe.execute()
+
+
+async def _release_slot(job_id: str, user_id: Optional[int]):
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.zrem(_GLOBAL_SLOTS_KEY, job_id)
+        pipe.zrem(f"{_USER_SLOTS_PREFIX}{user_id or 0}", job_id)
+        await pipe.execute()
+
+
+async def deploy_project_job(ctx, project_id: int, user_id: Optional[int] = None):
+    """arq entry point: take a slot (or wait for one), then deploy.
+
+    The slot is claimed before anything else is awaited so jobs fetched in the
+    same poll compete in queue order.
+    """
+    job_id = ctx["job_id"]
+    if not await _acquire_slot(job_id, user_id):
+        if ctx.get("job_try", 1) < DEPLOY_MAX_TRIES:
+            raise Retry(defer=settings.DEPLOY_RETRY_DELAY)
+        # arq would drop the job without calling us again, leaving the row queued
+        await _leave_queue(job_id)
+        await _give_up(project_id, job_id)
+        return {"status": "failed", "error": "No deploy slot became free"}
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(select(PaaSProject.status, PaaSProject.deploy_job_id)
+                                      .filter(PaaSProject.id == project_id))
+            row = result.first()
+        # Superseded (a newer deploy was queued), cancelled or deleted meanwhile
+        if row is None or row.deploy_job_id != job_id or row.status not in ACTIVE_STATUSES:
+            return {"status": "skipped"}
+        container = await deploy_project(project_id, job_id)
+    finally:
+        await _release_slot(job_id, user_id)
+    if container is not None:
+        await log_startup_output(project_id, container)
+    return {"status": "done"}
+
+
+async def _give_up(project_id: int, job_id: str):
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id))
+        project = result.scalar_one_or_none()
+        if project is None or project.deploy_job_id != job_id or project.status != "queued":
+            return
+        project.status = "failed"
+        await db.commit()
+    await append_log(project_id, ["ERROR: Gave up waiting for a free deploy slot. Start the deployment again."])
+
+
+async def enqueue_deploy(db: AsyncSession, pool: ArqRedis, project: PaaSProject) -> str:
+    """Mark project queued under a new job id, commit, then enqueue the job.
+
+    Committing first matters: the worker skips jobs whose id does not match
+    the row, and may pick the job up before an uncommitted row is visible.
+    """
+    job_id = f"deploy-{project.id}-{uuid.uuid4().hex[:12]}"
+    project.status = "queued"
+    project.deploy_job_id = job_id
+    await db.commit()
+    await clear_log(project.id)
+    await append_log(project.id, ["Waiting in the deploy queue..."])
+    await _join_queue(job_id, project.user_id)
+    await pool.enqueue_job(DEPLOY_FUNCTION, project.id, project.user_id, _job_id=job_id, _queue_name=DEPLOY_QUEUE)
+    return job_id
+
+
+async def queue_position(job_id: Optional[str]) -> Optional[int]:
+    """1-based position in the wait list, or None if not waiting."""
+    if not job_id:
+        return None
+    rank = await redis_client.zrank(_WAITING_KEY, job_id)
+    return None if rank is None else rank + 1
+
+
+async def cancel_deploy(pool: ArqRedis, job_id: Optional[str]):
+    """Flag the job as cancelled and ask arq to abort it (queued or running)."""
+    if not job_id:
+        return
+    await redis_client.set(f"{_CANCEL_PREFIX}{job_id}", "1", ex=settings.DEPLOY_TIMEOUT)
+    await _leave_queue(job_id)
+    try:
+        await Job(job_id, pool, _queue_name=DEPLOY_QUEUE).abort(timeout=0)
+    except (asyncio.TimeoutError, ResultNotFound):
+        pass  # not finished yet; the worker cancels it on its next poll
+
+
+async def enqueue_cleanup(pool: ArqRedis, project: PaaSProject):
+    """Queue removal of a deleted project's workspace and image.
+
+    Workspaces live on the deploy worker, not in the API container, so the
+    cleanup runs there as a job on the deploy queue.
+    """
+    await pool.enqueue_job(CLEANUP_FUNCTION, project.id, project.deploy_job_id, _queue_name=DEPLOY_QUEUE)
+
+
+async def cleanup_project_job(ctx, project_id: int, deploy_job_id: Optional[str] = None):
+    """arq entry point: delete a project's workspace and image.
+
+    Waits while the project's last deploy still holds a slot, since a
+    cancelled build only stops at its next step boundary.
+    """
+    if deploy_job_id and await redis_client.zscore(_GLOBAL_SLOTS_KEY, deploy_job_id) is not None:
+        raise Retry(defer=settings.DEPLOY_RETRY_DELAY)
+    workspace = workspace_path(project_id)
+    if os.path.exists(workspace):
+        await asyncio.to_thread(shutil.rmtree, workspace, True)
+    if docker_client:
+        def remove_image():
+            try:
+                docker_client.images.remove(f"paas_app_{project_id}", force=True)
+            except docker.errors.ImageNotFound:
+                pass
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, remove_image)
+        except Exception as e:
+            logger.warning(f"Could not remove image of deleted project {project_id}: {e}")
+    return {"status": "done"}
+
+
+async def resume_orphaned_deploys(pool: ArqRedis) -> int:
+    """Re-queue active deploys whose arq job is gone (e.g. Redis was flushed).
+
+    Jobs that were merely interrupted are still in the queue and arq re-runs
+    them on its own; this covers the rest. Also drops wait list entries whose
+    deploy is no longer queued, so they cannot hold up the jobs behind them.
+    Returns the number re-queued.
+    """
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(PaaSProject.id, PaaSProject.user_id, PaaSProject.deploy_job_id,
+                                         PaaSProject.status)
+                                  .filter(PaaSProject.status.in_(ACTIVE_STATUSES)))
+        rows = result.all()
+    queued = {row.deploy_job_id for row in rows if row.status == "queued"}
+    for job_id in await redis_client.zrange(_WAITING_KEY, 0, -1):
+        if job_id not in queued:
+            await _leave_queue(job_id)
+    resumed = 0
+    for project_id, user_id, job_id, status in rows:
+        if not job_id:
+            continue
+        if await Job(job_id, pool, _queue_name=DEPLOY_QUEUE).status() == JobStatus.not_found:
+            if status == "queued":
+                await _join_queue(job_id, user_id)
+            # Same job id: concurrent resumes from several workers collapse into one job
+            await pool.enqueue_job(DEPLOY_FUNCTION, project_id, user_id, _job_id=job_id, _queue_name=DEPLOY_QUEUE)
+            resumed += 1
+    if resumed:
+        logger.info(f"Re-queued {resumed} orphaned deployments")
+    return resumed
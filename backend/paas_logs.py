@@ -0,0 +1,90 @@
+import asyncio
+import json
+import logging
+from typing import AsyncIterator, Iterable, List, Optional
+
+from config import settings
+from database import redis_client
+
+logger = logging.getLogger("api")
+
+# Deploy logs live in one Redis stream per project. Writers only append
+# (XADD with an approximate MAXLEN cap), so a log line costs the same no
+# matter how long the log already is, and readers resume from the last
+# entry id they saw. A new deploy starts a fresh stream.
+LOG_PREFIX = "paas:logs:"
+# Seconds between reads while tailing; polling keeps no pooled connection
+# parked in a blocking XREAD per viewer
+TAIL_POLL_INTERVAL = 0.5
+# How long a tail connection stays open while the deploy is idle
+TAIL_IDLE_TIMEOUT = 300
+# Keepalive interval so proxies do not drop an idle tail
+TAIL_HEARTBEAT_INTERVAL = 15
+
+
+def _key(project_id: int) -> str:
+    return f"{LOG_PREFIX}{project_id}"
+
+
+async def append_log(project_id: int, lines: Iterable[str], source: str = "deploy"):
+    """Append lines in one round trip. Never raises: logging must not fail a deploy."""
+    lines = [line.rstrip("\r\n") for line in lines]
+    if not lines:
+        return
+    key = _key(project_id)
+    try:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            for line in lines:
+                pipe.xadd(key, {"s": source, "l": line}, maxlen=settings.PAAS_LOG_MAX_LINES, approximate=True)
+            pipe.expire(key, settings.PAAS_LOG_TTL_DAYS * 86400)
+            await pipe.execute()
+    except Exception as e:
+        logger.error(f"Failed to append deploy log for project {project_id}: {e}")
+
+
+async def clear_log(project_id: int):
+    await redis_client.delete(_key(project_id))
+
+
+async def read_log(project_id: int, after: Optional[str] = None, count: int = 1000) -> List[dict]:
+    """Entries after the given stream id (from the start if None), oldest first."""
+    start = f"({after}" if after else "-"
+    entries = await redis_client.xrange(_key(project_id), min=start, max="+", count=count)
+    return [_entry(entry_id, fields) for entry_id, fields in entries]
+
+
+def _entry(entry_id: str, fields: dict) -> dict:
+    return {"id": entry_id, "source": fields.get("s", "deploy"), "line": fields.get("l", "")}
+
+
+async def tail_log(project_id: int, after: Optional[str] = None) -> AsyncIterator[Optional[dict]]:
+    """Yield entries as they arrive, starting after `after`.
+
+    Yields None as a heartbeat every TAIL_HEARTBEAT_INTERVAL idle seconds and
+    stops after TAIL_IDLE_TIMEOUT without new lines.
+    """
+    idle = 0.0
+    since_heartbeat = 0.0
+    while True:
+        entries = await read_log(project_id, after)
+        for entry in entries:
+            after = entry["id"]
+            yield entry
+        if entries:
+            idle = since_heartbeat = 0.0
+            continue
+        if idle >= TAIL_IDLE_TIMEOUT:
+            return
+        if since_heartbeat >= TAIL_HEARTBEAT_INTERVAL:
+            since_heartbeat = 0.0
+            yield None
+        await asyncio.sleep(TAIL_POLL_INTERVAL)
+        idle += TAIL_POLL_INTERVAL
+        since_heartbeat += TAIL_POLL_INTERVAL
+
+
+def sse_event(entry: Optional[dict]) -> str:
+    """Format an entry (or a None heartbeat) as a server-sent event."""
+    if entry is None:
+        return ": keepalive\n\n"
+    return f"id: {entry['id']}\ndata: {json.dumps(entry, ensure_ascii=False)}\n\n"
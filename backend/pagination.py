@@ -0,0 +1,51 @@
+import base64
+import datetime
+import json
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+# Opaque keyset cursors over (date, id), newest first. The token is the
+# base64url-encoded [iso_date, id] of the last row on the previous page.
+# date is nullable: rows without one sort after every dated row (where MySQL
+# and SQLite put NULLs in a descending sort) and are paged by id alone.
+
+
+def encode_cursor(date: Optional[datetime.datetime], row_id: int) -> str:
+    raw = json.dumps([date.isoformat() if date else None, row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[Optional[datetime.datetime], int]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        date_str, row_id = json.loads(raw)
+        return (datetime.datetime.fromisoformat(date_str) if date_str is not None else None), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_keyset(query, model, cursor: Optional[str], limit: int):
+    """Order by (date, id) descending and start after the cursor row.
+
+    Fetches limit + 1 rows so the caller can tell whether another page exists.
+    """
+    if cursor:
+        date, row_id = decode_cursor(cursor)
+        if date is None:
+            query = query.filter(model.date.is_(None), model.id < row_id)
+        else:
+            query = query.filter(or_(model.date < date, and_(model.date == date, model.id < row_id),
+                                     model.date.is_(None)))
+    return query.order_by(model.date.desc(), model.id.desc()).limit(limit + 1)
+
+
+def page_of(rows, limit: int):
+    """Split a limit + 1 result into (items, next_cursor)."""
+    items = list(rows[:limit])
+    next_cursor = None
+    if len(rows) > limit and items:
+        last = items[-1]
+        next_cursor = encode_cursor(last.date, last.id)
+    return items, next_cursor
@@ -0,0 +1,111 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload
+
+import events
+from config import settings
+from database import redis_client
+from models import User, UserRole
+
+logger = logging.getLogger("api")
+
+PRINCIPAL_CHANNEL = "events:principal"
+LOCAL_MAX_ENTRIES = 10000
+
+
+@dataclass
+class Principal:
+    """The slice of a user that authentication and RBAC checks need."""
+    id: int
+    username: str
+    display_name: str
+    is_active: bool
+    roles: List[str] = field(default_factory=list)
+
+
+# Two tiers: a short-lived per-worker LRU in front of a shared Redis copy.
+_local: "OrderedDict[int, Tuple[float, Principal]]" = OrderedDict()
+
+
+def _redis_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+
+def _remember_local(principal: Principal):
+    _local[principal.id] = (time.monotonic() + settings.PRINCIPAL_LOCAL_TTL_SECONDS, principal)
+    _local.move_to_end(principal.id)
+    while len(_local) > LOCAL_MAX_ENTRIES:
+        _local.popitem(last=False)
+
+
+def _from_local(user_id: int) -> Optional[Principal]:
+    entry = _local.get(user_id)
+    if not entry:
+        return None
+    expires_at, principal = entry
+    if expires_at < time.monotonic():
+        _local.pop(user_id, None)
+        return None
+    return principal
+
+
+async def get_principal(db: AsyncSession, user_id: int) -> Optional[Principal]:
+    principal = _from_local(user_id)
+    if principal:
+        return principal
+
+    try:
+        data = await redis_client.get(_redis_key(user_id))
+        if data:
+            principal = Principal(**json.loads(data))
+            _remember_local(principal)
+            return principal
+    except Exception as e:
+        logger.error(f"Principal cache read failed for user {user_id}: {e}")
+
+    result = await db.execute(
+        select(User).options(selectinload(User.roles).selectinload(UserRole.role)).filter(User.id == user_id)
+    )
+    user = result.scalar_one_or_none()
+    if not user:
+        return None
+
+    principal = Principal(
+        id=user.id,
+        username=user.username,
+        display_name=user.display_name,
+        is_active=bool(user.is_active),
+        roles=[ur.role.slug for ur in user.roles] if user.roles else [],
+    )
+    _remember_local(principal)
+    try:
+        await redis_client.set(_redis_key(user_id), json.dumps(asdict(principal)), ex=settings.PRINCIPAL_CACHE_TTL_SECONDS)
+    except Exception as e:
+        logger.error(f"Principal cache write failed for user {user_id}: {e}")
+    return principal
+
+
+async def invalidate_principal(user_id: int):
+    """Drop a cached principal everywhere after its roles, status or password change."""
+    _local.pop(user_id, None)
+    try:
+        await redis_client.delete(_redis_key(user_id))
+        await events.publish(PRINCIPAL_CHANNEL, {"user_id": user_id})
+    except Exception as e:
+        logger.error(f"Principal cache invalidation failed for user {user_id}: {e}")
+
+
+async def _on_principal_event(payload: dict):
+    user_id = payload.get("user_id")
+    if user_id is not None:
+        _local.pop(int(user_id), None)
+
+
+events.subscribe(PRINCIPAL_CHANNEL, _on_principal_event)
@@ -7,21 +7,25 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import joinedload
 import psutil
 
-from database import get_db, redis_client
+from database import get_db, redis_client, get_redis_pool_stats
 from models import User, Role, UserRole, Permission, RolePermission, Comment, AuditLog, ContactMessage
 from schemas import UserCreate, UserOut, RoleCreate, AuditLogOut, CommentOut, ContactOut
-from security import get_password_hash
+from security import get_password_hash_async, get_hash_pool_stats
+from imaging import get_image_pool_stats
 from deps import get_current_user, requires_role, log_audit, check_ip_whitelist
+from principals import Principal, invalidate_principal
+from cache import get_cache_stats
+import maintenance
 
 router = APIRouter(prefix="/api/admin", tags=["admin"])
 
 
 
 @router.post("/users", response_model=UserOut)
-async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def create_user(user: UserCreate, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     # check_ip_whitelist(request)
     try:
-        hashed = get_password_hash(user.password)
+        hashed = await get_password_hash_async(user.password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     new_user = User(username=user.username, email=user.email, password_hash=hashed, display_name=user.display_name, is_active=True)
@@ -37,11 +41,12 @@ async def create_user(user: UserCreate, request: Request, db: AsyncSession = Dep
             if role:
                 db.add(UserRole(user_id=new_user.id, role_id=role.id))
         await db.commit()
+        await invalidate_principal(new_user.id)
     
     return UserOut.model_validate(new_user)
 
 @router.post("/roles")
-async def create_role(role: RoleCreate, request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def create_role(role: RoleCreate, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     # check_ip_whitelist(request)
     result = await db.execute(select(Role).filter(Role.name == role.name))
     if result.scalar_one_or_none():
@@ -53,7 +58,7 @@ async def create_role(role: RoleCreate, request: Request, db: AsyncSession = Dep
     return {"id": new_role.id, "name": new_role.name, "description": new_role.description}
 
 @router.post("/roles/{role_id}/permissions")
-async def assign_permission_to_role(role_id: int, permission_name: str, request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def assign_permission_to_role(role_id: int, permission_name: str, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     # check_ip_whitelist(request)
     result = await db.execute(select(Role).filter(Role.id == role_id))
     role = result.scalar_one_or_none()
@@ -77,7 +82,7 @@ async def assign_permission_to_role(role_id: int, permission_name: str, request:
     return {"role_id": role_id, "permission": permission_name}
 
 @router.get("/comments", response_model=List[CommentOut])
-async def get_all_comments(status: Optional[str] = None, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def get_all_comments(status: Optional[str] = None, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     query = select(Comment).options(joinedload(Comment.user)).order_by(Comment.created_at.desc())
     if status == 'pending':
         query = query.filter(Comment.is_approved == False)
@@ -88,44 +93,48 @@ async def get_all_comments(status: Optional[str] = None, db: AsyncSession = Depe
     return result.unique().scalars().all()
 
 @router.get("/audit-logs", response_model=List[AuditLogOut])
-async def get_audit_logs(request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def get_audit_logs(request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     # check_ip_whitelist(request)
     result = await db.execute(select(AuditLog).order_by(AuditLog.timestamp.desc()))
     return result.scalars().all()
 
 @router.get("/system-status")
-async def get_system_status(current: User = Depends(requires_role('admin'))):
+async def get_system_status(current: Principal = Depends(requires_role('admin'))):
     return {
         "cpu": psutil.cpu_percent(),
         "memory": psutil.virtual_memory().percent,
         "disk": psutil.disk_usage('/').percent,
         "uptime": time.time() - psutil.boot_time(),
-        "maintenance_mode": redis_client.get("maintenance_mode") == "true"
+        "maintenance_mode": maintenance.is_enabled(),
+        "redis_pool": get_redis_pool_stats(),
+        "password_hashing": get_hash_pool_stats(),
+        "image_pool": get_image_pool_stats(),
+        "cache": get_cache_stats()
     }
 
 @router.post("/maintenance")
-async def toggle_maintenance(enable: bool, current: User = Depends(requires_role('admin'))):
-    redis_client.set("maintenance_mode", "true" if enable else "false")
+async def toggle_maintenance(enable: bool, current: Principal = Depends(requires_role('admin'))):
+    await maintenance.set_enabled(enable)
     return {"status": "success", "maintenance": enable}
 
 # ─── Skills Management ───────────────────────────────────────────────────────
 
 @router.get("/skills")
-async def get_skills_admin(current: User = Depends(requires_role('admin'))):
-    data = redis_client.get("skills_data")
+async def get_skills_admin(current: Principal = Depends(requires_role('admin'))):
+    data = await redis_client.get("skills_data")
     return json.loads(data) if data else []
 
 @router.put("/skills")
-async def update_skills(request: Request, current: User = Depends(requires_role('admin'))):
+async def update_skills(request: Request, current: Principal = Depends(requires_role('admin'))):
     body = await request.json()
-    redis_client.set("skills_data", json.dumps(body))
+    await redis_client.set("skills_data", json.dumps(body))
     return {"status": "ok"}
 
 # ─── About / Profile Management ──────────────────────────────────────────────
 
 @router.get("/about")
-async def get_about(current: User = Depends(requires_role('admin'))):
-    data = redis_client.get("about_data")
+async def get_about(current: Principal = Depends(requires_role('admin'))):
+    data = await redis_client.get("about_data")
     if data:
         return json.loads(data)
     return {
@@ -142,20 +151,20 @@ async def get_about(current: User = Depends(requires_role('admin'))):
     }
 
 @router.put("/about")
-async def update_about(request: Request, current: User = Depends(requires_role('admin'))):
+async def update_about(request: Request, current: Principal = Depends(requires_role('admin'))):
     body = await request.json()
-    redis_client.set("about_data", json.dumps(body))
+    await redis_client.set("about_data", json.dumps(body))
     return {"status": "ok"}
 
 # ─── Contact Messages Management ─────────────────────────────────────────────
 
 @router.get("/contact-messages", response_model=List[ContactOut])
-async def get_contact_messages(db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def get_contact_messages(db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     result = await db.execute(select(ContactMessage).order_by(ContactMessage.created_at.desc()))
     return result.scalars().all()
 
 @router.patch("/contact-messages/{msg_id}/read")
-async def mark_message_as_read(msg_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def mark_message_as_read(msg_id: int, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     result = await db.execute(select(ContactMessage).filter(ContactMessage.id == msg_id))
     msg = result.scalar_one_or_none()
     if not msg:
@@ -165,7 +174,7 @@ async def mark_message_as_read(msg_id: int, db: AsyncSession = Depends(get_db),
     return {"status": "ok"}
 
 @router.delete("/contact-messages/{msg_id}")
-async def delete_contact_message(msg_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def delete_contact_message(msg_id: int, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     result = await db.execute(select(ContactMessage).filter(ContactMessage.id == msg_id))
     msg = result.scalar_one_or_none()
     if not msg:
@@ -9,19 +9,20 @@ from database import get_db, redis_client
 from models import User, Role, UserRole
 from schemas import UserCreate, UserOut, LoginRequest
 from auth import create_access_token, create_refresh_token, decode_token, verify_totp
-from security import get_password_hash, verify_password
-from deps import get_current_user, log_audit
+from deps import get_current_user, get_current_principal, log_audit
+from principals import Principal, get_principal, invalidate_principal
 from config import settings
+import analytics
 
 logger = logging.getLogger("api")
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
-from security import get_password_hash, verify_password, validate_password
+from security import get_password_hash_async, verify_password_async, password_needs_rehash, validate_password
 
 @router.post("/register", response_model=UserOut)
 async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     try:
-        hashed_pw = get_password_hash(user.password)
+        hashed_pw = await get_password_hash_async(user.password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -39,6 +40,7 @@ async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
     db.add(new_user)
     await db.commit()
     await db.refresh(new_user)
+    await analytics.record("signups")
     
     res = await db.execute(select(Role).filter(Role.slug == 'viewer'))
     role = res.scalar_one_or_none()
@@ -76,8 +78,11 @@ async def login(req: LoginRequest, request: Request, response: Response, db: Asy
         raise HTTPException(status_code=403, detail="Account locked. Try again later.")
 
     authenticated_user = None
-    if user and verify_password(req.password, user.password_hash):
+    if user and await verify_password_async(req.password, user.password_hash):
         authenticated_user = user
+        if password_needs_rehash(user.password_hash):
+            # Argon2 parameters were retuned; upgrade the stored hash on a successful login
+            user.password_hash = await get_password_hash_async(req.password, enforce_policy=False)
     
     if not authenticated_user:
         if user:
@@ -108,7 +113,7 @@ async def login(req: LoginRequest, request: Request, response: Response, db: Asy
     access_token = create_access_token(data=token_payload)
     refresh_token = create_refresh_token(data=token_payload)
     
-    redis_client.set(f"refresh:{user_id}", refresh_token, ex=datetime.timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    await redis_client.set(f"refresh:{user_id}", refresh_token, ex=datetime.timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
 
     response.set_cookie(key="access_token", value=access_token, httponly=True, max_age=15 * 60, samesite="lax", secure=False)
     response.set_cookie(key="refresh_token", value=refresh_token, httponly=True, max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600, samesite="lax", secure=False)
@@ -127,24 +132,23 @@ async def refresh_token_route(request: Request, response: Response, db: AsyncSes
         raise HTTPException(status_code=401, detail="Invalid refresh token")
     
     user_id = payload.get("sub")
-    stored_token = redis_client.get(f"refresh:{user_id}")
+    stored_token = await redis_client.get(f"refresh:{user_id}")
     if stored_token != refresh_token:
-        redis_client.delete(f"refresh:{user_id}")
+        await redis_client.delete(f"refresh:{user_id}")
         from auth import revoke_token
-        revoke_token(refresh_token, 7 * 24 * 3600)  # blacklist leaked refresh token
+        await revoke_token(refresh_token, 7 * 24 * 3600)  # blacklist leaked refresh token
         raise HTTPException(status_code=401, detail="Session expired due to security violation")
 
-    result = await db.execute(select(User).options(selectinload(User.roles).selectinload(UserRole.role)).filter(User.id == int(user_id)))
-    user = result.scalar_one_or_none()
+    user = await get_principal(db, int(user_id))
     if not user or not user.is_active:
         raise HTTPException(status_code=401, detail="User inactive")
 
-    user_roles = [ur.role.slug for ur in user.roles]
+    user_roles = user.roles
     new_payload = {"sub": str(user.id), "roles": user_roles}
     new_access = create_access_token(data=new_payload)
     new_refresh = create_refresh_token(data=new_payload)
     
-    redis_client.set(f"refresh:{user.id}", new_refresh, ex=datetime.timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
+    await redis_client.set(f"refresh:{user.id}", new_refresh, ex=datetime.timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS))
 
     response.set_cookie(key="access_token", value=new_access, httponly=True, max_age=15 * 60, samesite="lax", secure=False)
     response.set_cookie(key="refresh_token", value=new_refresh, httponly=True, max_age=settings.REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600, samesite="lax", secure=False)
@@ -163,7 +167,7 @@ async def read_current_user(current: User = Depends(get_current_user)):
     )
 
 @router.post("/logout")
-def logout(request: Request, response: Response, user: User = Depends(get_current_user)):
+async def logout(request: Request, response: Response, user: Principal = Depends(get_current_principal)):
     authorization = request.headers.get("Authorization")
     if authorization and authorization.startswith("Bearer "):
         access_token = authorization.split(" ")[1]
@@ -172,7 +176,7 @@ def logout(request: Request, response: Response, user: User = Depends(get_curren
         
     if access_token:
         from auth import revoke_token
-        revoke_token(access_token)
+        await revoke_token(access_token)
     
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
@@ -183,7 +187,7 @@ from schemas import MFASetupResponse, PasswordChangeRequest
 from auth import generate_totp_secret, get_totp_uri
 
 @router.post("/mfa/setup", response_model=MFASetupResponse)
-async def setup_mfa(current: User = Depends(get_current_user)):
+async def setup_mfa(current: Principal = Depends(get_current_principal)):
     secret = generate_totp_secret()
     uri = get_totp_uri(secret, current.username)
     return MFASetupResponse(secret=secret, qr_code_uri=uri)
@@ -221,13 +225,14 @@ async def disable_mfa(req: dict, request: Request, db: AsyncSession = Depends(ge
 
 @router.post("/password/change")
 async def change_password(req: PasswordChangeRequest, request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
-    if not verify_password(req.old_password, current.password_hash):
+    if not await verify_password_async(req.old_password, current.password_hash):
         raise HTTPException(status_code=400, detail="Old password incorrect")
     
     try:
-        current.password_hash = get_password_hash(req.new_password)
+        current.password_hash = await get_password_hash_async(req.new_password)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     await db.commit()
+    await invalidate_principal(current.id)
     await log_audit(db, current.id, "PASSWORD_CHANGED", "auth", request)
     return {"status": "success"}
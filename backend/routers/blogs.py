@@ -1,40 +1,48 @@
 import datetime
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import defer
 
-from database import get_db
+from database import get_db, AsyncSessionLocal
 from models import Blog, User
-from schemas import BlogCreate, BlogOut
-from deps import get_current_user, requires_role, get_cache, set_cache, invalidate_blog_cache, log_audit
+from schemas import BlogCreate, BlogOut, BlogSummaryOut, BlogPage
+from pagination import apply_keyset, page_of
+from search import notify_content_changed
+from deps import get_current_user, requires_role, log_audit
+from cache import get_cache, set_cache, get_or_compute, cached_json_response, serialize_json, invalidate_tags
+from principals import Principal
+from assets import sync_owner_references, drop_references
 
 router = APIRouter(prefix="/api/blogs", tags=["blogs"])
 
-@router.get("", response_model=List[BlogOut])
-async def get_blogs(cursor: int = None, limit: int = 10, include_drafts: bool = False, db: AsyncSession = Depends(get_db)):
-    cache_key = f"blogs_c{cursor}_l{limit}_d{include_drafts}"
-    cached = await get_cache(cache_key)
-    if cached:
-        return cached
-
-    query = select(Blog).order_by(Blog.date.desc())
-    if not include_drafts:
-        query = query.filter(Blog.is_published == True)
+@router.get("", response_model=BlogPage)
+async def get_blogs(request: Request, cursor: Optional[str] = None, limit: int = Query(10, ge=1, le=100), include_drafts: bool = False):
+    async def load():
+        # The article body is only needed on the detail endpoints
+        query = select(Blog).options(defer(Blog.content))
+        if not include_drafts:
+            query = query.filter(Blog.is_published == True)
+        query = apply_keyset(query, Blog, cursor, limit)
         
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(query)
+            items, next_cursor = page_of(result.scalars().all(), limit)
+            return {
+                "items": [BlogSummaryOut.model_validate(b).model_dump(mode="json") for b in items],
+                "next_cursor": next_cursor,
+            }
+
     if cursor:
-        query = query.filter(Blog.id < cursor)
-    
-    result = await db.execute(query.limit(limit))
-    blogs = result.scalars().all()
-    
-    serialized = [BlogOut.model_validate(b).model_dump() for b in blogs]
-    await set_cache(cache_key, serialized)
-    
-    return blogs
+        # Later pages are cheap keyset reads; caching them would let any
+        # client mint unlimited cache keys with made-up cursors
+        return cached_json_response(request, serialize_json(await load(), 0))
+    entry = await get_or_compute(f"blogs_l{limit}_d{include_drafts}", load, tags=["blogs"])
+    return cached_json_response(request, entry)
 
 @router.post("", response_model=BlogOut)
-async def create_blog(request: Request, blog: BlogCreate, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def create_blog(request: Request, blog: BlogCreate, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     blog_data = blog.model_dump(exclude={'generate_audio', 'voice'})
     new_blog = Blog(**blog_data)
     new_blog.author = current.display_name
@@ -46,9 +54,12 @@ async def create_blog(request: Request, blog: BlogCreate, db: AsyncSession = Dep
     
     db.add(new_blog)
     try:
+        await db.flush()
+        await sync_owner_references(db, "blog", new_blog)
         await db.commit()
         await db.refresh(new_blog)
-        invalidate_blog_cache()
+        await invalidate_tags("blogs")
+        await notify_content_changed("blog", new_blog.id)
         if blog.generate_audio:
             import re
             plain_text = re.sub(r'<[^>]+>', '', blog.content)
@@ -70,14 +81,20 @@ async def get_blog_by_id(blog_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.get("/{slug}", response_model=BlogOut)
 async def get_blog_by_slug(slug: str, db: AsyncSession = Depends(get_db)):
+    cache_key = f"blog_slug_{slug}"
+    cached = await get_cache(cache_key)
+    if cached:
+        return cached
+
     result = await db.execute(select(Blog).filter(Blog.slug == slug))
     blog = result.scalar_one_or_none()
     if not blog:
         raise HTTPException(status_code=404, detail="Blog not found")
+    await set_cache(cache_key, BlogOut.model_validate(blog).model_dump(), tags=[f"blog:{blog.id}"])
     return blog
 
 @router.put("/{blog_id}", response_model=BlogOut)
-async def update_blog(blog_id: int, blog: BlogCreate, request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def update_blog(blog_id: int, blog: BlogCreate, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     result = await db.execute(select(Blog).filter(Blog.id == blog_id))
     existing_blog = result.scalar_one_or_none()
     
@@ -100,9 +117,11 @@ async def update_blog(blog_id: int, blog: BlogCreate, request: Request, db: Asyn
     existing_blog.readingTime = minutes
     
     try:
+        await sync_owner_references(db, "blog", existing_blog)
         await db.commit()
         await db.refresh(existing_blog)
-        invalidate_blog_cache()
+        await invalidate_tags("blogs", f"blog:{blog_id}")
+        await notify_content_changed("blog", blog_id)
         await log_audit(db, current.id, "UPDATE_BLOG", f"Blog:{blog_id}", request)
         if blog.generate_audio:
             import re
@@ -116,19 +135,21 @@ async def update_blog(blog_id: int, blog: BlogCreate, request: Request, db: Asyn
     return existing_blog
 
 @router.delete("/{blog_id}")
-async def delete_blog(blog_id: int, request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def delete_blog(blog_id: int, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     result = await db.execute(select(Blog).filter(Blog.id == blog_id))
     blog = result.scalar_one_or_none()
     if not blog:
         raise HTTPException(status_code=404, detail="Blog not found")
+    await drop_references(db, "blog", blog_id)
     await db.delete(blog)
     await db.commit()
-    invalidate_blog_cache()
+    await invalidate_tags("blogs", f"blog:{blog_id}")
+    await notify_content_changed("blog", blog_id)
     await log_audit(db, current.id, "DELETE_BLOG", f"Blog:{blog_id}", request)
     return {"status": "deleted"}
 
 @router.post("/{blog_id}/toggle-publish")
-async def toggle_blog_publish(blog_id: int, request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def toggle_blog_publish(blog_id: int, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     result = await db.execute(select(Blog).filter(Blog.id == blog_id))
     blog = result.scalar_one_or_none()
     if not blog:
@@ -137,6 +158,7 @@ async def toggle_blog_publish(blog_id: int, request: Request, db: AsyncSession =
     new_status = not blog.is_published
     blog.is_published = new_status
     await db.commit()
-    invalidate_blog_cache()
+    await invalidate_tags("blogs", f"blog:{blog_id}")
+    await notify_content_changed("blog", blog_id)
     await log_audit(db, current.id, "TOGGLE_BLOG_PUBLISH", f"Blog:{blog_id}:{new_status}", request)
     return {"status": "success", "is_published": new_status}
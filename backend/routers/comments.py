@@ -7,7 +7,8 @@ from sqlalchemy.orm import joinedload
 from database import get_db
 from models import Comment, User
 from schemas import CommentCreate, CommentOut
-from deps import get_current_user, requires_role
+from deps import get_current_principal, requires_role
+from principals import Principal
 
 router = APIRouter(prefix="/api/comments", tags=["comments"])
 
@@ -23,7 +24,7 @@ async def get_comments(post_type: str, post_id: int, db: AsyncSession = Depends(
     return result.scalars().all()
 
 @router.post("", response_model=dict)
-async def post_comment(req: CommentCreate, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def post_comment(req: CommentCreate, db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
     new_comment = Comment(
         post_id=req.post_id,
         post_type=req.post_type,
@@ -36,7 +37,7 @@ async def post_comment(req: CommentCreate, db: AsyncSession = Depends(get_db), c
     return {"status": "pending_approval"}
 
 @router.put("/{comment_id}/approve")
-async def approve_comment(comment_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def approve_comment(comment_id: int, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     result = await db.execute(select(Comment).filter(Comment.id == comment_id))
     comment = result.scalar_one_or_none()
     if not comment:
@@ -46,7 +47,7 @@ async def approve_comment(comment_id: int, db: AsyncSession = Depends(get_db), c
     return {"status": "approved"}
 
 @router.delete("/{comment_id}")
-async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def delete_comment(comment_id: int, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     result = await db.execute(select(Comment).filter(Comment.id == comment_id))
     comment = result.scalar_one_or_none()
     if not comment:
@@ -1,275 +1,57 @@
-import datetime
-import os
-import shutil
-import subprocess
-import asyncio
-import re
 from typing import List, Optional
-import docker
-from pydantic import BaseModel
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from database import get_db
-from models import User, PaaSProject
-from schemas import PaaSProjectCreate, PaaSProjectOut, PaaSProjectUpdate
-from deps import get_current_user
+from models import User, PaaSProject, PaaSDeployment
+from schemas import PaaSProjectCreate, PaaSProjectOut, PaaSProjectUpdate, PaaSDeploymentOut
+from deps import get_current_principal
+from principals import Principal
+from paas_logs import append_log, clear_log, read_log, tail_log, sse_event
+from paas_deploy import ACTIVE_STATUSES, docker_client, enqueue_deploy, enqueue_cleanup, queue_position, cancel_deploy
 
 router = APIRouter(prefix="/api/paas", tags=["paas"])
 
-# Try to initialize Docker client
-try:
-    docker_client = docker.from_env()
-except Exception as e:
-    docker_client = None
-    print(f"FAILED TO INIT DOCKER CLIENT: {e}")
-
-WORKSPACE_DIR = "/tmp/paas_projects"
-os.makedirs(WORKSPACE_DIR, exist_ok=True)
-
-def slugify(text):
-    text = text.lower()
-    text = re.sub(r'[^a-z0-9]', '_', text)
-    return re.sub(r'_+', '_', text).strip('_')
-
-async def detect_project_type(project_dir: str) -> str:
-    """Analyze the repository files to guess what kind of app it is."""
-    files = os.listdir(project_dir)
-    if "package.json" in files:
-        # Check if NextJS
-        with open(os.path.join(project_dir, "package.json"), "r") as f:
-            content = f.read()
-            if "next" in content:
-                return "nextjs"
-        return "nodejs"
-    elif "requirements.txt" in files or "main.py" in files:
-        return "fastapi"
-    elif "index.html" in files:
-        return "static"
-    return "unknown"
-
-def generate_dockerfile(project_type: str, project_dir: str):
-    dockerfile_path = os.path.join(project_dir, "Dockerfile")
-    if os.path.exists(dockerfile_path):
-        return  # Use existing Dockerfile if any
-        
-    content = ""
-    if project_type == "nextjs":
-        content = """FROM node:18-alpine
-WORKDIR /app
-COPY package*.json ./
-RUN npm install
-COPY . .
-RUN npm run build
-EXPOSE 3000
-CMD ["npm", "start"]"""
-    elif project_type == "nodejs":
-        content = """FROM node:18-alpine
-WORKDIR /app
-COPY package*.json ./
-RUN npm install
-COPY . .
-EXPOSE 3000
-CMD ["npm", "start"]"""
-    elif project_type == "fastapi":
-        content = """FROM python:3.10-slim
-WORKDIR /app
-COPY requirements.txt .
-RUN pip install --no-cache-dir -r requirements.txt
-COPY . .
-EXPOSE 8000
-CMD ["uvicorn", "main:app", "--host", "0.0.0.0", "--port", "8000"]"""
-    elif project_type == "static":
-        content = """FROM nginx:alpine
-COPY . /usr/share/nginx/html
-EXPOSE 80"""
-    else:
-        # Fallback to simple static
-        content = """FROM nginx:alpine
-COPY . /usr/share/nginx/html
-EXPOSE 80"""
-
-    with open(dockerfile_path, "w") as f:
-        f.write(content)
-
-def find_available_port() -> int:
-    import socket
-    from contextlib import closing
-    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as s:
-        s.bind(('', 0))
-        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        return s.getsockname()[1]
-
-async def deploy_project_task(project_id: int, repo_url: str):
-    from database import AsyncSessionLocal
-    
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id))
-        project = result.scalar_one_or_none()
-        
-        if not project:
-            return
-
-        project.status = "deploying"
-        project.logs = "Starting deployment...\n"
-        await db.commit()
-        
-        try:
-            if not docker_client:
-                raise Exception("Docker client is not available on the server.")
-
-            project_dir = os.path.join(WORKSPACE_DIR, f"project_{project_id}")
-            if os.path.exists(project_dir):
-                shutil.rmtree(project_dir)
-            
-            # 1. Clone Repo
-            project.logs += f"Cloning {repo_url}...\n"
-            await db.commit()
-            
-            process = await asyncio.create_subprocess_exec(
-                "git", "clone", repo_url, project_dir,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            stdout, stderr = await process.communicate()
-            if process.returncode != 0:
-                raise Exception(f"Git clone failed: {stderr.decode()}")
-                
-            project.logs += "Clone successful.\n"
-            await db.commit()
-
-            # Handle Docker Compose if provided
-            if project.compose_code:
-                project.logs += "Docker Compose code provided. Using compose orchestration...\n"
-                compose_path = os.path.join(project_dir, "docker-compose.yml")
-                with open(compose_path, "w") as f:
-                    f.write(project.compose_code)
-                
-                # We use subprocess to run docker compose
-                # Note: This requires 'docker-compose' or 'docker compose' available
-                # If 'docker compose' fails, we'll try 'docker-compose'
-                project_slug = slugify(project.name)
-                try:
-                    cmd = ["docker", "compose", "-p", project_slug, "up", "-d"]
-                    proc = await asyncio.create_subprocess_exec(
-                        *cmd, cwd=project_dir,
-                        stdout=asyncio.subprocess.PIPE,
-                        stderr=asyncio.subprocess.PIPE
-                    )
-                    out, err = await proc.communicate()
-                    if proc.returncode != 0:
-                         # Try legacy docker-compose
-                        cmd = ["docker-compose", "-p", project_slug, "up", "-d"]
-                        proc = await asyncio.create_subprocess_exec(
-                            *cmd, cwd=project_dir,
-                            stdout=asyncio.subprocess.PIPE,
-                            stderr=asyncio.subprocess.PIPE
-                        )
-                        out, err = await proc.communicate()
-                    
-                    if proc.returncode != 0:
-                        raise Exception(f"Docker Compose failed: {err.decode()}")
-                        
-                    project.status = "running"
-                    project.logs += f"Docker Compose services started with project name: {project_slug}\n"
-                    await db.commit()
-                    return # Exit early as we're done with compose
-                except Exception as comp_e:
-                    raise Exception(f"Compose orchestration failed: {str(comp_e)}")
-
-            # 2. Detect & Generate Dockerfile (Single Container Flow)
-            project.logs += "Detecting project type...\n"
-            ptype = await detect_project_type(project_dir)
-            project.project_type = ptype
-            generate_dockerfile(ptype, project_dir)
-            
-            project.logs += f"Detected project type: {ptype}. Building Docker image...\n"
-            await db.commit()
-            
-            # 3. Build Docker Image
-            image_name = f"paas_app_{project_id}"
-            
-            def build_image():
-                return docker_client.images.build(path=project_dir, tag=image_name, rm=True)
-                
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, build_image)
-            
-            project.logs += "Docker image built successfully. Starting container...\n"
-            await db.commit()
-            
-            # 4. Run Docker Container
-            target_port = 3000 if ptype in ["nextjs", "nodejs"] else (8000 if ptype == "fastapi" else 80)
-            host_port = find_available_port()
-            container_name = slugify(project.name)
-            
-            # Remove old container with same name if exists
-            try:
-                old = docker_client.containers.get(container_name)
-                old.stop()
-                old.remove()
-            except:
-                pass
-
-            def run_container():
-                return docker_client.containers.run(
-                    image_name,
-                    name=container_name,
-                    detach=True,
-                    ports={f"{target_port}/tcp": host_port},
-                    # Security boundaries
-                    mem_limit="256m",
-                    cpu_quota=50000,
-                    restart_policy={"Name": "on-failure", "MaximumRetryCount": 3}
-                )
-                
-            container = await loop.run_in_executor(None, run_container)
-            
-            project.container_id = container.id
-            project.port = host_port
-            project.status = "running"
-            project.host_url = f"http://localhost:{host_port}"
-            project.logs += f"Container '{container_name}' started successfully! Running on port {host_port}.\n"
-            await db.commit()
-
-        except Exception as e:
-            project.status = "failed"
-            project.logs += f"\nERROR: {str(e)}"
-            await db.commit()
+async def _with_queue_position(proj: PaaSProject) -> PaaSProjectOut:
+    out = PaaSProjectOut.model_validate(proj)
+    if proj.status == "queued":
+        out.queue_position = await queue_position(proj.deploy_job_id)
+    return out
 
 @router.post("", response_model=PaaSProjectOut)
-async def create_project(project: PaaSProjectCreate, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def create_project(project: PaaSProjectCreate, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
     new_proj = PaaSProject(
         user_id=current.id,
         repo_url=project.repo_url,
+        git_ref=project.git_ref or None,
         name=project.name,
         description=project.description,
         compose_code=project.compose_code,
         status="pending"
     )
     db.add(new_proj)
-    await db.commit()
+    await db.flush()
+    await enqueue_deploy(db, request.app.state.arq_pool, new_proj)
     await db.refresh(new_proj)
-    
-    background_tasks.add_task(deploy_project_task, new_proj.id, new_proj.repo_url)
-    return new_proj
+    return await _with_queue_position(new_proj)
 
 @router.get("", response_model=List[PaaSProjectOut])
-async def get_projects(db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def get_projects(db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
     result = await db.execute(select(PaaSProject).filter(PaaSProject.user_id == current.id).order_by(PaaSProject.created_at.desc()))
     return result.scalars().all()
 
 @router.get("/{project_id}", response_model=PaaSProjectOut)
-async def get_project(project_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def get_project(project_id: int, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
     result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id, PaaSProject.user_id == current.id))
     proj = result.scalar_one_or_none()
     if not proj:
         raise HTTPException(status_code=404, detail="Project not found")
-    return proj
+    return await _with_queue_position(proj)
 
 @router.post("/{project_id}/stop")
-async def stop_project(project_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def stop_project(project_id: int, db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
     result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id, PaaSProject.user_id == current.id))
     proj = result.scalar_one_or_none()
     if not proj or not proj.container_id:
@@ -291,7 +73,7 @@ async def stop_project(project_id: int, db: AsyncSession = Depends(get_db), curr
     return {"status": "stopped"}
 
 @router.put("/{project_id}", response_model=PaaSProjectOut)
-async def update_project(project_id: int, update_data: PaaSProjectUpdate, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def update_project(project_id: int, update_data: PaaSProjectUpdate, db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
     result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id, PaaSProject.user_id == current.id))
     proj = result.scalar_one_or_none()
     if not proj:
@@ -301,6 +83,8 @@ async def update_project(project_id: int, update_data: PaaSProjectUpdate, db: As
         proj.name = update_data.name
     if update_data.repo_url is not None:
         proj.repo_url = update_data.repo_url
+    if update_data.git_ref is not None:
+        proj.git_ref = update_data.git_ref or None  # "" resets to the default branch
     if update_data.description is not None:
         proj.description = update_data.description
     if update_data.compose_code is not None:
@@ -311,12 +95,15 @@ async def update_project(project_id: int, update_data: PaaSProjectUpdate, db: As
     return proj
 
 @router.delete("/{project_id}")
-async def delete_project(project_id: int, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def delete_project(project_id: int, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
     result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id, PaaSProject.user_id == current.id))
     proj = result.scalar_one_or_none()
     if not proj:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    if proj.status in ACTIVE_STATUSES:
+        await cancel_deploy(request.app.state.arq_pool, proj.deploy_job_id)
+
     # Stop container if running
     if proj.container_id and docker_client:
         try:
@@ -326,21 +113,87 @@ async def delete_project(project_id: int, db: AsyncSession = Depends(get_db), cu
         except:
             pass
 
-    # Delete workspace dir
-    workspace = os.path.join(WORKSPACE_DIR, f"project_{proj.id}")
-    if os.path.exists(workspace):
-        shutil.rmtree(workspace, ignore_errors=True)
+    # Workspace and image live on the deploy worker
+    await enqueue_cleanup(request.app.state.arq_pool, proj)
+    await clear_log(proj.id)
 
     await db.delete(proj)
     await db.commit()
     return {"status": "deleted"}
 
 @router.post("/{project_id}/start")
-async def start_project(project_id: int, background_tasks: BackgroundTasks, db: AsyncSession = Depends(get_db), current: User = Depends(get_current_user)):
+async def start_project(project_id: int, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
+    result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id, PaaSProject.user_id == current.id))
+    proj = result.scalar_one_or_none()
+    if not proj:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if proj.status in ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail="A deployment is already in progress")
+
+    pool = request.app.state.arq_pool
+    await enqueue_deploy(db, pool, proj)
+    return {"status": "queued", "queue_position": await queue_position(proj.deploy_job_id)}
+
+@router.post("/{project_id}/cancel")
+async def cancel_project_deploy(project_id: int, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
+    result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id, PaaSProject.user_id == current.id))
+    proj = result.scalar_one_or_none()
+    if not proj:
+        raise HTTPException(status_code=404, detail="Project not found")
+    if proj.status not in ACTIVE_STATUSES:
+        raise HTTPException(status_code=409, detail="No deployment in progress")
+
+    await cancel_deploy(request.app.state.arq_pool, proj.deploy_job_id)
+    if proj.status == "queued":
+        # Never started: nothing to clean up, so it can be marked right away
+        proj.status = "cancelled"
+        await db.commit()
+        await append_log(proj.id, ["Deployment cancelled."])
+    return {"status": proj.status if proj.status == "cancelled" else "cancelling"}
+
+async def _get_owned_project(db: AsyncSession, project_id: int, current: Principal) -> PaaSProject:
     result = await db.execute(select(PaaSProject).filter(PaaSProject.id == project_id, PaaSProject.user_id == current.id))
     proj = result.scalar_one_or_none()
     if not proj:
         raise HTTPException(status_code=404, detail="Project not found")
+    return proj
 
-    background_tasks.add_task(deploy_project_task, proj.id, proj.repo_url)
-    return {"status": "deploying_started"}
+@router.get("/{project_id}/logs")
+async def get_project_logs(project_id: int, after: Optional[str] = None, limit: int = Query(1000, ge=1, le=5000),
+                           db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
+    """Log lines after the given entry id; pass the returned last_id to continue."""
+    await _get_owned_project(db, project_id, current)
+    entries = await read_log(project_id, after, limit)
+    return {"entries": entries, "last_id": entries[-1]["id"] if entries else after}
+
+@router.get("/{project_id}/logs/stream")
+async def stream_project_logs(project_id: int, request: Request, after: Optional[str] = None,
+                              db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
+    """Server-sent events tail of the deploy log. Reconnects resume from Last-Event-ID."""
+    await _get_owned_project(db, project_id, current)
+    # get_db is only torn down after the stream ends; release the connection
+    # (shared with the principal lookup) now so viewers do not pin the pool
+    await db.close()
+    after = request.headers.get("last-event-id") or after
+
+    async def events():
+        async for entry in tail_log(project_id, after):
+            if await request.is_disconnected():
+                break
+            yield sse_event(entry)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.get("/{project_id}/deployments", response_model=List[PaaSDeploymentOut])
+async def list_deployments(project_id: int, limit: int = Query(20, ge=1, le=100),
+                           db: AsyncSession = Depends(get_db), current: Principal = Depends(get_current_principal)):
+    """Recent deploys, newest first, with build duration and layer-cache hits."""
+    await _get_owned_project(db, project_id, current)
+    result = await db.execute(
+        select(PaaSDeployment)
+        .filter(PaaSDeployment.project_id == project_id)
+        .order_by(PaaSDeployment.started_at.desc(), PaaSDeployment.id.desc())
+        .limit(limit)
+    )
+    return result.scalars().all()
@@ -1,50 +1,66 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.orm import defer
 
-from database import get_db
+from database import get_db, AsyncSessionLocal
 from models import Project, User
-from schemas import ProjectOut
-from deps import get_current_user, requires_role, get_cache, set_cache, log_audit, check_ip_whitelist
+from schemas import ProjectOut, ProjectSummaryOut, ProjectPage
+from pagination import apply_keyset, page_of
+from search import notify_content_changed
+from assets import drop_references
+from deps import get_current_user, requires_role, log_audit, check_ip_whitelist
+from cache import get_cache, set_cache, get_or_compute, cached_json_response, serialize_json, invalidate_tags
+from principals import Principal
 
 router = APIRouter(prefix="/api/projects", tags=["projects"])
 
-@router.get("", response_model=List[ProjectOut])
-async def get_projects(cursor: int = None, limit: int = 10, db: AsyncSession = Depends(get_db)):
-    cache_key = f"projects_c{cursor}_l{limit}"
-    cached = await get_cache(cache_key)
-    if cached:
-        return cached
+@router.get("", response_model=ProjectPage)
+async def get_projects(request: Request, cursor: Optional[str] = None, limit: int = Query(10, ge=1, le=100)):
+    async def load():
+        query = apply_keyset(select(Project).options(defer(Project.longDescription)), Project, cursor, limit)
+        
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(query)
+            items, next_cursor = page_of(result.scalars().all(), limit)
+            return {
+                "items": [ProjectSummaryOut.model_validate(p).model_dump(mode="json") for p in items],
+                "next_cursor": next_cursor,
+            }
 
-    query = select(Project).order_by(Project.id.desc())
     if cursor:
-        query = query.filter(Project.id < cursor)
-    
-    result = await db.execute(query.limit(limit))
-    projects = result.scalars().all()
-    
-    serialized = [ProjectOut.model_validate(p).model_dump() for p in projects]
-    await set_cache(cache_key, serialized)
-    return serialized
+        # Only the first page is cached, see get_blogs
+        return cached_json_response(request, serialize_json(await load(), 0))
+    entry = await get_or_compute(f"projects_l{limit}", load, tags=["projects"])
+    return cached_json_response(request, entry)
 
 @router.get("/{slug}", response_model=ProjectOut)
 async def get_project_by_slug(slug: str, db: AsyncSession = Depends(get_db)):
+    cache_key = f"project_slug_{slug}"
+    cached = await get_cache(cache_key)
+    if cached:
+        return cached
+
     result = await db.execute(select(Project).filter(Project.slug == slug))
     project = result.scalar_one_or_none()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    await set_cache(cache_key, ProjectOut.model_validate(project).model_dump(), tags=[f"project:{project.id}"])
     return project
 
 @router.delete("/{project_id}")
-async def delete_project(project_id: int, request: Request, db: AsyncSession = Depends(get_db), current: User = Depends(requires_role('admin'))):
+async def delete_project(project_id: int, request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
     # Depending if we want IP whitelist or not
     # check_ip_whitelist(request) 
     result = await db.execute(select(Project).filter(Project.id == project_id))
     project = result.scalar_one_or_none()
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    await drop_references(db, "project", project_id)
     await db.delete(project)
     await db.commit()
+    await invalidate_tags("projects", f"project:{project_id}")
+    await notify_content_changed("project", project_id)
     await log_audit(db, current.id, "DELETE_PROJECT", f"Project:{project_id}", request)
     return {"status": "deleted"}
@@ -1,48 +1,67 @@
 from typing import List
-from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, defer
 from sqlalchemy import text, or_
 import json
-import hashlib
+import datetime
+import time
 
 from database import get_db, redis_client
 from models import Blog, Project, NewsletterSubscription, PaaSProject, ContactMessage
-from schemas import SubscribeRequest, NewsletterCreate, ContactCreate
+from schemas import SubscribeRequest, NewsletterCreate, ContactCreate, BlogSummaryOut, ProjectSummaryOut, PaaSProjectOut
 from config import settings
+from search import search_backend, content_index, SEARCH_MAX_RESULTS
+from cache import get_or_compute, cached_json_response
+from imaging import get_og_image, og_cache_key
+from views import track_view, get_view_counts, visitor_id, VIEW_TABLES
+import analytics
+from deps import requires_role
+from principals import Principal
+from sitemap import render_sitemap, render_sitemap_part, sitemap_part_count, SITEMAP_CACHE_TAGS, SITEMAP_SOFT_TTL, SITEMAP_STALE_TTL
 
 
 router = APIRouter(prefix="/api", tags=["public"])
 
 @router.get("/search")
-async def search_content(q: str, db: AsyncSession = Depends(get_db)):
-    if not q:
-        return {"blogs": [], "projects": []}
-    
-    # Use standard LIKE for better reliability across all setups
-    blog_q = select(Blog).filter(
-        or_(
-            Blog.title.ilike(f"%{q}%"),
-            Blog.excerpt.ilike(f"%{q}%"),
-            Blog.author.ilike(f"%{q}%")
-        )
-    ).filter(Blog.is_published == True)
-    
-    proj_q = select(Project).filter(
-        or_(
-            Project.title.ilike(f"%{q}%"),
-            Project.excerpt.ilike(f"%{q}%"),
-            Project.category.ilike(f"%{q}%")
-        )
-    )
+async def search_content(q: str, page: int = Query(1, ge=1), limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_db)):
+    q = q.strip()
+    if len(q) < 2:
+        return {"blogs": [], "projects": [], "page": page}
+
+    offset = (page - 1) * limit
+    if offset >= SEARCH_MAX_RESULTS:
+        return {"blogs": [], "projects": [], "page": page}
+    limit = min(limit, SEARCH_MAX_RESULTS - offset)
+
+    blog_ids = await search_backend.search(db, "blog", q, limit, offset)
+    proj_ids = await search_backend.search(db, "project", q, limit, offset)
+
+    # Load the ranked rows in one query per kind, then restore rank order
+    blogs, projects = {}, {}
+    if blog_ids:
+        res = await db.execute(select(Blog).options(defer(Blog.content)).filter(Blog.id.in_(blog_ids)))
+        blogs = {b.id: b for b in res.scalars().all()}
+    if proj_ids:
+        res = await db.execute(select(Project).options(defer(Project.longDescription)).filter(Project.id.in_(proj_ids)))
+        projects = {p.id: p for p in res.scalars().all()}
 
-    blog_res = await db.execute(blog_q)
-    proj_res = await db.execute(proj_q)
-    
     return {
-        "blogs": blog_res.scalars().all(),
-        "projects": proj_res.scalars().all()
+        "blogs": [BlogSummaryOut.model_validate(blogs[i]) for i in blog_ids if i in blogs],
+        "projects": [ProjectSummaryOut.model_validate(projects[i]) for i in proj_ids if i in projects],
+        "page": page
+    }
+
+@router.get("/search/suggest")
+async def search_suggest(q: str, limit: int = Query(5, ge=1, le=10)):
+    """Search-as-you-type: served entirely from the in-process index, no DB round trip."""
+    q = q.strip()
+    if len(q) < 2:
+        return {"blogs": [], "projects": []}
+    return {
+        "blogs": await content_index.suggest("blog", q, limit),
+        "projects": await content_index.suggest("project", q, limit),
     }
 
 @router.get("/seo/{content_type}/{slug}")
@@ -63,29 +82,29 @@ async def get_seo_metadata(content_type: str, slug: str, db: AsyncSession = Depe
     }
 
 @router.get("/sitemap.xml")
-async def get_sitemap(db: AsyncSession = Depends(get_db)):
-    blogs = await db.execute(select(Blog.slug))
-    projects = await db.execute(select(Project.slug))
-    
-    xml = '<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
-    for slug in blogs.scalars().all():
-        xml += f'  <url><loc>https://omervision.io/blog/{slug}</loc></url>\n'
-    for slug in projects.scalars().all():
-        xml += f'  <url><loc>https://omervision.io/project/{slug}</loc></url>\n'
-    xml += "</urlset>"
-    
-    return Response(content=xml, media_type="application/xml")
+async def get_sitemap(request: Request):
+    entry = await get_or_compute("sitemap", render_sitemap, tags=SITEMAP_CACHE_TAGS,
+                                 soft_ttl=SITEMAP_SOFT_TTL, stale_ttl=SITEMAP_STALE_TTL)
+    return cached_json_response(request, entry, media_type="application/xml")
+
+@router.get("/sitemap-{part}.xml")
+async def get_sitemap_part(request: Request, part: int):
+    if part < 0 or part >= await sitemap_part_count():
+        raise HTTPException(status_code=404, detail="Sitemap part not found")
+    entry = await get_or_compute(f"sitemap_p{part}", lambda: render_sitemap_part(part), tags=SITEMAP_CACHE_TAGS,
+                                 soft_ttl=SITEMAP_SOFT_TTL, stale_ttl=SITEMAP_STALE_TTL)
+    return cached_json_response(request, entry, media_type="application/xml")
 
 @router.get("/skills")
 async def get_skills():
-    data = redis_client.get("skills_data")
+    data = await redis_client.get("skills_data")
     if data:
         return json.loads(data)
     return []
 
 @router.get("/about")
 async def get_about_public():
-    data = redis_client.get("about_data")
+    data = await redis_client.get("about_data")
     if data:
         return json.loads(data)
     return {
@@ -102,12 +121,37 @@ async def get_about_public():
     }
 
 @router.get("/dashboard")
-async def get_dashboard(db: AsyncSession = Depends(get_db)):
-    # Async aggregated metrics
-    visitors = 1320
-    pageViews = 5480
-    signups = 124
-    return {"visitors": visitors, "pageViews": pageViews, "signups": signups}
+async def get_dashboard(days: int = Query(30, ge=1, le=366), current: Principal = Depends(requires_role('admin'))):
+    # Served from the daily rollup table: cost depends on the range, not on traffic
+    today = datetime.datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - datetime.timedelta(days=days - 1)
+    series = await analytics.query("day", start, today + datetime.timedelta(days=1), ("pageviews", "signups", "subscribers", "visitors"))
+    visitors = await analytics.unique_visitors([(start + datetime.timedelta(days=i)).date() for i in range(days)])
+    return {
+        "visitors": visitors,
+        "pageViews": sum(row["pageviews"] for row in series),
+        "signups": sum(row["signups"] for row in series),
+        "subscribers": sum(row["subscribers"] for row in series),
+        "series": series,
+    }
+
+@router.get("/analytics/series")
+async def get_analytics_series(
+    start: datetime.datetime,
+    end: datetime.datetime,
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    metric: List[str] = Query(["pageviews"]),
+    current: Principal = Depends(requires_role('admin')),
+):
+    unknown = set(metric) - set(analytics.METRICS) - {"visitors"}
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown metrics: {', '.join(sorted(unknown))}")
+    if "visitors" in metric and granularity == "hour":
+        raise HTTPException(status_code=400, detail="visitors is only available per day")
+    max_span = datetime.timedelta(days=31) if granularity == "hour" else datetime.timedelta(days=366)
+    if end <= start or end - start > max_span:
+        raise HTTPException(status_code=400, detail=f"Range must be positive and at most {max_span.days} days")
+    return {"granularity": granularity, "series": await analytics.query(granularity, start, end, metric)}
 
 @router.post("/subscribe")
 # @limiter.limit("10/minute") - disabled here for simplicity, or we can import limiter from deps
@@ -116,6 +160,7 @@ async def subscribe(req: SubscribeRequest, request: Request, db: AsyncSession =
         raise HTTPException(status_code=400, detail="Email is required")
     # Background Task: Hand off to Arq worker
     await request.app.state.arq_pool.enqueue_job('send_welcome_email', req.email)
+    await analytics.record("subscribers")
     return {"status": "subscribed", "email": req.email}
 
 @router.post("/newsletter/subscribe/v2")
@@ -125,6 +170,7 @@ async def newsletter_subscribe_v2(req: NewsletterCreate, db: AsyncSession = Depe
     sub = NewsletterSubscription(email=req.email, verification_token=token)
     db.add(sub)
     await db.commit()
+    await analytics.record("subscribers")
     return {"status": "verification_sent"}
 
 @router.get("/newsletter/verify/{token}")
@@ -139,19 +185,42 @@ async def newsletter_verify_route(token: str, db: AsyncSession = Depends(get_db)
 
 @router.post("/analytics/track/{post_type}/{post_id}")
 async def track_view_count(post_type: str, post_id: int, request: Request):
-    ip_hash = hashlib.sha256(f"{request.client.host}{settings.SECRET_KEY}".encode()).hexdigest()
-    cache_key = f"v:{post_type}:{post_id}:{ip_hash}"
-    if not redis_client.get(cache_key):
-        redis_client.incr(f"views:{post_type}:{post_id}")
-        redis_client.set(cache_key, "1", ex=86400)
+    if post_type not in VIEW_TABLES:
+        raise HTTPException(status_code=400, detail="Unknown post type")
+    visitor = visitor_id(request.client.host)
+    await track_view(post_type, post_id, visitor)
+    await analytics.record("pageviews", visitor=visitor)
     return {"status": "tracked"}
 
-@router.get("/og-image/{title}")
-async def get_og_image_endpoint_route(title: str):
-    from utils import generate_og_image
-    return Response(content=generate_og_image(title), media_type="image/webp")
+@router.get("/analytics/views/{post_type}")
+async def get_view_count_batch(post_type: str, ids: List[int] = Query(..., max_length=100)):
+    if post_type not in VIEW_TABLES:
+        raise HTTPException(status_code=400, detail="Unknown post type")
+    return {"views": await get_view_counts(post_type, ids)}
 
-@router.get("/paas/projects")
+@router.get("/og-image/{title}")
+async def get_og_image_endpoint_route(title: str, request: Request):
+    key = og_cache_key(title)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "public, max-age=604800, stale-while-revalidate=86400"}
+    if f'"{key}"' in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    async def check_render_budget():
+        # Any title renders, so uncached renders are limited per client
+        window = int(time.time() // 60)
+        budget_key = f"og:renders:{request.client.host}:{window}"
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.incr(budget_key)
+            pipe.expire(budget_key, 60)
+            count, _ = await pipe.execute()
+        if count > settings.OG_RENDERS_PER_MINUTE:
+            raise HTTPException(status_code=429, detail="Too many new images, try again later",
+                                headers={"Retry-After": "60"})
+
+    content, _ = await get_og_image(title, before_render=check_render_budget)
+    return Response(content=content, media_type="image/webp", headers=headers)
+
+@router.get("/paas/projects", response_model=List[PaaSProjectOut])
 async def get_public_paas_projects(db: AsyncSession = Depends(get_db)):
     # Only return projects that are in running or deploying status
     result = await db.execute(
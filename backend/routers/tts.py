@@ -2,6 +2,7 @@ import uuid
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from arq.jobs import Job
+from jobs import get_progress
 
 router = APIRouter(prefix="/api/tts", tags=["tts"])
 
@@ -34,4 +35,5 @@ async def get_tts_status(request: Request, job_id: str):
         result = await job.result()
         return result
     
-    return {"status": status}
+    # Queued or running: include what the worker has reported so far
+    return {"status": status, "progress": await get_progress(job_id)}
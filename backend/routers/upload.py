@@ -1,28 +1,66 @@
-import uuid
-import os
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+import hashlib
+import logging
+import tempfile
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from config import settings
 from database import get_db
-from models import User
 from deps import requires_role
-from utils import optimize_image, validate_file_magic, storage
+from principals import Principal
+from uploads import stream_upload
+from imaging import run_in_pool, process_image
+from assets import asset_digest, asset_key, claim_asset, image_profile, register_asset
+from utils import validate_file_magic, storage
+
+logger = logging.getLogger("api")
 
 router = APIRouter(prefix="/api/upload", tags=["upload"])
 
 @router.post("")
-async def upload_file(file: UploadFile = File(...), current: User = Depends(requires_role('admin'))):
-    # Validate magic bytes
-    content = await file.read(1024)
-    file_type = validate_file_magic(content) 
-    await file.seek(0)
-    full_content = await file.read()
-    
-    if file_type.startswith("image/"):
-         optimized_content = optimize_image(full_content)
-         filename = f"{uuid.uuid4()}.webp"
-         url = await storage.upload_file(optimized_content, filename, "image/webp")
-    else:
-         filename = f"{uuid.uuid4()}{os.path.splitext(file.filename)[1]}"
-         url = await storage.upload_file(full_content, filename, file_type)
-         
-    return {"url": url}
+async def upload_file(request: Request, db: AsyncSession = Depends(get_db), current: Principal = Depends(requires_role('admin'))):
+    # The body is parsed as a stream (not via File(...)) so the size cap
+    # applies while receiving instead of after the whole file is spooled.
+    _, chunks = await stream_upload(request, "file", settings.UPLOAD_MAX_BYTES)
+
+    # Validate magic bytes from the first chunk only
+    first = await anext(chunks, b"")
+    validate_file_magic(first)  # the allow-list is images only
+
+    profile = image_profile()
+    sha = hashlib.sha256(first)
+    size = len(first)
+
+    # Pillow needs random access to the whole image, so it is spooled to disk
+    with tempfile.NamedTemporaryFile(suffix=".upload") as spool:
+        spool.write(first)
+        async for chunk in chunks:
+            size += len(chunk)
+            sha.update(chunk)
+            spool.write(chunk)
+        spool.flush()
+
+        digest = asset_digest(sha.hexdigest(), profile)
+        manifest = await claim_asset(db, digest)
+        if manifest is not None:
+            return manifest  # same bytes, same profile: already stored
+
+        try:
+            processed = await run_in_pool(process_image, spool.name, tuple(settings.IMAGE_VARIANT_WIDTHS), settings.IMAGE_QUALITY)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Image processing failed: {e}")
+
+    variants = processed["variants"]
+    keys = [asset_key(digest, f"-{v['width']}w.webp") for v in variants]
+    urls = await storage.upload_many((v["content"], key, "image/webp") for v, key in zip(variants, keys))
+    variant_manifest = [{"width": v["width"], "height": v["height"], "url": u} for v, u in zip(variants, urls)]
+    manifest = {
+        "url": variant_manifest[-1]["url"],
+        "width": processed["width"],
+        "height": processed["height"],
+        "variants": variant_manifest,
+        "srcset": ", ".join(f"{m['url']} {m['width']}w" for m in variant_manifest),
+    }
+    await register_asset(db, digest, profile, "image/webp", size, keys, manifest)
+    return manifest
+
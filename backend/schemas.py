@@ -27,7 +27,8 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 
-class ProjectOut(BaseModel):
+class ProjectSummaryOut(BaseModel):
+    """List/search view of a project, without the long description."""
     id: int
     title: str
     slug: Optional[str] = None
@@ -38,7 +39,6 @@ class ProjectOut(BaseModel):
     avatar: Optional[str] = None
     href: str
     excerpt: Optional[str] = None
-    longDescription: Optional[str] = None
     featured: bool = False
     category: Optional[str] = None
     year: Optional[str] = None
@@ -46,6 +46,15 @@ class ProjectOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class ProjectOut(ProjectSummaryOut):
+    longDescription: Optional[str] = None
+
+
+class ProjectPage(BaseModel):
+    items: List[ProjectSummaryOut]
+    next_cursor: Optional[str] = None
+
+
 class BlogCreate(BaseModel):
     title: str = Field(..., min_length=1, max_length=200)
     slug: str = Field(..., min_length=1, max_length=100)
@@ -59,7 +68,8 @@ class BlogCreate(BaseModel):
     generate_audio: bool = False
     voice: Optional[str] = None
 
-class BlogOut(BaseModel):
+class BlogSummaryOut(BaseModel):
+    """List/search view of a blog post, without the article body."""
     id: int
     title: str
     slug: Optional[str] = None
@@ -70,7 +80,6 @@ class BlogOut(BaseModel):
     avatar: Optional[str] = None
     href: str
     excerpt: Optional[str] = None
-    content: Optional[str] = None
     readingTime: Optional[int] = 5
     featured: bool = False
     is_published: bool = True
@@ -79,6 +88,15 @@ class BlogOut(BaseModel):
     model_config = {"from_attributes": True}
 
 
+class BlogOut(BlogSummaryOut):
+    content: Optional[str] = None
+
+
+class BlogPage(BaseModel):
+    items: List[BlogSummaryOut]
+    next_cursor: Optional[str] = None
+
+
 class SubscribeRequest(BaseModel):
     email: str
 
@@ -140,12 +158,14 @@ class NewsletterOut(BaseModel):
 
 class PaaSProjectCreate(BaseModel):
     repo_url: str
+    git_ref: Optional[str] = Field(None, max_length=255)
     name: str = Field(..., min_length=3, max_length=50)
     description: Optional[str] = None
     compose_code: Optional[str] = None
 
 class PaaSProjectUpdate(BaseModel):
     repo_url: Optional[str] = None
+    git_ref: Optional[str] = Field(None, max_length=255)
     name: Optional[str] = None
     description: Optional[str] = None
     compose_code: Optional[str] = None
@@ -154,6 +174,8 @@ class PaaSProjectOut(BaseModel):
     id: int
     user_id: Optional[int]
     repo_url: str
+    git_ref: Optional[str] = None
+    commit_sha: Optional[str] = None
     name: str
     description: Optional[str] = None
     status: str
@@ -162,12 +184,27 @@ class PaaSProjectOut(BaseModel):
     container_id: Optional[str]
     host_url: Optional[str]
     compose_code: Optional[str]
-    logs: Optional[str]
+    queue_position: Optional[int] = None  # set while status is "queued"
     created_at: datetime.datetime
     updated_at: datetime.datetime
 
     model_config = {"from_attributes": True}
 
+class PaaSDeploymentOut(BaseModel):
+    id: int
+    job_id: Optional[str] = None
+    commit_sha: Optional[str] = None
+    project_type: Optional[str] = None
+    status: str
+    started_at: datetime.datetime
+    finished_at: Optional[datetime.datetime] = None
+    build_seconds: Optional[float] = None
+    build_steps: Optional[int] = None
+    cached_steps: Optional[int] = None
+    image_reused: bool = False
+
+    model_config = {"from_attributes": True}
+
 class ContactCreate(BaseModel):
     name: str = Field(..., min_length=1, max_length=100)
     email: EmailStr
@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import bisect
+import math
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import events
+from config import settings
+from database import engine, AsyncSessionLocal
+from models import Blog, Project
+from turkish import STEM_LENGTH, tokenize, stem, deletes, within_one_edit
+
+logger = logging.getLogger("api")
+
+SEARCH_CHANNEL = "events:search"
+# Hard cap on how deep a query may page (offset + limit)
+SEARCH_MAX_RESULTS = 100
+
+# Searchable text per document kind, with a weight per field
+SEARCH_FIELDS = {
+    "blog": (Blog, (("title", 3.0), ("excerpt", 1.0), ("author", 1.0))),
+    "project": (Project, (("title", 3.0), ("excerpt", 1.0), ("category", 1.0))),
+}
+
+# Relative credit for a query token matching an index term loosely
+STEM_MATCH_WEIGHT = 0.7
+PREFIX_MATCH_WEIGHT = 0.6
+TYPO_MATCH_WEIGHT = 0.5
+# Typo lookups only for tokens long enough that one edit is likely a typo
+TYPO_MIN_LENGTH = 4
+# Bounds the work a one- or two-letter prefix can cause
+MAX_PREFIX_EXPANSIONS = 50
+
+class SearchBackend(ABC):
+    """Ranks document ids of one kind ("blog" or "project") for a query."""
+    name = "base"
+
+    @abstractmethod
+    async def search(self, db: AsyncSession, kind: str, q: str, limit: int, offset: int) -> List[int]:
+        ...
+
+
+class MySQLFulltextBackend(SearchBackend):
+    """MATCH ... AGAINST over the ix_blog_fulltext / ix_project_fulltext indexes."""
+    name = "mysql"
+
+    async def search(self, db: AsyncSession, kind: str, q: str, limit: int, offset: int) -> List[int]:
+        model = SEARCH_FIELDS[kind][0]
+        # Must name exactly the columns of the FULLTEXT index
+        score = match(model.title, model.excerpt, against=q).in_natural_language_mode()
+        query = select(model.id).filter(score > 0)
+        if model is Blog:
+            query = query.filter(Blog.is_published == True)
+        result = await db.execute(query.order_by(score.desc(), model.id.desc()).limit(limit).offset(offset))
+        return list(result.scalars().all())
+
+
+class InvertedIndex:
+    """In-process TF-IDF index over the weighted search fields of one kind.
+
+    Terms are Turkish-normalized tokens. Besides exact postings it keeps a
+    stem map (inflected forms), a sorted term list (prefix lookups for
+    search-as-you-type) and a symmetric-delete map (one-edit typos), all
+    maintained incrementally by add/remove.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.doc_terms: Dict[int, Dict[str, float]] = {}
+        self.docs: Dict[int, dict] = {}
+        self.stems: Dict[str, Set[str]] = defaultdict(set)
+        self.deletes: Dict[str, Set[str]] = defaultdict(set)
+        self.sorted_terms: List[str] = []
+
+    def __len__(self):
+        return len(self.doc_terms)
+
+    def add(self, doc_id: int, fields: List[Tuple[Optional[str], float]], doc: Optional[dict] = None):
+        self.remove(doc_id)
+        weights: Dict[str, float] = Counter()
+        for text, weight in fields:
+            for token in tokenize(text):
+                weights[token] += weight
+        for term, weight in weights.items():
+            if term not in self.postings:
+                self._add_term(term)
+            self.postings[term][doc_id] = weight
+        self.doc_terms[doc_id] = dict(weights)
+        if doc is not None:
+            self.docs[doc_id] = doc
+
+    def remove(self, doc_id: int):
+        self.docs.pop(doc_id, None)
+        for term in self.doc_terms.pop(doc_id, {}):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+                    self._drop_term(term)
+
+    def _add_term(self, term: str):
+        bisect.insort(self.sorted_terms, term)
+        self.stems[stem(term)].add(term)
+        if len(term) >= TYPO_MIN_LENGTH:
+            for variant in deletes(term):
+                self.deletes[variant].add(term)
+
+    def _drop_term(self, term: str):
+        i = bisect.bisect_left(self.sorted_terms, term)
+        if i < len(self.sorted_terms) and self.sorted_terms[i] == term:
+            del self.sorted_terms[i]
+        self._discard(self.stems, stem(term), term)
+        if len(term) >= TYPO_MIN_LENGTH:
+            for variant in deletes(term):
+                self._discard(self.deletes, variant, term)
+
+    @staticmethod
+    def _discard(mapping: Dict[str, Set[str]], key: str, term: str):
+        terms = mapping.get(key)
+        if terms is not None:
+            terms.discard(term)
+            if not terms:
+                del mapping[key]
+
+    def _prefixed(self, prefix: str) -> List[str]:
+        i = bisect.bisect_left(self.sorted_terms, prefix)
+        found = []
+        while i < len(self.sorted_terms) and len(found) < MAX_PREFIX_EXPANSIONS:
+            term = self.sorted_terms[i]
+            if not term.startswith(prefix):
+                break
+            found.append(term)
+            i += 1
+        return found
+
+    def expand(self, token: str, prefix: bool = False) -> Dict[str, float]:
+        """Index terms a query token may stand for, with a match weight each."""
+        matches: Dict[str, float] = {}
+        if token in self.postings:
+            matches[token] = 1.0
+        if len(token) >= STEM_LENGTH:
+            for term in self.stems.get(stem(token), ()):
+                matches.setdefault(term, STEM_MATCH_WEIGHT)
+        elif len(token) == STEM_LENGTH - 1:
+            # Four-letter roots ("kedi") still need to reach inflected forms ("kediler")
+            for term in self._prefixed(token):
+                matches.setdefault(term, STEM_MATCH_WEIGHT)
+        if prefix:
+            for term in self._prefixed(token):
+                matches.setdefault(term, PREFIX_MATCH_WEIGHT)
+        if not matches and len(token) >= TYPO_MIN_LENGTH:
+            candidates = set(self.deletes.get(token, ()))
+            for variant in deletes(token):
+                if variant in self.postings:
+                    candidates.add(variant)
+                candidates.update(self.deletes.get(variant, ()))
+            for term in candidates:
+                if within_one_edit(token, term):
+                    matches[term] = TYPO_MATCH_WEIGHT
+        return matches
+
+    def search(self, q: str, prefix: bool = False) -> List[int]:
+        """Rank documents by how many query tokens they match, then by score.
+
+        With prefix=True the last token also matches as a prefix (the user
+        is still typing it).
+        """
+        tokens = list(dict.fromkeys(tokenize(q)))
+        scores: Dict[int, float] = defaultdict(float)
+        hits: Dict[int, int] = defaultdict(int)
+        total = len(self.doc_terms) or 1
+        for n, token in enumerate(tokens):
+            best: Dict[int, float] = {}
+            for term, credit in self.expand(token, prefix and n == len(tokens) - 1).items():
+                docs = self.postings[term]
+                idf = math.log(1 + total / len(docs))
+                for doc_id, weight in docs.items():
+                    score = weight * idf * credit
+                    if score > best.get(doc_id, 0.0):
+                        best[doc_id] = score
+            for doc_id, score in best.items():
+                scores[doc_id] += score
+                hits[doc_id] += 1
+        return sorted(scores, key=lambda doc_id: (-hits[doc_id], -scores[doc_id], -doc_id))
+
+
+class InvertedIndexBackend(SearchBackend):
+    """Turkish-aware in-memory index per worker, built from the DB once and
+    kept current by change events. Also serves autocomplete suggestions."""
+    name = "memory"
+
+    def __init__(self):
+        self.indexes = {kind: InvertedIndex() for kind in SEARCH_FIELDS}
+        self.loaded = False
+        self._load_lock = asyncio.Lock()
+        # Changes seen before the build finished; the build may have read
+        # those rows before the write committed, so they are replayed after it
+        self._pending: Set[Tuple[str, int]] = set()
+
+    async def ensure_loaded(self):
+        if self.loaded:
+            return
+        async with self._load_lock:
+            if self.loaded:
+                return
+            async with AsyncSessionLocal() as db:
+                for kind in SEARCH_FIELDS:
+                    model, fields = SEARCH_FIELDS[kind]
+                    query = select(model.id, model.slug, *[getattr(model, name) for name, _ in fields])
+                    if model is Blog:
+                        query = query.filter(Blog.is_published == True)
+                    for row in (await db.execute(query)).all():
+                        values = dict(zip([name for name, _ in fields], row[2:]))
+                        self.indexes[kind].add(
+                            row[0],
+                            [(values[name], w) for name, w in fields],
+                            {"id": row[0], "slug": row[1], "title": values["title"]},
+                        )
+            self.loaded = True
+            logger.info(f"Search index built: {', '.join(f'{k}={len(i)}' for k, i in self.indexes.items())}")
+            pending, self._pending = self._pending, set()
+        for kind, doc_id in pending:
+            await self._refresh(kind, doc_id)
+
+    async def refresh_document(self, kind: str, doc_id: int):
+        if not self.loaded:
+            self._pending.add((kind, doc_id))
+            return
+        await self._refresh(kind, doc_id)
+
+    async def _refresh(self, kind: str, doc_id: int):
+        model, fields = SEARCH_FIELDS[kind]
+        async with AsyncSessionLocal() as db:
+            doc = (await db.execute(select(model).filter(model.id == doc_id))).scalar_one_or_none()
+        if doc is None or (model is Blog and not doc.is_published):
+            self.indexes[kind].remove(doc_id)
+        else:
+            self.indexes[kind].add(
+                doc_id,
+                [(getattr(doc, name), w) for name, w in fields],
+                {"id": doc.id, "slug": doc.slug, "title": doc.title},
+            )
+
+    async def search(self, db: AsyncSession, kind: str, q: str, limit: int, offset: int) -> List[int]:
+        await self.ensure_loaded()
+        return self.indexes[kind].search(q)[offset:offset + limit]
+
+    async def suggest(self, kind: str, q: str, limit: int) -> List[dict]:
+        await self.ensure_loaded()
+        index = self.indexes[kind]
+        return [index.docs[doc_id] for doc_id in index.search(q, prefix=True)[:limit] if doc_id in index.docs]
+
+
+def _select_backend() -> SearchBackend:
+    choice = settings.SEARCH_BACKEND
+    if choice == "auto":
+        choice = "mysql" if engine.dialect.name == "mysql" else "memory"
+    if choice == "mysql" and engine.dialect.name == "mysql":
+        return MySQLFulltextBackend()
+    # The in-process index is built anyway for suggestions, so "memory"
+    # shares it; it handles Turkish folding and inflection, FULLTEXT does not
+    return content_index
+
+
+content_index = InvertedIndexBackend()
+search_backend = _select_backend()
+
+
+async def notify_content_changed(kind: str, doc_id: int):
+    """Call after a blog/project write so every worker's in-memory index catches up."""
+    try:
+        await events.publish(SEARCH_CHANNEL, {"kind": kind, "id": doc_id})
+    except Exception as e:
+        logger.error(f"Failed to publish search update for {kind}:{doc_id}: {e}")
+        await _on_search_event({"kind": kind, "id": doc_id})
+
+
+async def _on_search_event(payload: dict):
+    if payload.get("kind") in SEARCH_FIELDS:
+        await content_index.refresh_document(payload["kind"], int(payload["id"]))
+
+
+events.subscribe(SEARCH_CHANNEL, _on_search_event)
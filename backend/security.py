@@ -1,7 +1,24 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError
+from config import settings
+
+ph = PasswordHasher(
+    time_cost=settings.ARGON2_TIME_COST,
+    memory_cost=settings.ARGON2_MEMORY_COST,
+    parallelism=settings.ARGON2_PARALLELISM,
+)
 
-ph = PasswordHasher()
+# Argon2 is CPU and memory heavy; the async helpers below run it on a small
+# dedicated pool (argon2-cffi releases the GIL) so the event loop stays free.
+# The pool size is the concurrency cap, extra calls wait in its queue.
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="argon2")
+_stats_lock = threading.Lock()
+_stats = {"queued": 0, "running": 0, "completed": 0, "wait_total": 0.0, "wait_max": 0.0}
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -16,6 +33,60 @@ def get_password_hash(password: str) -> str:
         raise ValueError("Password does not meet complexity requirements. Min 8 chars, 1 upper, 1 lower, 1 digit, 1 special char.")
     return ph.hash(password)
 
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when the hash was made with different Argon2 parameters than the current ones."""
+    try:
+        return ph.check_needs_rehash(hashed_password)
+    except Exception:
+        return False
+
+
+def _run_timed(fn, enqueued_at: float, *args):
+    wait = time.monotonic() - enqueued_at
+    with _stats_lock:
+        _stats["queued"] -= 1
+        _stats["running"] += 1
+        _stats["wait_total"] += wait
+        _stats["wait_max"] = max(_stats["wait_max"], wait)
+    try:
+        return fn(*args)
+    finally:
+        with _stats_lock:
+            _stats["running"] -= 1
+            _stats["completed"] += 1
+
+
+async def _run_in_hash_pool(fn, *args):
+    with _stats_lock:
+        _stats["queued"] += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, _run_timed, fn, time.monotonic(), *args)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str, enforce_policy: bool = True) -> str:
+    # Policy check stays inline so ValueError surfaces before queueing
+    if enforce_policy and not validate_password(password):
+        raise ValueError("Password does not meet complexity requirements. Min 8 chars, 1 upper, 1 lower, 1 digit, 1 special char.")
+    return await _run_in_hash_pool(ph.hash, password)
+
+
+def get_hash_pool_stats() -> dict:
+    with _stats_lock:
+        completed = _stats["completed"]
+        return {
+            "workers": settings.PASSWORD_HASH_WORKERS,
+            "queued": _stats["queued"],
+            "running": _stats["running"],
+            "completed": completed,
+            "avg_wait_ms": round(_stats["wait_total"] / completed * 1000, 2) if completed else 0.0,
+            "max_wait_ms": round(_stats["wait_max"] * 1000, 2),
+        }
+
 def validate_password(password: str) -> bool:
     """
     Password Policy:
@@ -0,0 +1,116 @@
+import logging
+from typing import AsyncIterator, Optional, Tuple
+from xml.sax.saxutils import escape
+
+from fastapi import HTTPException
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from cache import get_cache, set_cache
+from config import settings
+from database import AsyncSessionLocal
+from models import Blog, Project
+
+logger = logging.getLogger("api")
+
+# sitemaps.org limit per file; past it /sitemap.xml becomes a sitemap index
+SITEMAP_MAX_URLS = 50_000
+# Invalidated by blog/project writes, so the soft TTL can be long
+SITEMAP_CACHE_TAGS = ("blogs", "projects")
+SITEMAP_SOFT_TTL = 24 * 3600
+SITEMAP_STALE_TTL = 3600
+# Part count, cached alongside the index so out-of-range part numbers are
+# rejected without counting rows
+SITEMAP_PARTS_CACHE_KEY = "sitemap_parts"
+# Rows per round trip while streaming slugs out of the DB
+STREAM_BATCH_SIZE = 1000
+
+_URLSET_OPEN = b'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_URLSET_CLOSE = b"</urlset>\n"
+_INDEX_OPEN = b'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+_INDEX_CLOSE = b"</sitemapindex>\n"
+
+# URLs are listed blogs first, then projects, each in id order, so a part
+# number maps to a stable slice of the combined list.
+_SOURCES = (
+    ("blog", Blog, (Blog.is_published == True,)),
+    ("project", Project, ()),
+)
+
+
+async def _count(db) -> Tuple[int, ...]:
+    counts = []
+    for _, model, filters in _SOURCES:
+        counts.append((await db.execute(select(func.count(model.id)).filter(*filters))).scalar_one())
+    return tuple(counts)
+
+
+async def _iter_urls(db, counts: Tuple[int, ...], start: int, stop: int) -> AsyncIterator[Tuple[str, Optional[str]]]:
+    """Yield (loc, lastmod) for positions [start, stop) of the combined URL list."""
+    base = 0
+    for (path, model, filters), count in zip(_SOURCES, counts):
+        lo, hi = max(start - base, 0), min(stop - base, count)
+        base += count
+        if lo >= hi:
+            continue
+        query = (
+            select(model.slug, model.date).filter(*filters).order_by(model.id)
+            .offset(lo).limit(hi - lo).execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        result = await db.stream(query)
+        async for slug, date in result:
+            yield f"{settings.SITE_URL}/{path}/{slug}", date.date().isoformat() if date else None
+
+
+async def _render_urlset(db, counts: Tuple[int, ...], start: int, stop: int) -> bytes:
+    chunks = [_URLSET_OPEN]
+    async for loc, lastmod in _iter_urls(db, counts, start, stop):
+        entry = f"  <url><loc>{escape(loc)}</loc>"
+        if lastmod:
+            entry += f"<lastmod>{lastmod}</lastmod>"
+        chunks.append(f"{entry}</url>\n".encode())
+    chunks.append(_URLSET_CLOSE)
+    return b"".join(chunks)
+
+
+def part_count(total: int) -> int:
+    return max(1, -(-total // SITEMAP_MAX_URLS))
+
+
+async def _store_part_count(parts: int):
+    await set_cache(SITEMAP_PARTS_CACHE_KEY, parts, expire=SITEMAP_SOFT_TTL + SITEMAP_STALE_TTL, tags=SITEMAP_CACHE_TAGS)
+
+
+async def sitemap_part_count() -> int:
+    """Number of sitemap parts, from the cache when the index has recorded it."""
+    parts = await get_cache(SITEMAP_PARTS_CACHE_KEY)
+    if parts is None:
+        async with AsyncSessionLocal() as db:
+            parts = part_count(sum(await _count(db)))
+        await _store_part_count(parts)
+    return parts
+
+
+async def render_sitemap() -> bytes:
+    """The root sitemap: a plain urlset, or an index of parts past SITEMAP_MAX_URLS."""
+    async with AsyncSessionLocal() as db:
+        counts = await _count(db)
+        total = sum(counts)
+        await _store_part_count(part_count(total))
+        if total <= SITEMAP_MAX_URLS:
+            return await _render_urlset(db, counts, 0, total)
+    chunks = [_INDEX_OPEN]
+    for part in range(part_count(total)):
+        chunks.append(f"  <sitemap><loc>{escape(settings.SITE_URL)}/api/sitemap-{part}.xml</loc></sitemap>\n".encode())
+    chunks.append(_INDEX_CLOSE)
+    logger.info(f"Sitemap split into {part_count(total)} parts ({total} URLs)")
+    return b"".join(chunks)
+
+
+async def render_sitemap_part(part: int) -> bytes:
+    async with AsyncSessionLocal() as db:
+        counts = await _count(db)
+        if part >= part_count(sum(counts)):
+            raise HTTPException(status_code=404, detail="Sitemap part not found")
+        start = part * SITEMAP_MAX_URLS
+        return await _render_urlset(db, counts, start, start + SITEMAP_MAX_URLS)
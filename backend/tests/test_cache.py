@@ -0,0 +1,81 @@
+import asyncio
+import json
+import time
+
+import fakeredis
+import pytest
+
+import cache
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    text = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    raw = fakeredis.FakeAsyncRedis(server=server)
+    monkeypatch.setattr(cache, "redis_client", text)
+    monkeypatch.setattr(cache, "redis_bytes_client", raw)
+    monkeypatch.setattr(cache, "_invalidate_tags_script", text.register_script(cache._INVALIDATE_TAGS_LUA))
+    monkeypatch.setattr(cache, "_store_if_current_script", raw.register_script(cache._STORE_IF_CURRENT_LUA))
+    return raw
+
+
+def _loader(values, gate=None):
+    calls = []
+    started = asyncio.Event()
+
+    async def load():
+        calls.append(len(calls))
+        started.set()
+        if gate is not None:
+            await gate.wait()
+        return {"v": values[min(len(calls), len(values)) - 1]}
+
+    load.started = started
+    return load, calls
+
+
+async def test_concurrent_misses_compute_once(redis):
+    gate = asyncio.Event()
+    load, calls = _loader([1], gate)
+    waiters = [asyncio.create_task(cache.get_or_compute("k", load, tags=["blogs"])) for _ in range(5)]
+    await load.started.wait()
+    await asyncio.sleep(0.01)  # let the other callers reach the in-flight computation
+    gate.set()
+    entries = await asyncio.gather(*waiters)
+
+    assert len(calls) == 1
+    assert {json.loads(e.body)["v"] for e in entries} == {1}
+    assert await redis.exists("cache:k")
+
+
+async def test_stale_hit_serves_old_body_and_refreshes(redis, monkeypatch):
+    load, calls = _loader([1, 2])
+    await cache.get_or_compute("k", load, tags=["blogs"], soft_ttl=60, stale_ttl=3600)
+
+    now = time.time()
+    monkeypatch.setattr(cache.time, "time", lambda: now + 120)  # past the soft TTL
+    entry = await cache.get_or_compute("k", load, tags=["blogs"], soft_ttl=60, stale_ttl=3600)
+    assert json.loads(entry.body) == {"v": 1}
+    await asyncio.gather(*cache._background_refreshes)
+
+    assert len(calls) == 2
+    entry = cache.CachedBody.loads(await redis.get("cache:k"))
+    assert json.loads(entry.body) == {"v": 2}
+
+
+async def test_result_computed_before_invalidation_is_not_stored(redis):
+    gate = asyncio.Event()
+    load, calls = _loader([1, 2], gate)
+    pending = asyncio.create_task(cache.get_or_compute("k", load, tags=["blogs"]))
+    await load.started.wait()
+    await cache.invalidate_tags("blogs")  # a write lands while the loader runs
+    gate.set()
+
+    assert json.loads((await pending).body) == {"v": 1}  # still returned to its caller
+    assert not await redis.exists("cache:k")
+
+    entry = await cache.get_or_compute("k", load, tags=["blogs"])
+    assert len(calls) == 2
+    assert json.loads(entry.body) == {"v": 2}
+    assert await redis.exists("cache:k")
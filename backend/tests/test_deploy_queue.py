@@ -0,0 +1,73 @@
+import asyncio
+
+import fakeredis
+import pytest
+from arq.connections import ArqRedis
+from arq.worker import Retry
+
+import paas_deploy
+from config import settings
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    server = fakeredis.FakeServer()
+    client = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    monkeypatch.setattr(paas_deploy, "redis_client", client)
+    monkeypatch.setattr(paas_deploy, "_acquire_slot_script", client.register_script(paas_deploy._ACQUIRE_SLOT_LUA))
+    monkeypatch.setattr(settings, "DEPLOY_MAX_CONCURRENT", 2)
+    monkeypatch.setattr(settings, "DEPLOY_MAX_PER_USER", 1)
+    return server
+
+
+async def _queue(*jobs):
+    for job_id, user_id in jobs:
+        await paas_deploy._join_queue(job_id, user_id)
+        await asyncio.sleep(0.002)  # distinct enqueue times
+
+
+async def _waiting():
+    return [job for job in ("a", "b", "c", "d") if await paas_deploy.queue_position(job) is not None]
+
+
+async def test_global_and_per_user_limits(redis):
+    await _queue(("a", 1), ("b", 1), ("c", 2), ("d", 3))
+
+    assert await paas_deploy._acquire_slot("a", 1)
+    assert not await paas_deploy._acquire_slot("b", 1)  # user 1 already deploying
+    assert await paas_deploy._acquire_slot("c", 2)  # b's user is at its limit, so c may pass it
+    assert not await paas_deploy._acquire_slot("d", 3)  # both global slots taken
+    assert await _waiting() == ["b", "d"]
+
+    await paas_deploy._release_slot("a", 1)
+    assert await paas_deploy._acquire_slot("b", 1)
+    assert await _waiting() == ["d"]
+
+
+async def test_later_job_cannot_jump_an_eligible_earlier_one(redis):
+    await _queue(("a", 1), ("b", 1), ("c", 2))
+    assert await paas_deploy._acquire_slot("a", 1)
+    assert await paas_deploy._acquire_slot("c", 2)
+    await paas_deploy._release_slot("a", 1)
+    await paas_deploy._release_slot("c", 2)
+    await _queue(("d", 3))
+
+    # A slot is free, but b (first in line) could take it
+    assert not await paas_deploy._acquire_slot("d", 3)
+    with pytest.raises(Retry):
+        await paas_deploy.deploy_project_job({"job_id": "d", "job_try": 1}, 4, 3)
+    assert await paas_deploy.queue_position("d") == 2
+
+    assert await paas_deploy._acquire_slot("b", 1)
+    assert await paas_deploy._acquire_slot("d", 3)
+
+
+async def test_cancel_leaves_the_wait_list(redis):
+    await _queue(("a", 1), ("b", 2), ("c", 3))
+    pool = ArqRedis(connection_pool=fakeredis.FakeAsyncRedis(server=redis).connection_pool)
+
+    await paas_deploy.cancel_deploy(pool, "a")
+
+    assert await paas_deploy.queue_position("a") is None
+    assert await paas_deploy.queue_position("b") == 1
+    assert await paas_deploy._acquire_slot("b", 2)
@@ -0,0 +1,62 @@
+import asyncio
+import os
+import subprocess
+
+from git_cache import MirrorCache
+
+
+def _git(cwd, *args):
+    return subprocess.run(["git", "-c", "user.name=t", "-c", "user.email=t@t", *args], cwd=cwd,
+                          check=True, capture_output=True, text=True).stdout.strip()
+
+
+def _commit(repo, name, content):
+    with open(os.path.join(repo, name), "w") as f:
+        f.write(content)
+    _git(repo, "add", name)
+    _git(repo, "commit", "-q", "-m", name)
+    return _git(repo, "rev-parse", "HEAD")
+
+
+def _repo(tmp_path, name="origin"):
+    repo = str(tmp_path / name)
+    os.makedirs(repo)
+    _git(repo, "init", "-q", "-b", "main")
+    return repo
+
+
+def test_redeploy_fetches_incrementally_and_checks_out_shallow(tmp_path):
+    origin = _repo(tmp_path)
+    first = _commit(origin, "a.txt", "one")
+    cache = MirrorCache(str(tmp_path / "mirrors"), max_bytes=10**9, max_repos=10)
+    url = f"file://{origin}"
+    dest = str(tmp_path / "work")
+
+    assert asyncio.run(cache.checkout(url, None, dest)) == first
+    mirror = cache.mirror_path(url)
+    second = _commit(origin, "b.txt", "two")
+    _git(origin, "tag", "v1", first)
+
+    assert asyncio.run(cache.checkout(url, "main", dest)) == second
+    assert os.path.exists(os.path.join(dest, "b.txt"))
+    assert _git(dest, "rev-list", "--count", "HEAD") == "1"  # depth 1
+    assert _git(mirror, "rev-parse", "main") == second  # mirror was fetched, not re-cloned
+
+    assert asyncio.run(cache.checkout(url, "v1", dest)) == first
+    assert not os.path.exists(os.path.join(dest, "b.txt"))
+    assert asyncio.run(cache.checkout(url, second, dest)) == second
+
+
+def test_gc_evicts_least_recently_used(tmp_path):
+    cache = MirrorCache(str(tmp_path / "mirrors"), max_bytes=10**9, max_repos=2)
+    urls = []
+    for name in ("r1", "r2", "r3"):
+        repo = _repo(tmp_path, name)
+        _commit(repo, "f.txt", name)
+        urls.append(f"file://{repo}")
+        asyncio.run(cache.checkout(urls[-1], None, str(tmp_path / "work")))
+        os.utime(cache.mirror_path(urls[-1]), (len(urls), len(urls)))  # deterministic LRU order
+
+    assert not os.path.exists(cache.mirror_path(urls[0]))
+    assert os.path.exists(cache.mirror_path(urls[1]))
+    assert os.path.exists(cache.mirror_path(urls[2]))
@@ -0,0 +1,59 @@
+import asyncio
+import datetime
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.future import select
+
+from models import Project
+from pagination import apply_keyset, decode_cursor, encode_cursor, page_of
+
+# Dated rows share dates (ties broken by id) and several rows have no date
+DATES = {
+    1: datetime.datetime(2024, 1, 1), 2: None, 3: datetime.datetime(2024, 3, 1),
+    4: datetime.datetime(2024, 1, 1), 5: None, 6: None,
+    7: datetime.datetime(2024, 3, 1), 8: datetime.datetime(2024, 2, 1), 9: datetime.datetime(2024, 1, 1),
+}
+
+
+async def _pages(limit):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Project.__table__.create)
+        await conn.execute(insert(Project.__table__), [
+            {"id": i, "slug": f"p{i}", "title": f"p{i}", "date": date} for i, date in DATES.items()
+        ])
+    pages, cursor = [], None
+    async with engine.connect() as conn:
+        while True:
+            rows = (await conn.execute(apply_keyset(select(Project.id, Project.date), Project, cursor, limit))).all()
+            items, cursor = page_of(rows, limit)
+            pages.append([row.id for row in items])
+            if cursor is None:
+                break
+    await engine.dispose()
+    return pages
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 9, 10])
+def test_pages_cover_every_row_once_in_order(limit):
+    pages = asyncio.run(_pages(limit))
+    seen = [row_id for page in pages for row_id in page]
+    # Newest first, ties by id descending, undated rows last
+    assert seen == [7, 3, 8, 9, 4, 1, 6, 5, 2]
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_cursor_round_trips_null_dates():
+    assert decode_cursor(encode_cursor(None, 5)) == (None, 5)
+    date = datetime.datetime(2024, 1, 1, 12, 30)
+    assert decode_cursor(encode_cursor(date, 9)) == (date, 9)
+
+
+@pytest.mark.parametrize("token", ["not a cursor!", "e30", "WyJ4IiwxXQ", "WzFd"])
+def test_invalid_cursor_is_rejected(token):
+    with pytest.raises(HTTPException) as exc:
+        apply_keyset(select(Project), Project, token, 10)
+    assert exc.value.status_code == 400
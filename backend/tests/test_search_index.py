@@ -0,0 +1,31 @@
+from turkish import normalize, tokenize
+from search import InvertedIndex
+
+
+def _index():
+    index = InvertedIndex()
+    index.add(1, [("Kediler ve Köpekler", 3.0), ("İstanbul'da bir gün", 1.0)], {"id": 1})
+    index.add(2, [("Python ile Hızlı API Geliştirme", 3.0)], {"id": 2})
+    return index
+
+
+def test_turkish_case_and_diacritic_folding():
+    assert normalize("İSTANBUL IŞIK Şehir Ağaç") == "istanbul isik sehir agac"
+    assert tokenize("KEDİLER, kediler") == ["kediler", "kediler"]
+
+
+def test_inflection_typo_and_prefix_matching():
+    index = _index()
+    assert index.search("kedi") == [1]
+    assert index.search("ISTANBULDA") == [1]
+    assert index.search("geliştirmek") == [2]
+    assert index.search("pyhton") == [2]
+    assert index.search("hız") == []
+    assert index.search("hız", prefix=True) == [2]
+
+
+def test_remove_drops_terms():
+    index = _index()
+    index.remove(2)
+    assert index.search("python") == []
+    assert "python" not in index.sorted_terms
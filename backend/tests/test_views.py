@@ -0,0 +1,72 @@
+from contextlib import asynccontextmanager
+
+import fakeredis
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.pool import StaticPool
+
+import views
+from models import Blog
+
+
+class _TrackDuringFlush:
+    """Engine whose write transaction records another view before it starts."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def connect(self):
+        return self.engine.connect()
+
+    @asynccontextmanager
+    async def begin(self):
+        await views.track_view("blog", 1, "late-visitor")
+        async with self.engine.begin() as conn:
+            yield conn
+
+
+@pytest.fixture
+async def engine(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(views, "redis_client", client)
+    monkeypatch.setattr(views, "_track_view_script", client.register_script(views._TRACK_VIEW_LUA))
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Blog.__table__.create)
+        await conn.execute(insert(Blog.__table__), [{"id": i, "slug": f"b{i}", "title": f"b{i}"} for i in (1, 2)])
+    monkeypatch.setattr(views, "engine", engine)
+    yield engine
+    await engine.dispose()
+
+
+async def _stored(engine):
+    async with engine.connect() as conn:
+        return dict((await conn.execute(select(Blog.id, Blog.view_count))).all())
+
+
+async def test_repeat_views_count_once_and_flush_to_view_count(engine):
+    assert await views.track_view("blog", 1, "visitor-a")
+    assert not await views.track_view("blog", 1, "visitor-a")
+    assert await views.track_view("blog", 1, "visitor-b")
+    assert await views.track_view("blog", 2, "visitor-a")
+    assert await views.get_view_counts("blog", [1, 2]) == {1: 2, 2: 1}
+
+    assert await views.flush_view_counts() == 3
+    assert await _stored(engine) == {1: 2, 2: 1}
+    assert await views.get_view_counts("blog", [1, 2]) == {1: 2, 2: 1}
+    assert await views.flush_view_counts() == 0
+
+
+async def test_views_recorded_during_a_flush_are_kept(engine, monkeypatch):
+    await views.track_view("blog", 1, "visitor-a")
+    monkeypatch.setattr(views, "engine", _TrackDuringFlush(engine))
+
+    assert await views.flush_view_counts() == 1
+    assert await _stored(engine) == {1: 1, 2: 0}
+    assert await views.get_view_counts("blog", [1]) == {1: 2}  # the late view is still pending
+
+    monkeypatch.setattr(views, "engine", engine)
+    assert await views.flush_view_counts() == 1
+    assert await _stored(engine) == {1: 2, 2: 0}
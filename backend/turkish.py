@@ -0,0 +1,58 @@
+import re
+import unicodedata
+from typing import List, Optional
+
+# Text normalization for Turkish search: locale-correct case folding (I→ı,
+# İ→i), then diacritic folding so "şehir", "Şehir" and "sehir" are the same
+# term. Inflection is handled with fixed-prefix stemming (first 5 letters),
+# which works about as well as a morphological analyzer for Turkish retrieval.
+
+STEM_LENGTH = 5
+
+_TURKISH_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_WORD_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def normalize(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFC", text).translate(_TURKISH_UPPER).lower()
+    # Drop combining marks (ç→c, ğ→g, ö→o, ş→s, ü→u, â→a); ı has no decomposition
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).replace("ı", "i")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    return [token for token in _WORD_RE.findall(normalize(text)) if len(token) > 1]
+
+
+def stem(token: str) -> str:
+    return token[:STEM_LENGTH]
+
+
+def deletes(token: str) -> List[str]:
+    """All strings one deletion away from token (symmetric-delete typo lookup)."""
+    return [token[:i] + token[i + 1:] for i in range(len(token))]
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """Optimal-string-alignment distance <= 1 (insert, delete, substitute or swap)."""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la == lb:
+        diffs = [i for i in range(la) if a[i] != b[i]]
+        if len(diffs) == 1:
+            return True
+        return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+    if la > lb:
+        a, b = b, a
+    # b is one longer: removing a single char from b must give a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    return a[i:] == b[i + 1:]
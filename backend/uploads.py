@@ -0,0 +1,125 @@
+from typing import AsyncIterator, List, Optional, Tuple
+
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Streaming multipart reader for large uploads. Starlette's request.form()
+# spools the whole file before the handler runs, so a size cap could only be
+# checked after the fact; this parses request.stream() incrementally and hands
+# the file field out chunk by chunk instead.
+
+# Room for the multipart envelope on top of the file itself
+_ENVELOPE_BYTES = 64 * 1024
+# Bytes accumulated before the first chunk is handed out (magic-byte sniffing)
+SNIFF_BYTES = 2048
+
+
+class _FilePart:
+    def __init__(self):
+        self.name: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.content_type: Optional[str] = None
+
+
+async def stream_upload(request: Request, field: str, max_bytes: int) -> Tuple[_FilePart, AsyncIterator[bytes]]:
+    """Return the file field's metadata and an iterator over its bytes.
+
+    Raises 413 as soon as the declared or streamed size passes max_bytes,
+    without reading the rest of the body.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected multipart/form-data")
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + _ENVELOPE_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    part = _FilePart()
+    current = {"headers": {}, "field": b"", "value": b"", "is_target": False}
+    data: List[bytes] = []
+    state = {"found": False, "done": False}
+
+    def on_part_begin():
+        current["headers"] = {}
+        current["is_target"] = False
+
+    def on_header_field(buf, start, end):
+        current["field"] += buf[start:end]
+
+    def on_header_value(buf, start, end):
+        current["value"] += buf[start:end]
+
+    def on_header_end():
+        current["headers"][current["field"].lower()] = current["value"]
+        current["field"], current["value"] = b"", b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(current["headers"].get(b"content-disposition", b""))
+        name = options.get(b"name", b"").decode("latin-1")
+        if name == field and b"filename" in options and not state["found"]:
+            state["found"] = True
+            current["is_target"] = True
+            part.name = name
+            part.filename = options[b"filename"].decode("utf-8", "replace")
+            part.content_type = current["headers"].get(b"content-type", b"application/octet-stream").decode("latin-1")
+
+    def on_part_data(buf, start, end):
+        if current["is_target"]:
+            data.append(bytes(buf[start:end]))
+
+    def on_part_end():
+        if current["is_target"]:
+            state["done"] = True
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    stream = request.stream()
+
+    # Read until the file part has started (and enough of it to sniff)
+    async for chunk in stream:
+        parser.write(chunk)
+        if state["done"] or (state["found"] and sum(map(len, data)) >= SNIFF_BYTES):
+            break
+    if not state["found"]:
+        raise HTTPException(status_code=400, detail=f"Missing file field '{field}'")
+
+    async def chunks() -> AsyncIterator[bytes]:
+        received = 0
+
+        def take() -> bytes:
+            nonlocal received
+            out = b"".join(data)
+            data.clear()
+            received += len(out)
+            if received > max_bytes:
+                raise HTTPException(status_code=413, detail="File too large")
+            return out
+
+        first = take()
+        if first:
+            yield first
+        if not state["done"]:
+            async for chunk in stream:
+                parser.write(chunk)
+                if data:
+                    yield take()
+                if state["done"]:
+                    break
+            parser.finalize()
+            if data:
+                yield take()
+            if not state["done"]:
+                raise HTTPException(status_code=400, detail="Incomplete upload")
+
+    return part, chunks()
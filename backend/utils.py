@@ -1,6 +1,5 @@
-from PIL import Image, ImageDraw, ImageFont
-import io
 import os
+from typing import AsyncIterator, Iterable, List, Optional, Tuple
 import magic
 import secrets
 from fastapi import HTTPException
@@ -19,28 +18,71 @@ def validate_file_magic(content: bytes):
         raise HTTPException(status_code=400, detail=f"File type {mime} not allowed")
     return mime
 
-def optimize_image(content: bytes, quality: int = 80) -> bytes:
-    """Converts image to WebP and compresses it."""
-    try:
-        img = Image.open(io.BytesIO(content))
-        output = io.BytesIO()
-        img.save(output, format="WEBP", quality=quality, method=6)
-        return output.getvalue()
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Image processing failed: {str(e)}")
+import asyncio
+import json
+from contextlib import AsyncExitStack
 
 import aioboto3
+from aiobotocore.config import AioConfig
 from config import settings
 
 class MinioStorage:
+    """One long-lived, pooled S3 client per process.
+
+    start() opens the client and checks the bucket once; app and worker
+    startup call it, and any method used before that starts it lazily.
+    """
+
     def __init__(self):
         self.bucket = "omervision-assets"
         self.session = aioboto3.Session()
+        self._client = None
+        self._stack: Optional[AsyncExitStack] = None
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        async with self._start_lock:
+            if self._client is not None:
+                return
+            stack = AsyncExitStack()
+            client = await stack.enter_async_context(self.session.client(
+                's3',
+                endpoint_url=f"http://{settings.MINIO_ENDPOINT}",
+                aws_access_key_id=settings.MINIO_ACCESS_KEY,
+                aws_secret_access_key=settings.MINIO_SECRET_KEY,
+                region_name="us-east-1",
+                config=AioConfig(
+                    max_pool_connections=settings.MINIO_MAX_CONNECTIONS,
+                    connect_timeout=settings.MINIO_CONNECT_TIMEOUT,
+                    read_timeout=settings.MINIO_READ_TIMEOUT,
+                    retries={"max_attempts": 3, "mode": "standard"},
+                ),
+            ))
+            try:
+                await self._ensure_bucket(client)
+            except Exception:
+                await stack.aclose()
+                raise
+            self._client, self._stack = client, stack
+
+    async def close(self):
+        async with self._start_lock:
+            if self._stack is not None:
+                await self._stack.aclose()
+            self._client, self._stack = None, None
+
+    async def _get_client(self):
+        if self._client is None:
+            await self.start()
+        return self._client
+
+    def public_url(self, key: str) -> str:
+        return f"http://{settings.MINIO_PUBLIC_ENDPOINT}/{self.bucket}/{key}"
 
     async def _ensure_bucket(self, s3_client):
         try:
             await s3_client.head_bucket(Bucket=self.bucket)
-        except:
+        except Exception:
             await s3_client.create_bucket(Bucket=self.bucket)
             # Make public read for assets (simplified for portfolio)
             public_policy = {
@@ -54,25 +96,84 @@ class MinioStorage:
                     }
                 ]
             }
-            import json
             await s3_client.put_bucket_policy(Bucket=self.bucket, Policy=json.dumps(public_policy))
 
     async def upload_file(self, content: bytes, filename: str, content_type: str = "image/webp") -> str:
-        async with self.session.client(
-            's3',
-            endpoint_url=f"http://{settings.MINIO_ENDPOINT}",
-            aws_access_key_id=settings.MINIO_ACCESS_KEY,
-            aws_secret_access_key=settings.MINIO_SECRET_KEY,
-            region_name="us-east-1"
-        ) as s3:
-            await self._ensure_bucket(s3)
-            await s3.put_object(
+        s3 = await self._get_client()
+        await s3.put_object(
+            Bucket=self.bucket,
+            Key=filename,
+            Body=content,
+            ContentType=content_type
+        )
+        return self.public_url(filename)
+
+    async def upload_many(self, items: Iterable[Tuple[bytes, str, str]]) -> List[str]:
+        """Upload (content, key, content_type) items concurrently over the shared pool."""
+        limit = asyncio.Semaphore(settings.MINIO_MAX_CONNECTIONS)
+
+        async def upload(content: bytes, key: str, content_type: str) -> str:
+            async with limit:
+                return await self.upload_file(content, key, content_type)
+
+        return list(await asyncio.gather(*[upload(*item) for item in items]))
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Delete keys in batches of 1000 (the DeleteObjects limit). Returns the count deleted."""
+        s3 = await self._get_client()
+        keys = list(keys)
+        deleted = 0
+        for i in range(0, len(keys), 1000):
+            batch = keys[i:i + 1000]
+            result = await s3.delete_objects(
                 Bucket=self.bucket,
-                Key=filename,
-                Body=content,
-                ContentType=content_type
+                Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
             )
-            return f"http://{settings.MINIO_PUBLIC_ENDPOINT}/{self.bucket}/{filename}"
+            deleted += len(batch) - len(result.get("Errors", []))
+        return deleted
+
+    async def upload_stream(self, chunks: AsyncIterator[bytes], filename: str, content_type: str) -> str:
+        """Upload from an async byte stream holding at most one part in memory.
+
+        Small files go up as a single put_object; anything past one part
+        becomes an S3 multipart upload, aborted if the stream raises.
+        """
+        part_size = settings.UPLOAD_PART_SIZE
+        s3 = await self._get_client()
+        pending, pending_size = [], 0
+        upload_id = None
+        parts = []
+
+        async def send_part():
+            nonlocal pending, pending_size
+            # Parts may exceed part_size by up to one chunk; S3 only bounds the minimum
+            body = b"".join(pending)
+            pending, pending_size = [], 0
+            result = await s3.upload_part(Bucket=self.bucket, Key=filename, UploadId=upload_id,
+                                          PartNumber=len(parts) + 1, Body=body)
+            parts.append({"ETag": result["ETag"], "PartNumber": len(parts) + 1})
+
+        try:
+            async for chunk in chunks:
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size >= part_size:
+                    if upload_id is None:
+                        mpu = await s3.create_multipart_upload(Bucket=self.bucket, Key=filename, ContentType=content_type)
+                        upload_id = mpu["UploadId"]
+                    await send_part()
+            if upload_id is None:
+                await s3.put_object(Bucket=self.bucket, Key=filename, Body=b"".join(pending), ContentType=content_type)
+            else:
+                if pending:
+                    await send_part()
+                await s3.complete_multipart_upload(Bucket=self.bucket, Key=filename, UploadId=upload_id,
+                                                   MultipartUpload={"Parts": parts})
+        except BaseException:
+            if upload_id is not None:
+                await s3.abort_multipart_upload(Bucket=self.bucket, Key=filename, UploadId=upload_id)
+            raise
+        return self.public_url(filename)
 
 storage = MinioStorage()
 
@@ -81,20 +182,5 @@ def get_cdn_url(path: str) -> str:
     if path.startswith("http"): return path
     return f"http://{settings.MINIO_PUBLIC_ENDPOINT}/omervision-assets/{path}"
 
-def generate_og_image(title: str) -> bytes:
-    """Generates a dynamic 1200x630 OG image with content title."""
-    img = Image.new('RGB', (1200, 630), color=(10, 10, 15))
-    draw = ImageDraw.Draw(img)
-    
-    # Add branding
-    draw.text((50, 50), "OmerVision", fill=(0, 200, 255))
-    
-    # Center text (Simplified)
-    draw.text((600, 315), title[:50], fill=(255, 255, 255))
-    
-    output = io.BytesIO()
-    img.save(output, format="WEBP")
-    return output.getvalue()
-
 def generate_verification_token() -> str:
     return secrets.token_urlsafe(32)
@@ -0,0 +1,104 @@
+import datetime
+import hashlib
+import logging
+from typing import Dict, Iterable
+
+from redis.exceptions import ResponseError
+from sqlalchemy import text as sql_text
+from sqlalchemy.future import select
+
+from config import settings
+from database import redis_client, engine
+from models import Blog, Project
+
+logger = logging.getLogger("api")
+
+# Write-behind view counter. A page view costs one Redis round trip: a Lua
+# script that claims the per-visitor-per-day dedupe key with SET NX and, only
+# if it was new, bumps the post's field in a shared pending hash. The arq
+# worker periodically moves that hash aside and adds it to <table>.view_count
+# in one batched UPDATE per kind.
+PENDING_KEY = "views:pending"
+FLUSHING_KEY = "views:flushing"
+SEEN_PREFIX = "views:seen:"
+VIEW_TABLES = {"blog": (Blog, "blogs"), "project": (Project, "projects")}
+
+_TRACK_VIEW_LUA = """
+if redis.call('SET', KEYS[1], '1', 'NX', 'EX', ARGV[1]) then
+    return redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+end
+return 0
+"""
+_track_view_script = redis_client.register_script(_TRACK_VIEW_LUA)
+
+
+def visitor_id(client_ip: str) -> str:
+    """Keyed hash of the client address, so raw IPs never reach Redis."""
+    return hashlib.sha256(f"{client_ip}{settings.SECRET_KEY}".encode()).hexdigest()[:32]
+
+
+def _seen_key(kind: str, post_id: int, visitor: str) -> str:
+    day = datetime.datetime.utcnow().strftime("%Y%m%d")
+    return f"{SEEN_PREFIX}{day}:{kind}:{post_id}:{visitor}"
+
+
+async def track_view(kind: str, post_id: int, visitor: str) -> bool:
+    """Count one view per visitor (a visitor_id) per post per UTC day. Returns True if counted."""
+    counted = await _track_view_script(
+        keys=[_seen_key(kind, post_id, visitor), PENDING_KEY],
+        args=[86400, f"{kind}:{post_id}"],
+    )
+    return bool(counted)
+
+
+async def get_view_counts(kind: str, post_ids: Iterable[int]) -> Dict[int, int]:
+    """Persisted counts plus increments not yet flushed, for a batch of posts."""
+    post_ids = list(dict.fromkeys(post_ids))
+    if not post_ids:
+        return {}
+    model, _ = VIEW_TABLES[kind]
+    async with engine.connect() as conn:
+        rows = (await conn.execute(select(model.id, model.view_count).filter(model.id.in_(post_ids)))).all()
+    counts = {row[0]: row[1] or 0 for row in rows}
+    fields = [f"{kind}:{post_id}" for post_id in counts]
+    if fields:
+        async with redis_client.pipeline(transaction=False) as pipe:
+            pipe.hmget(PENDING_KEY, fields)
+            pipe.hmget(FLUSHING_KEY, fields)
+            pending, flushing = await pipe.execute()
+        for post_id, a, b in zip(counts, pending, flushing):
+            counts[post_id] += int(a or 0) + int(b or 0)
+    return counts
+
+
+async def flush_view_counts() -> int:
+    """Move buffered increments into the DB. Returns the number of views written.
+
+    The pending hash is renamed to FLUSHING_KEY first, so views tracked during
+    the flush land in a fresh hash. If the DB write fails FLUSHING_KEY is kept
+    and retried on the next run before anything new is taken.
+    """
+    if not await redis_client.exists(FLUSHING_KEY):
+        try:
+            await redis_client.rename(PENDING_KEY, FLUSHING_KEY)
+        except ResponseError:
+            return 0  # nothing buffered
+    buffered = await redis_client.hgetall(FLUSHING_KEY)
+
+    updates: Dict[str, list] = {kind: [] for kind in VIEW_TABLES}
+    total = 0
+    for field, count in buffered.items():
+        kind, _, post_id = field.partition(":")
+        if kind in updates and post_id.isdigit() and int(count) > 0:
+            updates[kind].append({"id": int(post_id), "n": int(count)})
+            total += int(count)
+
+    async with engine.begin() as conn:
+        for kind, params in updates.items():
+            if params:
+                table = VIEW_TABLES[kind][1]
+                await conn.execute(sql_text(f"UPDATE {table} SET view_count = view_count + :n WHERE id = :id"), params)
+    await redis_client.delete(FLUSHING_KEY)
+    if total:
+        logger.info(f"Flushed {total} views for {len(buffered)} posts")
+    return total
@@ -1,10 +1,18 @@
-import uuid
+import asyncio
+import hashlib
 import edge_tts
-from arq import create_pool
+from arq import create_pool, cron, func
 from arq.connections import RedisSettings
 from config import settings
 from utils import storage
-from database import engine
+from database import engine, AsyncSessionLocal
+from models import Blog
+from assets import TTS_PROFILE, asset_digest, asset_key, claim_asset, register_asset, sync_owner_references, collect_garbage
+from cache import invalidate_tags
+from jobs import set_progress
+from views import flush_view_counts
+import analytics
+from paas_deploy import DEPLOY_QUEUE, DEPLOY_MAX_TRIES, cleanup_project_job, deploy_project_job, resume_orphaned_deploys
 from sqlalchemy import text as sql_text
 
 async def send_welcome_email(ctx, email: str):
@@ -13,21 +21,56 @@ async def send_welcome_email(ctx, email: str):
     await asyncio.sleep(2) 
     print(f"--- Welcome email sent to {email} ---")
 
+# Seconds between progress writes while audio is streaming
+TTS_PROGRESS_INTERVAL = 1.0
+
+async def _tts_audio(job_id, text: str, voice: str, generated: dict):
+    """Yield MP3 chunks from edge-tts, publishing bytes and percent of text spoken.
+
+    edge-tts reports a boundary event for every sentence it has synthesized;
+    the position of that sentence in the text gives the percentage.
+    """
+    loop = asyncio.get_running_loop()
+    last_report = loop.time()
+    position = 0
+    async for chunk in edge_tts.Communicate(text, voice).stream():
+        if chunk["type"] == "audio":
+            generated["bytes"] += len(chunk["data"])
+            yield chunk["data"]
+        elif chunk["type"] in ("WordBoundary", "SentenceBoundary"):
+            found = text.find(chunk["text"], position)
+            if found >= 0:
+                position = found + len(chunk["text"])
+        if loop.time() - last_report >= TTS_PROGRESS_INTERVAL:
+            last_report = loop.time()
+            await set_progress(job_id, stage="generating", bytes=generated["bytes"],
+                               percent=min(99, position * 100 // max(len(text), 1)))
+    if not generated["bytes"]:
+        # Raising here keeps upload_stream from storing an empty object
+        raise ValueError("Failed to generate audio")
+    await set_progress(job_id, stage="uploading", bytes=generated["bytes"], percent=100)
+
 async def generate_tts_task(ctx, blog_id: int, text: str, voice: str = "tr-TR-AhmetNeural"):
     print(f"--- Background Task: Generating TTS for blog {blog_id}, text length {len(text)} ---")
+    job_id = ctx.get("job_id")
     try:
-        communicate = edge_tts.Communicate(text, voice)
-        audio_data = b""
-        async for chunk in communicate.stream():
-            if chunk["type"] == "audio":
-                audio_data += chunk["data"]
-        
-        if not audio_data:
-            return {"status": "error", "message": "Failed to generate audio"}
-
-        filename = f"tts/{uuid.uuid4()}.mp3"
-        url = await storage.upload_file(audio_data, filename, "audio/mpeg")
-        print(f"--- TTS Generated: {url} ---")
+        # Same normalized text and voice -> same narration, so reuse it
+        normalized = " ".join(text.split())
+        digest = asset_digest(hashlib.sha256(f"{voice}\n{normalized}".encode()).hexdigest(), TTS_PROFILE)
+        async with AsyncSessionLocal() as db:
+            manifest = await claim_asset(db, digest)
+        if manifest is not None:
+            url = manifest["url"]
+            print(f"--- TTS Reused: {url} ---")
+        else:
+            key = asset_key(digest, ".mp3")
+            generated = {"bytes": 0}
+            await set_progress(job_id, stage="generating", bytes=0, percent=0)
+            # Audio goes straight into the object store (multipart past one part)
+            url = await storage.upload_stream(_tts_audio(job_id, text, voice, generated), key, "audio/mpeg")
+            async with AsyncSessionLocal() as db:
+                await register_asset(db, digest, TTS_PROFILE, "audio/mpeg", generated["bytes"], [key], {"url": url})
+            print(f"--- TTS Generated: {url} ---")
         
         if blog_id > 0:
             async with engine.begin() as conn:
@@ -36,20 +79,81 @@ async def generate_tts_task(ctx, blog_id: int, text: str, voice: str = "tr-TR-Ah
                     sql_text("UPDATE blogs SET audio_url = :url WHERE id = :blog_id"), 
                     [{"url": url, "blog_id": blog_id}]
                 )
+            async with AsyncSessionLocal() as db:
+                blog = await db.get(Blog, blog_id)
+                if blog is not None:
+                    await sync_owner_references(db, "blog", blog)
+                    await db.commit()
+            await invalidate_tags("blogs", f"blog:{blog_id}")
             
+        await set_progress(job_id, stage="done", percent=100)
         return {"status": "completed", "url": url}
     except Exception as e:
         print(f"--- TTS Task Error: {e} ---")
+        await set_progress(job_id, stage="error")
+        return {"status": "error", "message": str(e)}
+
+async def flush_view_counts_task(ctx):
+    try:
+        return {"flushed": await flush_view_counts()}
+    except Exception as e:
+        print(f"--- View Flush Error: {e} ---")
+        return {"status": "error", "message": str(e)}
+
+async def rollup_analytics_task(ctx):
+    try:
+        return {"minutes": await analytics.rollup()}
+    except Exception as e:
+        print(f"--- Analytics Rollup Error: {e} ---")
+        return {"status": "error", "message": str(e)}
+
+async def collect_asset_garbage_task(ctx):
+    try:
+        return {"deleted": await collect_garbage()}
+    except Exception as e:
+        print(f"--- Asset GC Error: {e} ---")
         return {"status": "error", "message": str(e)}
 
 async def startup(ctx):
     print("--- Arq Worker Starting ---")
+    try:
+        await storage.start()
+    except Exception as e:
+        print(f"--- Object storage unavailable at startup, will connect on first use: {e} ---")
 
 async def shutdown(ctx):
     print("--- Arq Worker Shutting Down ---")
+    await storage.close()
 
 class WorkerSettings:
     functions = [send_welcome_email, generate_tts_task]
+    cron_jobs = [
+        cron(flush_view_counts_task, second=0),  # every minute
+        cron(rollup_analytics_task, second=5),  # every minute, just after it closes
+        cron(collect_asset_garbage_task, hour=4, minute=17),  # daily
+    ]
     on_startup = startup
     on_shutdown = shutdown
     redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
+
+# ─── Deploy Worker ───────────────────────────────────────────────────────────
+# Run separately: arq worker.DeployWorkerSettings
+
+async def deploy_startup(ctx):
+    print("--- Arq Deploy Worker Starting ---")
+    try:
+        await resume_orphaned_deploys(ctx["redis"])
+    except Exception as e:
+        print(f"--- Failed to resume orphaned deployments: {e} ---")
+
+class DeployWorkerSettings:
+    queue_name = DEPLOY_QUEUE
+    # Jobs waiting for a slot are deferred with Retry, so allow plenty of tries
+    functions = [
+        func(deploy_project_job, timeout=settings.DEPLOY_TIMEOUT, max_tries=DEPLOY_MAX_TRIES),
+        func(cleanup_project_job, timeout=600, max_tries=DEPLOY_MAX_TRIES),
+    ]
+    max_jobs = settings.DEPLOY_MAX_CONCURRENT
+    allow_abort_jobs = True
+    on_startup = deploy_startup
+    redis_settings = RedisSettings.from_dsn(settings.REDIS_URL)
@@ -11,15 +11,32 @@ import { BlogPost } from "@/types";
 
 export default function BlogPage() {
   const [posts, setPosts] = useState<BlogPost[]>([]);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     api.getBlogs()
-      .then(setPosts)
+      .then(page => {
+        setPosts(page.items);
+        setNextCursor(page.nextCursor);
+      })
       .catch(console.error)
       .finally(() => setLoading(false));
   }, []);
 
+  const loadMore = () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    api.getBlogs(nextCursor)
+      .then(page => {
+        setPosts(prev => [...prev, ...page.items]);
+        setNextCursor(page.nextCursor);
+      })
+      .catch(console.error)
+      .finally(() => setLoadingMore(false));
+  };
+
   return (
     <>
       <Navigation />
@@ -49,6 +66,17 @@ export default function BlogPage() {
                   </FadeIn>
                 </div>
               ))}
+              {nextCursor && (
+                <div className="flex justify-center pt-4">
+                  <button
+                    onClick={loadMore}
+                    disabled={loadingMore}
+                    className="px-6 py-2.5 rounded-md border border-[var(--color-border)] text-[var(--color-text-secondary)] hover:text-[var(--color-text-primary)] hover:bg-[var(--color-bg-secondary)] font-medium transition-colors disabled:opacity-50"
+                  >
+                    {loadingMore ? "Yükleniyor..." : "Daha fazla yazı"}
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </Container>
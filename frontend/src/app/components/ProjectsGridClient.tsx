@@ -17,7 +17,7 @@ export default function ProjectsGridClient() {
   useEffect(() => {
     fetch('http://localhost:8000/api/projects')
       .then((res) => res.json())
-      .then((data) => setProjects(data as Project[]))
+      .then((data) => setProjects(data.items as Project[]))
       .catch(() => setProjects([]));
   }, []);
 
@@ -11,14 +11,17 @@ import { formatDate } from '@/lib/utils';
 export default function ContentListPage() {
     const router = useRouter();
     const [blogs, setBlogs] = useState<BlogPost[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
     const [loading, setLoading] = useState(true);
+    const [loadingMore, setLoadingMore] = useState(false);
 
     const fetchBlogs = async () => {
         setLoading(true);
         try {
             // parameter signature: cursor, limit, includeDrafts
-            const data = await api.getBlogs(undefined, 50, true);
-            setBlogs(data);
+            const page = await api.getBlogs(undefined, 50, true);
+            setBlogs(page.items);
+            setNextCursor(page.nextCursor);
         } catch (error) {
             console.error(error);
             alert("İçerikler yüklenemedi.");
@@ -27,6 +30,21 @@ export default function ContentListPage() {
         }
     };
 
+    const loadMore = async () => {
+        if (!nextCursor) return;
+        setLoadingMore(true);
+        try {
+            const page = await api.getBlogs(nextCursor, 50, true);
+            setBlogs(prev => [...prev, ...page.items]);
+            setNextCursor(page.nextCursor);
+        } catch (error) {
+            console.error(error);
+            alert("İçerikler yüklenemedi.");
+        } finally {
+            setLoadingMore(false);
+        }
+    };
+
     useEffect(() => {
         fetchBlogs();
     }, []);
@@ -165,6 +183,18 @@ export default function ContentListPage() {
                     ))
                 )}
             </div>
+
+            {nextCursor && (
+                <div className="flex justify-center">
+                    <button
+                        onClick={loadMore}
+                        disabled={loadingMore}
+                        className="px-5 py-2.5 rounded-md border border-[var(--color-border)] text-[var(--color-text-secondary)] hover:bg-[var(--color-bg-tertiary)] font-medium transition-colors shadow-sm disabled:opacity-50"
+                    >
+                        {loadingMore ? "Yükleniyor..." : "Daha fazla içerik"}
+                    </button>
+                </div>
+            )}
         </div>
     );
 }
@@ -11,6 +11,7 @@ export default function PaasDashboard() {
     const [editingProject, setEditingProject] = useState<PaaSProject | null>(null);
     const [editName, setEditName] = useState("");
     const [editRepo, setEditRepo] = useState("");
+    const [editRef, setEditRef] = useState("");
     const [editCompose, setEditCompose] = useState("");
 
     const fetchProjects = async () => {
@@ -65,6 +66,7 @@ export default function PaasDashboard() {
             await api.updatePaaSProject(editingProject.id, {
                 name: editName,
                 repo_url: editRepo,
+                git_ref: editRef,
                 compose_code: editCompose
             });
             setEditingProject(null);
@@ -140,7 +142,7 @@ export default function PaasDashboard() {
                                 </td>
                                 <td className="px-6 py-4">
                                     <span className={`inline-flex items-center gap-1.5 px-2.5 py-1 rounded-full text-xs font-medium border ${proj.status === 'running' ? 'bg-emerald-500/10 text-emerald-500 border-emerald-500/20' :
-                                        proj.status === 'deploying' ? 'bg-blue-500/10 text-blue-500 border-blue-500/20' :
+                                        (proj.status === 'deploying' || proj.status === 'queued') ? 'bg-blue-500/10 text-blue-500 border-blue-500/20' :
                                             proj.status === 'failed' ? 'bg-red-500/10 text-red-500 border-red-500/20' :
                                                 'bg-gray-500/10 text-gray-400 border-gray-500/20'
                                         }`}>
@@ -158,6 +160,7 @@ export default function PaasDashboard() {
                                         setEditingProject(proj);
                                         setEditName(proj.name);
                                         setEditRepo(proj.repo_url);
+                                        setEditRef(proj.git_ref || "");
                                         setEditCompose(proj.compose_code || "");
                                     }} className="p-2.5 text-[var(--color-text-muted)] hover:bg-[var(--color-bg-tertiary)] hover:text-[var(--color-text-primary)] rounded-md transition-colors border border-transparent hover:border-[var(--color-border)] shadow-sm" title="Düzenle">
                                         <Edit2 size={16} />
@@ -202,6 +205,10 @@ export default function PaasDashboard() {
                                 <label className="block text-[10px] font-black text-[var(--color-text-muted)] uppercase tracking-[0.2em] mb-2 opacity-80">Git URL</label>
                                 <input value={editRepo} onChange={e => setEditRepo(e.target.value)} className="w-full bg-[var(--color-bg-tertiary)] border border-[var(--color-border)] rounded-md px-4 py-3 text-[var(--color-text-primary)] outline-none focus:border-[var(--color-accent-blue)] transition-colors text-sm" />
                             </div>
+                            <div>
+                                <label className="block text-[10px] font-black text-[var(--color-text-muted)] uppercase tracking-[0.2em] mb-2 opacity-80">Branch / Tag / Commit</label>
+                                <input value={editRef} onChange={e => setEditRef(e.target.value)} placeholder="Varsayılan branch" className="w-full bg-[var(--color-bg-tertiary)] border border-[var(--color-border)] rounded-md px-4 py-3 text-[var(--color-text-primary)] outline-none focus:border-[var(--color-accent-blue)] transition-colors text-sm font-mono" />
+                            </div>
                             <div>
                                 <label className="block text-[10px] font-black text-[var(--color-text-muted)] uppercase tracking-[0.2em] mb-2 opacity-80">Docker Compose Code</label>
                                 <textarea
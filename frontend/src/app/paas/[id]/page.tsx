@@ -1,17 +1,22 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import { useParams, useRouter } from "next/navigation";
 import Link from "next/link";
 import { api, PaaSProject } from "@/lib/api";
 import { TerminalSquare, AlertCircle, MoveLeft, ExternalLink } from "lucide-react";
 
+// Lines kept in the viewer; the server keeps the full (capped) log
+const MAX_LOG_LINES = 2000;
+
 export default function PaasViewerPage() {
     const params = useParams();
     const router = useRouter();
     const id = Number(params.id);
     const [project, setProject] = useState<PaaSProject | null>(null);
     const [loading, setLoading] = useState(true);
+    const [logLines, setLogLines] = useState<string[]>([]);
+    const logEndRef = useRef<HTMLDivElement>(null);
 
     const fetchProject = async () => {
         try {
@@ -33,6 +38,20 @@ export default function PaasViewerPage() {
         return () => clearInterval(interval);
     }, [id]);
 
+    useEffect(() => {
+        // The browser reconnects on its own and resumes from the last event id
+        const source = new EventSource(api.paasLogStreamUrl(id), { withCredentials: true });
+        source.onmessage = (event) => {
+            const entry = JSON.parse(event.data) as { line: string };
+            setLogLines(lines => [...lines, entry.line].slice(-MAX_LOG_LINES));
+        };
+        return () => source.close();
+    }, [id]);
+
+    useEffect(() => {
+        logEndRef.current?.scrollIntoView({ block: "end" });
+    }, [logLines]);
+
     if (loading) {
         return (
             <div className="h-screen flex items-center justify-center bg-[var(--color-bg-primary)]">
@@ -51,7 +70,17 @@ export default function PaasViewerPage() {
     }
 
     const isRunning = project.status === "running";
-    const isDeploying = project.status === "deploying" || project.status === "pending";
+    const isQueued = project.status === "queued";
+    const isDeploying = isQueued || project.status === "deploying" || project.status === "pending";
+
+    const cancelDeploy = async () => {
+        try {
+            await api.cancelPaaSDeploy(id);
+            fetchProject();
+        } catch (error) {
+            console.error(error);
+        }
+    };
 
     return (
         <div className="flex flex-col h-screen bg-[var(--color-bg-primary)]">
@@ -69,6 +98,11 @@ export default function PaasViewerPage() {
                             <span className="text-[10px] px-1.5 py-0.5 rounded bg-[var(--color-bg-tertiary)] border border-[var(--color-border)] uppercase font-mono text-[var(--color-text-muted)] ml-1">
                                 {project.project_type || 'Bilinmiyor'}
                             </span>
+                            {project.commit_sha && (
+                                <span className="text-[10px] font-mono text-[var(--color-text-muted)]" title={project.commit_sha}>
+                                    {project.commit_sha.slice(0, 7)}
+                                </span>
+                            )}
                         </h1>
                     </div>
                 </div>
@@ -104,13 +138,23 @@ export default function PaasViewerPage() {
                             </div>
 
                             <pre className="text-[var(--color-text-secondary)] whitespace-pre-wrap leading-relaxed opacity-90">
-                                {project.logs || '> Bekleniyor...'}
+                                {logLines.length ? logLines.join("\n") : '> Bekleniyor...'}
                             </pre>
+                            <div ref={logEndRef} />
 
                             {isDeploying && (
-                                <div className="flex items-center gap-3 text-blue-400 mt-6 animate-pulse">
-                                    <div className="w-3 h-3 border-2 border-blue-400 border-t-transparent rounded-full animate-spin" />
-                                    <span>İşlem devam ediyor, lütfen bekleyin...</span>
+                                <div className="flex items-center justify-between gap-3 mt-6">
+                                    <div className="flex items-center gap-3 text-blue-400 animate-pulse">
+                                        <div className="w-3 h-3 border-2 border-blue-400 border-t-transparent rounded-full animate-spin" />
+                                        <span>
+                                            {isQueued && project.queue_position
+                                                ? `Dağıtım kuyruğunda, sıra: ${project.queue_position}`
+                                                : 'İşlem devam ediyor, lütfen bekleyin...'}
+                                        </span>
+                                    </div>
+                                    <button onClick={cancelDeploy} className="text-xs px-3 py-1.5 rounded border border-red-500/30 text-red-400 hover:bg-red-500/10 transition-colors">
+                                        İptal Et
+                                    </button>
                                 </div>
                             )}
                         </div>
@@ -16,7 +16,7 @@ export function LatestPosts() {
 
   useEffect(() => {
     api.getBlogs(undefined, 3)
-      .then(res => setPosts(res.filter(p => p.featured)))
+      .then(page => setPosts(page.items.filter(p => p.featured)))
       .catch(console.error)
       .finally(() => setLoading(false));
   }, []);
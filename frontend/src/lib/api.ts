@@ -1,8 +1,18 @@
 import { BlogPost, Project, SystemStatus, User } from "@/types";
 
+// One page of a keyset-paginated list; nextCursor is null on the last page
+export interface Page<T> {
+  items: T[];
+  nextCursor: string | null;
+}
+
 export interface PaaSProject {
   id: number;
   repo_url: string;
+  // Branch, tag or commit to deploy; null = the repo's default branch
+  git_ref: string | null;
+  // Commit of the last checkout
+  commit_sha: string | null;
   name: string;
   description: string | null;
   status: string;
@@ -11,10 +21,35 @@ export interface PaaSProject {
   container_id: string | null;
   host_url: string | null;
   compose_code: string | null;
-  logs: string | null;
+  // 1-based position in the deploy queue while status is "queued"
+  queue_position?: number | null;
   created_at: string;
 }
 
+export interface PaaSDeployment {
+  id: number;
+  job_id: string | null;
+  commit_sha: string | null;
+  project_type: string | null;
+  status: string;
+  started_at: string;
+  finished_at: string | null;
+  build_seconds: number | null;
+  // Dockerfile steps in the build, and how many came from the layer cache
+  build_steps: number | null;
+  cached_steps: number | null;
+  // Build inputs were unchanged, so the existing image was started without a build
+  image_reused: boolean;
+}
+
+export interface TTSStatus {
+  status: string;
+  url?: string;
+  message?: string;
+  // Reported by the worker while the job is queued or running
+  progress?: { stage?: string; bytes?: number; percent?: number };
+}
+
 const isServer = typeof window === 'undefined';
 const API_URL = isServer
   ? (process.env.INTERNAL_API_URL || 'http://127.0.0.1:8000')
@@ -180,16 +215,17 @@ class ApiClient {
   }
 
   // Projects
-  async getProjects(cursor?: number, limit: number = 10): Promise<Project[]> {
-    const url = `/api/projects?limit=${limit}${cursor ? `&cursor=${cursor}` : ''}`;
-    const data = await this.request<any[]>(url);
-    return data.map(this.mapProject);
+  // List endpoints are keyset-paginated; pass a page's nextCursor back to fetch the following page.
+  async getProjects(cursor?: string, limit: number = 10): Promise<Page<Project>> {
+    const url = `/api/projects?limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}`;
+    const data = await this.request<{ items: any[]; next_cursor: string | null }>(url);
+    return { items: data.items.map(this.mapProject), nextCursor: data.next_cursor };
   }
 
-  async getBlogs(cursor?: number, limit: number = 10, includeDrafts: boolean = false): Promise<BlogPost[]> {
-    const url = `/api/blogs?limit=${limit}${cursor ? `&cursor=${cursor}` : ''}${includeDrafts ? '&include_drafts=true' : ''}`;
-    const data = await this.request<any[]>(url);
-    return data.map(this.mapBlogPost);
+  async getBlogs(cursor?: string, limit: number = 10, includeDrafts: boolean = false): Promise<Page<BlogPost>> {
+    const url = `/api/blogs?limit=${limit}${cursor ? `&cursor=${encodeURIComponent(cursor)}` : ''}${includeDrafts ? '&include_drafts=true' : ''}`;
+    const data = await this.request<{ items: any[]; next_cursor: string | null }>(url);
+    return { items: data.items.map(this.mapBlogPost), nextCursor: data.next_cursor };
   }
 
   async getProjectBySlug(slug: string): Promise<Project> {
@@ -291,7 +327,7 @@ class ApiClient {
   }
 
   // PaaS Project API
-  async createPaaSProject(data: { repo_url: string; name: string; description?: string; compose_code?: string }): Promise<PaaSProject> {
+  async createPaaSProject(data: { repo_url: string; git_ref?: string; name: string; description?: string; compose_code?: string }): Promise<PaaSProject> {
     return this.request<PaaSProject>('/api/paas', {
       method: 'POST',
       body: JSON.stringify(data),
@@ -318,11 +354,24 @@ class ApiClient {
     return this.request(`/api/paas/${id}/start`, { method: 'POST' });
   }
 
+  // Server-sent events tail of a project's deploy log (one JSON entry per event)
+  paasLogStreamUrl(id: number): string {
+    return `${API_URL}/api/paas/${id}/logs/stream`;
+  }
+
+  async cancelPaaSDeploy(id: number) {
+    return this.request(`/api/paas/${id}/cancel`, { method: 'POST' });
+  }
+
+  async getPaaSDeployments(id: number, limit = 20): Promise<PaaSDeployment[]> {
+    return this.request<PaaSDeployment[]>(`/api/paas/${id}/deployments?limit=${limit}`);
+  }
+
   async deletePaaSProject(id: number) {
     return this.request(`/api/paas/${id}`, { method: 'DELETE' });
   }
 
-  async updatePaaSProject(id: number, data: { name?: string; repo_url?: string; description?: string; compose_code?: string }): Promise<PaaSProject> {
+  async updatePaaSProject(id: number, data: { name?: string; repo_url?: string; git_ref?: string; description?: string; compose_code?: string }): Promise<PaaSProject> {
     return this.request<PaaSProject>(`/api/paas/${id}`, {
       method: 'PUT',
       body: JSON.stringify(data),
@@ -336,8 +385,8 @@ class ApiClient {
     });
   }
 
-  async getTTSStatus(jobId: string): Promise<{ status: string; url?: string; message?: string }> {
-    return this.request<{ status: string; url?: string; message?: string }>(`/api/tts/status/${jobId}`);
+  async getTTSStatus(jobId: string): Promise<TTSStatus> {
+    return this.request<TTSStatus>(`/api/tts/status/${jobId}`);
   }
 
   async getContactMessages() {